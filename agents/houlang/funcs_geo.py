@@ -0,0 +1,176 @@
+import collections
+import numpy as np
+
+'''
+交战几何相关
+'''
+# 坐标系和仿真一致：x 北，y 东，z 地向；速度 [v_north, v_east, v_down]。
+# 所有函数都按 (我方N架) x (目标M个) 一次算完，每帧算一次，代替循环里逐对调用
+# calculate_distance_2d / calculate_distance_3d / calculate_direction / is_facing_target。
+
+Geometry = collections.namedtuple('Geometry', [
+    'rel',          # (N, M, 3) 目标相对我方的位置
+    'dist_2d',      # (N, M) 水平距离
+    'dist_3d',      # (N, M) 三维距离
+    'azimuth',      # (N, M) 目标方位角 atan2(dy, dx)
+    'elevation',    # (N, M) 目标高低角 atan2(dz, 水平距离)
+    'azimuth_diff', # (N, M) 方位角减去我方偏航，归一化到 [-π, π]，没给 yaw 时为 None
+    'closure_rate', # (N, M) 接近速度，正数表示在靠近
+    'cos_theta',    # (N, M) 双方速度方向夹角的余弦，和 is_facing_target 的 cos_theta 含义一致
+    'aspect',       # (N, M) 目标速度方向和 目标->我方 连线的夹角，0 为迎头，π 为尾追
+])
+
+
+def normalize_angle(angle):
+    """ 将角度归一化到 [-π, π] 区间。"""
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+def positions_of(infos):
+    """ 把带 x, y, z 属性的对象序列整理成 (N, 3) 数组 """
+    return np.array([[info.x, info.y, info.z] for info in infos], dtype=np.float64).reshape(-1, 3)
+
+
+def velocities_of(infos):
+    """ 把带 v_north, v_east, v_down 属性的对象序列整理成 (N, 3) 数组 """
+    return np.array([[info.v_north, info.v_east, info.v_down] for info in infos], dtype=np.float64).reshape(-1, 3)
+
+
+def _unit(v):
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return np.divide(v, norm, out=np.zeros_like(v), where=norm > 0)
+
+
+def pairwise_geometry(pos_a, pos_b, vel_a=None, vel_b=None, yaw_a=None):
+    """_summary_
+
+    Args:
+        pos_a (ndarray): (N, 3) 我方位置
+        pos_b (ndarray): (M, 3) 目标位置
+        vel_a (ndarray): (N, 3) 我方速度，可选
+        vel_b (ndarray): (M, 3) 目标速度，可选，没有时按静止处理
+        yaw_a (ndarray): (N,) 我方偏航角，可选
+
+    Returns:
+        Geometry: 每个字段都是 (N, M) 的矩阵（rel 为 (N, M, 3)）
+    """
+    pos_a = np.asarray(pos_a, dtype=np.float64).reshape(-1, 3)
+    pos_b = np.asarray(pos_b, dtype=np.float64).reshape(-1, 3)
+    rel = pos_b[None, :, :] - pos_a[:, None, :]
+    dist_2d = np.hypot(rel[..., 0], rel[..., 1])
+    dist_3d = np.sqrt(dist_2d ** 2 + rel[..., 2] ** 2)
+    azimuth = np.arctan2(rel[..., 1], rel[..., 0])
+    elevation = np.arctan2(rel[..., 2], dist_2d)
+
+    azimuth_diff = None
+    if yaw_a is not None:
+        azimuth_diff = normalize_angle(azimuth - normalize_angle(np.asarray(yaw_a))[:, None])
+
+    vel_a = np.zeros_like(pos_a) if vel_a is None else np.asarray(vel_a, dtype=np.float64).reshape(-1, 3)
+    vel_b = np.zeros_like(pos_b) if vel_b is None else np.asarray(vel_b, dtype=np.float64).reshape(-1, 3)
+    line_of_sight = np.divide(rel, dist_3d[..., None], out=np.zeros_like(rel), where=dist_3d[..., None] > 0)
+    rel_vel = vel_b[None, :, :] - vel_a[:, None, :]
+    closure_rate = -np.einsum('nmk,nmk->nm', line_of_sight, rel_vel)
+
+    dir_a = _unit(vel_a)
+    dir_b = _unit(vel_b)
+    cos_theta = dir_a @ dir_b.T
+    # 目标->我方 的方向就是 -line_of_sight
+    cos_aspect = -np.einsum('mk,nmk->nm', dir_b, line_of_sight)
+    aspect = np.arccos(np.clip(cos_aspect, -1, 1))
+
+    return Geometry(rel, dist_2d, dist_3d, azimuth, elevation, azimuth_diff,
+                    closure_rate, cos_theta, aspect)
+
+
+# ---------------------------------------------------------------------------------------------------
+# 来袭导弹的最近接近点（CPA）
+# 按双方当前速度匀速外推，(我方N架) x (导弹M枚) 一次算出到最近点的时间、最近距离和接近速度，
+# 威胁排序和导弹失效判断都直接由这几个量得出，不再为每枚导弹保存距离序列。
+
+CPA = collections.namedtuple('CPA', [
+    't_cpa',          # (N, M) 到最近接近点的时间（秒），已经在远离时为 0
+    'miss_distance',  # (N, M) 最近接近点的距离
+    'closing_speed',  # (N, M) 接近速度，正数表示在靠近
+    'dist_3d',        # (N, M) 当前三维距离
+    'dist_2d',        # (N, M) 当前水平距离
+])
+
+
+def closest_approach(pos_a, vel_a, pos_b, vel_b, horizon=None):
+    """_summary_
+
+    Args:
+        pos_a (ndarray): (N, 3) 我方位置
+        vel_a (ndarray): (N, 3) 我方速度
+        pos_b (ndarray): (M, 3) 导弹位置
+        vel_b (ndarray): (M, 3) 导弹速度
+        horizon (float): t_cpa 的上限（秒），None 表示不限
+
+    Returns:
+        CPA: 每个字段都是 (N, M) 的矩阵
+    """
+    pos_a = np.asarray(pos_a, dtype=np.float64).reshape(-1, 3)
+    pos_b = np.asarray(pos_b, dtype=np.float64).reshape(-1, 3)
+    vel_a = np.asarray(vel_a, dtype=np.float64).reshape(-1, 3)
+    vel_b = np.asarray(vel_b, dtype=np.float64).reshape(-1, 3)
+    rel = pos_b[None, :, :] - pos_a[:, None, :]
+    rel_vel = vel_b[None, :, :] - vel_a[:, None, :]
+    rv = np.einsum('nmk,nmk->nm', rel, rel_vel)
+    vv = np.einsum('nmk,nmk->nm', rel_vel, rel_vel)
+    t_cpa = np.divide(-rv, vv, out=np.zeros_like(rv), where=vv > 0)
+    t_cpa = np.clip(t_cpa, 0, horizon)
+    miss_distance = np.linalg.norm(rel + rel_vel * t_cpa[..., None], axis=-1)
+    dist_2d = np.hypot(rel[..., 0], rel[..., 1])
+    dist_3d = np.sqrt(dist_2d ** 2 + rel[..., 2] ** 2)
+    closing_speed = np.divide(-rv, dist_3d, out=np.zeros_like(rv), where=dist_3d > 0)
+    return CPA(t_cpa, miss_distance, closing_speed, dist_3d, dist_2d)
+
+
+def rank_threats(cpa, alarm=None, miss_radius=3000., max_time=60.):
+    """_summary_
+
+    Args:
+        cpa (CPA): closest_approach 的结果
+        alarm (ndarray): (N, M) bool，导弹是否在告警这架飞机，None 表示都算
+        miss_radius (float): 最近距离小于它才算威胁（导弹还会修正弹道，不能要求正好命中）
+        max_time (float): 到最近点的时间超过它不算威胁
+
+    Returns:
+        order (ndarray): (N, M) 每架飞机按 t_cpa 从小到大排好的导弹下标，威胁在前
+        is_threat (ndarray): (N, M) bool
+    """
+    is_threat = (cpa.closing_speed > 0) & (cpa.miss_distance < miss_radius) & (cpa.t_cpa < max_time)
+    if alarm is not None:
+        is_threat &= alarm
+    order = np.argsort(np.where(is_threat, cpa.t_cpa, np.inf), axis=1, kind='stable')
+    return order, is_threat
+
+
+def expired_missiles(cpa, alarm=None, opening_speed=50., safe_distance=5000.):
+    """ (M,) bool：导弹对所有被它告警的我方飞机都在以 opening_speed 以上的速度远离、且距离超过 safe_distance，
+    说明已经追不上了。没有告警任何飞机的导弹不判失效。
+    """
+    opening = (cpa.closing_speed < -opening_speed) & (cpa.dist_3d > safe_distance)
+    if alarm is None:
+        return opening.all(axis=0) & (opening.shape[0] > 0)
+    return (opening | ~alarm).all(axis=0) & alarm.any(axis=0)
+
+
+def assess_threats(cpa, alarm, converged):
+    """_summary_
+
+    Args:
+        cpa (CPA): closest_approach 的结果，导弹速度一般取卡尔曼航迹
+        alarm (ndarray): (N, M) bool，导弹是否在告警这架飞机
+        converged (ndarray): (M,) bool，导弹航迹的速度估计是否已经可用；新航迹的速度从 0 起步，
+            没收敛的导弹既不算威胁也不判失效
+
+    Returns:
+        order (ndarray): (N, M) 同 rank_threats
+        is_threat (ndarray): (N, M) bool
+        expired (ndarray): (M,) bool，同 expired_missiles
+    """
+    alarm = np.asarray(alarm, dtype=bool) & np.asarray(converged, dtype=bool)[None, :]
+    order, is_threat = rank_threats(cpa, alarm)
+    return order, is_threat, expired_missiles(cpa, alarm)
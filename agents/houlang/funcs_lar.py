@@ -0,0 +1,78 @@
+import numpy as np
+
+'''
+发射可接受区（LAR）查表
+'''
+# 表由 arena/lar.py 离线生成：每个弹种一个 (距离, 进入角, 高度差, 接近速度) 的四维网格，值是命中概率（0~1）。
+# 各轴都是等间距的，查表时直接算下标再做多线性插值，一次查 N x M 对，每对是 O(1) 的常数开销。
+# 超出网格范围的坐标按边界截断，只有距离超过最大值时直接给 0。
+
+AXIS_NAMES = ['range', 'aspect', 'dh', 'closing']
+
+# 表是在代理弹道模型上生成的，还没用真仿真校准（中距弹的表在 60 公里左右还给出可观的命中概率），
+# 所以只在原来逐机挑目标的发射条件之内用它：弹种 -> (cos_theta 下限, 距离上限)
+LAUNCH_GATES = {
+    'mid_missile': (0.3, 30000.),
+    'short_missile': (-0.3, np.inf),
+}
+
+
+def in_launch_gates(missile_type, dist, cos_theta):
+    """ (N, M) bool，距离和双方速度夹角满足 LAUNCH_GATES 的配对，没列出的弹种不设限 """
+    min_cos_theta, max_dist = LAUNCH_GATES.get(missile_type, (-np.inf, np.inf))
+    return (np.asarray(cos_theta) > min_cos_theta) & (np.asarray(dist) < max_dist)
+
+
+class LaunchTable:
+    def __init__(self, path):
+        self.grids = {}
+        self.axes = {}
+        with np.load(path) as data:
+            for key in data.files:
+                if '/' not in key:
+                    self.grids[key] = data[key].astype(np.float32)
+            for missile_type in self.grids:
+                axes = [data[f'{missile_type}/{name}'] for name in AXIS_NAMES]
+                # (起点, 间距, 点数)
+                self.axes[missile_type] = [(a[0], (a[-1] - a[0]) / max(len(a) - 1, 1), len(a)) for a in axes]
+
+    def __contains__(self, missile_type):
+        return missile_type in self.grids
+
+    def max_range(self, missile_type):
+        start, step, n = self.axes[missile_type][0]
+        return start + step * (n - 1)
+
+    def lookup(self, missile_type, rng, aspect, dh, closing):
+        """_summary_
+
+        Args:
+            rng (ndarray): 距离
+            aspect (ndarray): 目标进入角，0 为迎头、π 为尾追（funcs_geo.Geometry.aspect）
+            dh (ndarray): 目标高度减我方高度
+            closing (ndarray): 接近速度（funcs_geo.Geometry.closure_rate）
+
+        Returns:
+            ndarray: 和输入广播后同形状的命中概率
+        """
+        grid = self.grids[missile_type]
+        coords = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in (rng, aspect, dh, closing)])
+        shape = coords[0].shape
+        lower, frac = [], []
+        for x, (start, step, n) in zip(coords, self.axes[missile_type]):
+            u = np.clip((x.ravel() - start) / step, 0, n - 1)
+            i = np.minimum(u.astype(np.int64), n - 2)
+            lower.append(i)
+            frac.append(u - i)
+        # 四维的 16 个角点加权求和
+        result = np.zeros(lower[0].shape)
+        for corner in range(16):
+            weight = np.ones_like(result)
+            index = []
+            for d in range(4):
+                bit = (corner >> d) & 1
+                weight *= frac[d] if bit else 1 - frac[d]
+                index.append(lower[d] + bit)
+            result += weight * grid[tuple(index)]
+        result[coords[0].ravel() > self.max_range(missile_type)] = 0.
+        return result.reshape(shape)
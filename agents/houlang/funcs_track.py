@@ -0,0 +1,318 @@
+import numpy as np
+
+'''
+轨迹记录相关
+'''
+# 每个实体一段固定容量的环形缓冲，内存不随对局时长增长。
+# 每个样本同时写在 i 和 i + capacity 两个位置（镜像写），所以最近 k 个样本总是一段连续内存，
+# last(k) 直接返回视图，不用再 np.array(tracks[-20:]) 拷贝一遍。
+
+
+class TrackStore:
+    def __init__(self, capacity=64, dim=3, init_slots=16, dtype=np.float64):
+        """_summary_
+
+        Args:
+            capacity (int): 每个实体保留的最近样本数
+            dim (int/None): 每个样本的维度，None 表示标量（比如距离）
+            init_slots (int): 初始实体槽位数，不够时翻倍
+        """
+        self.capacity = capacity
+        self.sample_shape = () if dim is None else (dim,)
+        self.dtype = dtype
+        self.slots = {}  # 实体ID -> 槽位
+        self.free_slots = []
+        self._alloc(init_slots)
+
+    def _alloc(self, n_slots):
+        data = np.zeros((n_slots, 2 * self.capacity, *self.sample_shape), self.dtype)
+        times = np.zeros((n_slots, 2 * self.capacity))
+        first = np.zeros((n_slots, *self.sample_shape), self.dtype)
+        counts = np.zeros(n_slots, dtype=np.int64)
+        old_n = 0
+        if hasattr(self, 'data'):
+            old_n = self.data.shape[0]
+            data[:old_n] = self.data
+            times[:old_n] = self.times
+            first[:old_n] = self.first_values
+            counts[:old_n] = self.counts
+        self.data, self.times, self.first_values, self.counts = data, times, first, counts
+        self.free_slots.extend(range(n_slots - 1, old_n - 1, -1))
+
+    def add(self, key):
+        """ 登记一个实体（没有样本时也算在 store 里，和原来先建空列表的写法一致） """
+        if key in self.slots:
+            return self.slots[key]
+        if not self.free_slots:
+            self._alloc(2 * self.data.shape[0])
+        slot = self.free_slots.pop()
+        self.counts[slot] = 0
+        self.slots[key] = slot
+        return slot
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.free_slots.append(slot)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def keys(self):
+        return self.slots.keys()
+
+    def append(self, key, value, t=0.):
+        slot = self.add(key)
+        count = self.counts[slot]
+        i = count % self.capacity
+        if count == 0:
+            self.first_values[slot] = value
+        self.data[slot, i] = value
+        self.data[slot, i + self.capacity] = value
+        self.times[slot, i] = t
+        self.times[slot, i + self.capacity] = t
+        self.counts[slot] = count + 1
+
+    def extend(self, keys, values, t=0.):
+        """ 一次写入多个实体的同一时刻样本，values: (len(keys), *sample_shape) """
+        if len(keys) == 0:
+            return
+        slots = np.array([self.add(key) for key in keys])
+        values = np.asarray(values, self.dtype)
+        counts = self.counts[slots]
+        i = counts % self.capacity
+        is_first = counts == 0
+        self.first_values[slots[is_first]] = values[is_first]
+        self.data[slots, i] = values
+        self.data[slots, i + self.capacity] = values
+        self.times[slots, i] = t
+        self.times[slots, i + self.capacity] = t
+        self.counts[slots] = counts + 1
+
+    def count(self, key):
+        """ 累计写入的样本数（不受容量限制），对应原来的 len(tracks) """
+        if key not in self.slots:
+            return 0
+        return int(self.counts[self.slots[key]])
+
+    def _window(self, key, k):
+        slot = self.slots[key]
+        count = self.counts[slot]
+        k = min(count, self.capacity) if k is None else min(k, count, self.capacity)
+        end = count % self.capacity + self.capacity
+        return slot, slice(end - k, end)
+
+    def last(self, key, k=None):
+        """ 最近 k 个样本的只读视图（按时间先后），对应原来的 np.array(tracks[-k:]) """
+        slot, window = self._window(key, k)
+        view = self.data[slot, window]
+        view.flags.writeable = False
+        return view
+
+    def last_times(self, key, k=None):
+        slot, window = self._window(key, k)
+        view = self.times[slot, window]
+        view.flags.writeable = False
+        return view
+
+    def latest(self, key):
+        slot = self.slots[key]
+        return self.data[slot, (self.counts[slot] - 1) % self.capacity]
+
+    def first(self, key):
+        """ 第一个样本，超出容量被覆盖后仍然保留，对应原来的 tracks[0] """
+        return self.first_values[self.slots[key]]
+
+
+# ---------------------------------------------------------------------------------------------------
+# 卡尔曼滤波航迹
+# 敌机和导弹每帧可能同时出现在 enemy_planes（精确）、rws_infos、awacs_infos 里，精度不同。
+# 这里不再按优先级只取一个来源，而是每个来源按各自的量测噪声依次做一次量测更新；
+# 某一帧哪个来源都没看到时只做预测，协方差随之变大。所有实体的状态放在一个 (n, d) 数组里，
+# 预测和更新都是整批算，下游每帧直接取平滑后的位置/速度，不用再对历史点做回归。
+# 状态按 [位置(3), 速度(3), (加速度(3))] 排列，cv 为匀速模型，ca 为匀加速模型。
+
+# 各来源的位置量测标准差（米）和速度量测标准差（米/秒）
+SOURCE_POS_STD = {'enemy_planes': 15., 'rws_infos': 150., 'awacs_infos': 400.}
+SOURCE_VEL_STD = {'enemy_planes': 5., 'rws_infos': 30., 'awacs_infos': 60.}
+
+# 来袭导弹只有 rws_infos 的位置量测：ca 模型（noise_std=100）在 20Hz 下速度协方差的迹稳态约 2.9e4（每轴约 100 米/秒），
+# 新航迹从 3 * 300^2 起步，连续量测约 17 帧后降到这个门限以下，之后才认为速度估计可用
+MISSILE_VEL_VAR = 5e4
+
+
+def _kinematic_matrices(dt, order):
+    """ 单轴的转移矩阵和白噪声（cv 为加速度、ca 为加加速度）驱动的过程噪声，按轴 kron 成 3 维 """
+    if order == 2:
+        Fa = np.array([[1., dt], [0., 1.]])
+        Qa = np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+    else:
+        Fa = np.array([[1., dt, dt ** 2 / 2], [0., 1., dt], [0., 0., 1.]])
+        Qa = np.array([[dt ** 5 / 20, dt ** 4 / 8, dt ** 3 / 6],
+                       [dt ** 4 / 8, dt ** 3 / 3, dt ** 2 / 2],
+                       [dt ** 3 / 6, dt ** 2 / 2, dt]])
+    eye = np.eye(3)
+    return np.kron(Fa, eye), np.kron(Qa, eye)
+
+
+class KalmanTracker:
+    def __init__(self, model='cv', noise_std=30., pos_std=None, vel_std=None,
+                 init_vel_std=300., init_acc_std=30., init_slots=16):
+        """_summary_
+
+        Args:
+            model (str): 'cv' 匀速 / 'ca' 匀加速
+            noise_std (float): 过程噪声强度，cv 时是加速度（米/秒^2），ca 时是加加速度（米/秒^3）
+            pos_std (dict): 来源 -> 位置量测标准差，默认 SOURCE_POS_STD
+            vel_std (dict): 来源 -> 速度量测标准差，默认 SOURCE_VEL_STD
+            init_vel_std (float): 新航迹没有速度量测时速度的初始标准差
+            init_acc_std (float): ca 模型加速度的初始标准差
+            init_slots (int): 初始槽位数，不够时翻倍
+        """
+        assert model in ('cv', 'ca'), model
+        self.order = 2 if model == 'cv' else 3
+        self.dim = 3 * self.order
+        self.q = noise_std ** 2
+        self.pos_std = dict(SOURCE_POS_STD, **(pos_std or {}))
+        self.vel_std = dict(SOURCE_VEL_STD, **(vel_std or {}))
+        init_std = np.array([0., init_vel_std, init_acc_std][:self.order]).repeat(3)
+        self.init_var = init_std ** 2
+        self.t = None
+        self.slots = {}
+        self.free_slots = []
+        self._cache = (None, None, None)  # (dt, F, Q)
+        self._alloc(init_slots)
+
+    def _alloc(self, n_slots):
+        x = np.zeros((n_slots, self.dim))
+        P = np.tile(np.eye(self.dim), (n_slots, 1, 1))
+        last_update = np.zeros(n_slots)
+        old_n = 0
+        if hasattr(self, 'x'):
+            old_n = self.x.shape[0]
+            x[:old_n], P[:old_n], last_update[:old_n] = self.x, self.P, self.last_update
+        self.x, self.P, self.last_update = x, P, last_update
+        self.free_slots.extend(range(n_slots - 1, old_n - 1, -1))
+
+    def _matrices(self, dt):
+        if self._cache[0] != dt:
+            F, Q = _kinematic_matrices(dt, self.order)
+            self._cache = (dt, F, Q * self.q)
+        return self._cache[1], self._cache[2]
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def keys(self):
+        return self.slots.keys()
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.free_slots.append(slot)
+
+    def predict(self, t):
+        """ 所有航迹一起外推到时刻 t，没有量测的航迹也靠这一步走过空档 """
+        if self.t is None or t <= self.t:
+            self.t = t if self.t is None else max(self.t, t)
+            return
+        F, Q = self._matrices(t - self.t)
+        self.t = t
+        if not self.slots:
+            return
+        # 空槽位也一起算，省掉按槽位取子集的拷贝
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+
+    def update(self, keys, pos, source, t=None, vel=None):
+        """_summary_
+
+        Args:
+            keys (list): 实体ID，同一次调用里不能重复
+            pos (ndarray): (n, 3) 位置量测
+            source (str): 量测来源，决定量测噪声
+            t (float): 量测时刻，给了就先外推到这个时刻
+            vel (ndarray): (n, 3) 速度量测，可选
+        """
+        if t is not None:
+            self.predict(t)
+        if len(keys) == 0:
+            return
+        pos = np.asarray(pos, dtype=np.float64).reshape(-1, 3)
+        z = pos if vel is None else np.concatenate([pos, np.asarray(vel, dtype=np.float64).reshape(-1, 3)], axis=1)
+        m = z.shape[1]
+        r = np.full(m, self.pos_std[source] ** 2)
+        r[3:] = self.vel_std[source] ** 2
+
+        is_new = np.array([key not in self.slots for key in keys])
+        for key in (k for k, new in zip(keys, is_new) if new):
+            if not self.free_slots:
+                self._alloc(2 * self.x.shape[0])
+            self.slots[key] = self.free_slots.pop()
+        slots = np.array([self.slots[key] for key in keys])
+
+        # 新航迹直接用量测初始化
+        if is_new.any():
+            new_slots = slots[is_new]
+            self.x[new_slots] = 0.
+            self.x[new_slots, :m] = z[is_new]
+            var = self.init_var.copy()
+            var[:m] = r
+            self.P[new_slots] = np.diag(var)
+
+        old = ~is_new
+        if old.any():
+            s = slots[old]
+            x, P = self.x[s], self.P[s]
+            # H 只是取状态的前 m 维，H P H^T 就是 P 的左上角
+            S = P[:, :m, :m] + np.diag(r)
+            PHt = P[:, :, :m]
+            K = np.linalg.solve(S, PHt.transpose(0, 2, 1)).transpose(0, 2, 1)
+            innovation = z[old] - x[:, :m]
+            self.x[s] = x + np.einsum('nij,nj->ni', K, innovation)
+            self.P[s] = P - K @ P[:, :m, :]
+        self.last_update[slots] = self.t if self.t is not None else 0.
+
+    def update_infos(self, infos, source, t=None, use_vel=False):
+        """ 直接用 obs 里的 info 列表更新，use_vel 为真时把 v_north, v_east, v_down 也当量测 """
+        infos = list(infos)
+        pos = [[info.x, info.y, info.z] for info in infos]
+        vel = [[info.v_north, info.v_east, info.v_down] for info in infos] if use_vel else None
+        self.update([info.ind for info in infos], pos, source, t=t, vel=vel)
+
+    def _slots_of(self, keys):
+        return np.array([self.slots[key] for key in keys], dtype=np.int64)
+
+    def positions(self, keys):
+        """ (n, 3) """
+        return self.x[self._slots_of(keys), :3]
+
+    def velocities(self, keys):
+        """ (n, 3) """
+        return self.x[self._slots_of(keys), 3:6]
+
+    def accelerations(self, keys):
+        """ (n, 3)，cv 模型恒为 0 """
+        if self.order == 2:
+            return np.zeros((len(keys), 3))
+        return self.x[self._slots_of(keys), 6:9]
+
+    def covariances(self, keys):
+        """ (n, d, d) """
+        return self.P[self._slots_of(keys)]
+
+    def position(self, key):
+        return self.x[self.slots[key], :3]
+
+    def velocity(self, key):
+        return self.x[self.slots[key], 3:6]
+
+    def age(self, key):
+        """ 距离上一次量测更新过了多久 """
+        return self.t - self.last_update[self.slots[key]]
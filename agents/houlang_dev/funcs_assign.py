@@ -0,0 +1,93 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+'''
+编队的目标 / 区域分配
+'''
+# 先把 (我方N架) x (目标M个) 的代价矩阵整批算出来，再用匈牙利算法（scipy 的 linear_sum_assignment）
+# 求总代价最小的分配，代替每架飞机依次贪心地挑最近的目标。
+# 不可行的配对（没锁定、没弹、角度不对……）给一个很大的有限代价 INFEASIBLE，求解后再剔掉，
+# 这样矩阵里不用出现 inf，求解器也不会因为无可行解报错。
+# 6 架飞机 x 几个目标的规模，一次求解是几十微秒，可以每隔几帧重新分一次。
+
+INFEASIBLE = 1e9
+
+
+def assign(cost, capacity=1, repeat_penalty=0.):
+    """_summary_
+
+    Args:
+        cost (ndarray): (N, M) 代价矩阵，>= INFEASIBLE 的表示不可行
+        capacity (int): 每个目标最多分给几架飞机
+        repeat_penalty (float): 同一个目标每多分一架飞机额外加的代价，鼓励先把目标分散开
+
+    Returns:
+        ndarray: (N,) 每架飞机分到的目标下标，没分到为 -1
+    """
+    cost = np.asarray(cost, dtype=np.float64).reshape(len(cost), -1)
+    n, m = cost.shape
+    result = np.full(n, -1, dtype=np.int64)
+    if n == 0 or m == 0:
+        return result
+    # 每个目标复制 capacity 份，第 k 份多加 k * repeat_penalty
+    penalty = np.repeat(np.arange(capacity) * repeat_penalty, m)
+    tiled = np.tile(cost, (1, capacity)) + np.where(np.tile(cost, (1, capacity)) < INFEASIBLE, penalty, 0.)
+    rows, cols = linear_sum_assignment(tiled)
+    feasible = tiled[rows, cols] < INFEASIBLE
+    result[rows[feasible]] = cols[feasible] % m
+    return result
+
+
+def assign_weapons(can_fire, cost, repeat_penalty=1.):
+    """_summary_
+
+    Args:
+        can_fire (ndarray): (N,) bool，这一帧真的会发弹的飞机（指令里有 'weapon'）
+        cost (ndarray): (N, M) 代价矩阵，一般是 engagement_cost 的结果
+        repeat_penalty (float): 同 assign
+
+    Returns:
+        ndarray: (N,) 每架飞机分到的目标下标，不发弹的飞机和没分到的为 -1
+    """
+    cost = np.asarray(cost, dtype=np.float64).reshape(len(cost), -1)
+    # 只用会发弹的飞机建行，不发弹的飞机不能占走最好的目标
+    rows = np.flatnonzero(np.asarray(can_fire, dtype=bool))
+    result = np.full(len(cost), -1, dtype=np.int64)
+    if len(rows):
+        result[rows] = assign(cost[rows], capacity=len(rows), repeat_penalty=repeat_penalty)
+    return result
+
+
+def distance_cost(pos_a, pos_b):
+    """ (N, M) 三维距离，区域分配直接用它当代价 """
+    pos_a = np.asarray(pos_a, dtype=np.float64).reshape(-1, 3)
+    pos_b = np.asarray(pos_b, dtype=np.float64).reshape(-1, 3)
+    return np.linalg.norm(pos_b[None, :, :] - pos_a[:, None, :], axis=-1)
+
+
+def engagement_cost(dist, cos_theta, missiles_left, feasible, hit_prob=None, dist_scale=10000., w_facing=1., w_ammo=.5,
+                    w_hit=1.):
+    """_summary_
+
+    Args:
+        dist (ndarray): (N, M) 我方到敌机的距离
+        cos_theta (ndarray): (N, M) 双方速度方向夹角的余弦（is_facing_target 的 cos_theta）
+        missiles_left (ndarray): (N,) 我方各机这类弹的剩余数量
+        feasible (ndarray): (N, M) bool，锁定了、角度和距离满足发射条件的配对
+        hit_prob (ndarray): (N, M) 查发射区表得到的命中概率，可选，越高代价越小
+        dist_scale (float): 距离归一化的尺度
+        w_facing (float): 角度项的权重，迎头（cos_theta 大）的代价小
+        w_ammo (float): 弹量项的权重：打不中浪费一枚弹的代价按剩余弹量折算，命中概率高的目标优先分给弹少的飞机，
+            弹多的飞机去打把握小的目标；只和命中概率一起生效（每行加同一个常数不会改变分配）
+        w_hit (float): 命中概率项的权重
+
+    Returns:
+        ndarray: (N, M) 代价矩阵，不可行的配对为 INFEASIBLE
+    """
+    missiles_left = np.asarray(missiles_left, dtype=np.float64).reshape(-1, 1)
+    cost = np.asarray(dist) / dist_scale + w_facing * (1 - np.asarray(cos_theta)) / 2
+    if hit_prob is not None:
+        miss_prob = 1 - np.asarray(hit_prob)
+        cost = cost + w_hit * miss_prob + w_ammo * miss_prob / np.maximum(missiles_left, 1)
+    feasible = np.asarray(feasible, dtype=bool) & (missiles_left > 0)
+    return np.where(feasible, cost, INFEASIBLE)
@@ -0,0 +1,322 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+def expand_dims_match(x: np.ndarray, target: np.ndarray):
+  """ Expands dimensions of x to match target,
+  an efficient implementation of the following process 
+    while len(x.shape) < len(target.shape):
+      x = np.expand_dims(x, -1)
+  """
+  if x.ndim == target.ndim:
+    return x
+  elif x.shape == target.shape[-x.ndim:]:
+    # adding axes to the front
+    return x[(*(None,)*(target.ndim - x.ndim), *[slice(None) for _ in x.shape])]
+  elif x.shape == target.shape[:x.ndim]:
+    # adding axes to the end
+    return x[(*[slice(None) for _ in x.shape], *(None,)*(target.ndim - x.ndim))]
+  else:
+    raise ValueError(f'Incompatible shapes: {(x.shape, target.shape)}')
+
+
+def normalize(x, mean, std, zero_center=True, clip=None, mask=None, 
+        dim_mask=None, np=np):
+  """ Normalize x using mean and std
+  mask chooses which samples to apply normalization
+  dim_mask masks out dimensions with small variance
+  """
+  x_new = x
+  dtype = x.dtype
+  if zero_center:
+    x_new = x_new - mean
+  std = std if dim_mask is None else np.where(dim_mask, std, 1.)
+  x_new = x_new / std
+  if clip:
+    x_new = np.clip(x_new, -clip, clip)
+  if mask is not None:
+    mask = expand_dims_match(mask, x_new)
+    x_new = np.where(mask, x_new, x)
+  x = x.astype(dtype)
+  return x_new
+
+
+def discrete2continuous(action, n_bins=41):
+  assert np.all(action < n_bins), (action, n_bins)
+  new_action = action * 2 / (n_bins - 1) - 1
+  assert np.all(new_action <= 1) and np.all(new_action >= -1), (action, new_action, n_bins)
+  return new_action
+  
+
+def get_control_action(action):
+  disc_control = np.stack([
+    action[Action.AILERON], 
+    action[Action.ELEVATOR], 
+    action[Action.RUDDER], 
+    action[Action.THROTTLE]
+  ], -1)
+  control = discrete2continuous(disc_control)
+  return control
+
+
+def action2cmd(action):
+  if action is None:
+    return {}
+
+  act = list(action)
+  act[-1] = (act[-1] + 1) / 2
+  cmd = {'control': act}
+  assert 0 <= cmd['control'][-1] <= 1, (cmd['control'])
+
+  return cmd
+
+
+def get_obs(info, target_status):
+  obs = []
+  is_uav = info.is_uav
+  delta_altitude = (target_status[0] - info.height) / 1000
+  delta_velocity = (target_status[1] - info.sp) / 340
+  target_heading = target_status[2]
+  current_heading = info.yaw
+  if target_heading > np.pi and current_heading < 0:
+    current_heading += 2*np.pi
+  elif target_heading < -np.pi and current_heading > 0:
+    current_heading -= 2*np.pi
+  delta_heading = (target_heading - current_heading) / np.pi
+  height = info.height / 10000
+  roll = info.roll / np.pi
+  pitch = info.pitch / np.pi
+  aoa = info.alpha
+  sideslip = info.beta
+  omega = [info.omega_p, info.omega_q, info.omega_r]
+  v_north = info.v_north / 340
+  v_east = info.v_east / 340 
+  v_down = info.v_down / 340  #地向
+  v = info.sp / 340    #地速 空速是tas
+
+  obs = np.array([
+    is_uav,                 # 0. is_uav           (unit: bool)
+    delta_altitude,         # 1. delta_h          (unit: m)
+    delta_velocity,         # 2. delta_v          (unit: m/s)
+    delta_heading,          # 3. delta_heading    (unit: °)
+    height,                 # 4. altitude         (unit: m)
+    roll, pitch,            # 5, 6. roll, pitch   (unit: rad)
+    aoa, sideslip,          # 7, 8. aoa, sideslip (unit: rad)
+    *omega,                 # 9, 10, 11. omega    (unit: rad/s)  
+    v_north,                # 12. v_body_x        (unit: m/s)
+    v_east,                 # 16. v_body_y        (unit: m/s)
+    v_down,                 # 14. v_body_z        (unit: m/s)
+    v,                      # 15. vc              (unit: m/s)
+  ], np.float32)
+
+  return obs
+
+
+class Action:
+  AILERON = 'action_aileron'
+  ELEVATOR = 'action_elevator'
+  RUDDER = 'action_rudder'
+  THROTTLE = 'action_throttle'
+
+
+DISC_ACTIONS = set([getattr(Action, k) for k in dir(Action) if not k.startswith('__')])
+
+
+def fold_normalization(w, b, mean, std):
+  """ Folds (x - mean) / std into the linear layer y = x @ w + b
+  w has shape (in, out), returns the new (w, b) in float32
+  """
+  w = w.astype(np.float64)
+  w_new = w / std[:, None]
+  b_new = b - (mean / std) @ w
+  return w_new.astype(np.float32), b_new.astype(np.float32)
+
+
+def clip_obs(obs, low, high):
+  """ Clips raw obs to [low, high], only copies when the bounds bind """
+  if (obs < low).any() or (obs > high).any():
+    return np.clip(obs, low, high)
+  return obs
+
+
+class FCModelBase(ABC):
+  """ Target and command helpers shared by FCModel and NpFCModel,
+  subclasses implement __call__ which samples the discrete actions
+  """
+  fused = False
+
+  @abstractmethod
+  def __call__(self, obs):
+    """ Returns a dict mapping action name to sampled actions """
+
+  def _to_numpy(self, outs):
+    return outs
+
+  @abstractmethod
+  def _logits(self, obs):
+    """ Returns concatenated logits of all heads for network inputs obs """
+
+  @abstractmethod
+  def _get_first_layer(self):
+    """ Returns (w, b) of the first layer, w has shape (in, out) """
+
+  @abstractmethod
+  def _set_first_layer(self, w, b):
+    """ Replaces the first layer with (w, b), w has shape (in, out) """
+
+  def fuse_normalization(self, clip=10, n_check=256, atol=1e-3):
+    """ Folds the affine part of the rms normalization into the first layer
+    at load time. Clipping moves to raw obs space ([mean - clip * std, 
+    mean + clip * std]) and is only applied when an obs leaves that box.
+    The fused path is checked against normalize + the original layer on
+    random obs, part of which lie outside the clipping box
+    """
+    assert not self.fused
+    rng = np.random.default_rng(0)
+    obs = self.rms_mean + self.rms_std * rng.normal(
+      scale=clip / 2, size=(n_check, self.rms_mean.shape[-1]))
+    obs = obs.astype(np.float32)
+    ref = self._logits(normalize(obs, self.rms_mean, self.rms_std, clip=clip))
+
+    w, b = self._get_first_layer()
+    self._set_first_layer(*fold_normalization(w, b, self.rms_mean, self.rms_std))
+    self.obs_low = (self.rms_mean - clip * self.rms_std).astype(np.float32)
+    self.obs_high = (self.rms_mean + clip * self.rms_std).astype(np.float32)
+    self.fused = True
+
+    out = self._logits(clip_obs(obs, self.obs_low, self.obs_high))
+    assert np.allclose(out, ref, atol=atol), np.abs(out - ref).max()
+
+  def clip_target(self, target, target_limit=[[1000, 300], [14500, 450]]):
+    target[:2] = np.clip(target[:2], target_limit[0], target_limit[1])
+    assert np.all(target[:2] >= target_limit[0]), target
+    return target
+
+  def get_current_status(self, info):
+    current_status = np.zeros(3)
+    current_status[0] = info.height
+    current_status[1] = info.sp
+    current_status[2] = info.yaw
+    return current_status
+
+  def get_target(self, info, delta):
+    current_status = self.get_current_status(info)
+    target = current_status + delta
+    target = self.clip_target(target)
+    return target
+  
+  def control_cmd_from_obs(self, obs):
+    outs = self._to_numpy(self(obs))
+    # print('outs', outs)
+    control = get_control_action(outs)
+    cmd = action2cmd(control)
+    return cmd
+
+  def control_cmd(self, info, target):
+    obs = get_obs(info, target)
+    cmd = self.control_cmd_from_obs(obs)
+    return cmd
+
+  def control_cmd_batch(self, infos, targets):
+    """ Computes commands for all planes with one forward pass
+    infos: dict mapping plane id to plane info
+    targets: dict mapping plane id to target status [height, sp, yaw]
+    Returns a dict mapping plane id to cmd, same as control_cmd
+    """
+    ids = [pid for pid in infos if pid in targets]
+    if not ids:
+      return {}
+    obs = np.stack([get_obs(infos[pid], targets[pid]) for pid in ids])
+    outs = self._to_numpy(self(obs))
+    control = get_control_action(outs)
+    return {pid: action2cmd(c) for pid, c in zip(ids, control)}
+
+
+def sample_categorical(logits, rng):
+  """ Samples from the last axis of logits with the Gumbel-max trick """
+  return np.argmax(logits + rng.gumbel(size=logits.shape), -1)
+
+
+class NpPolicy:
+  """ NumPy counterpart of funcs_rl.Policy for the relu MLP with discrete heads
+  params is the npz bundle written by funcs_rl.export_np_params
+  """
+  def __init__(self, params, action_dim):
+    self.layers = []
+    i = 0
+    while f'net.layers.{i}.0.weight' in params:
+      w = params[f'net.layers.{i}.0.weight']
+      b = params[f'net.layers.{i}.0.bias']
+      self.layers.append((np.ascontiguousarray(w.T, np.float32), b.astype(np.float32)))
+      i += 1
+    assert self.layers, list(params)
+    # all heads are merged into one matmul and split afterwards
+    self.head_names = list(action_dim)
+    self.head_w = np.ascontiguousarray(np.concatenate(
+      [params[f'head_{k}.linear.weight'] for k in self.head_names]).T, np.float32)
+    self.head_b = np.concatenate(
+      [params[f'head_{k}.linear.bias'] for k in self.head_names]).astype(np.float32)
+    self.head_splits = np.cumsum([action_dim[k] for k in self.head_names])[:-1]
+
+  @property
+  def input_dim(self):
+    return self.layers[0][0].shape[0]
+
+  def logits(self, x):
+    """ Returns the concatenated logits of all heads, shape (..., sum(action_dim)) """
+    for w, b in self.layers:
+      x = np.maximum(x @ w + b, 0)
+    return x @ self.head_w + self.head_b
+
+  def __call__(self, x):
+    logits = self.logits(x)
+    return dict(zip(self.head_names, np.split(logits, self.head_splits, axis=-1)))
+
+
+class NpFCModel(FCModelBase):
+  def __init__(self, path, obs_dim, is_action_discrete, action_dim, seed=None, fused=False):
+    assert all(is_action_discrete.values()), is_action_discrete
+    params = dict(np.load(path))
+    self.policy = NpPolicy(params, action_dim)
+    assert self.policy.input_dim == obs_dim, (self.policy.input_dim, obs_dim)
+    self.is_action_discrete = is_action_discrete
+    self.action_dim = action_dim
+    self.rms_mean = params['rms.mean']
+    self.rms_std = np.sqrt(params['rms.var'] + 1e-8)
+    self._stack_heads = len(set(action_dim.values())) == 1
+    self.rng = np.random.default_rng(seed)
+    if fused:
+      self.fuse_normalization()
+
+  def _logits(self, obs):
+    return self.policy.logits(obs.astype(np.float32))
+
+  def _get_first_layer(self):
+    return self.policy.layers[0]
+
+  def _set_first_layer(self, w, b):
+    self.policy.layers[0] = (w, b)
+
+  def __call__(self, obs):
+    obs = obs.astype(np.float32)
+    if self.fused:
+      obs = clip_obs(obs, self.obs_low, self.obs_high)
+    else:
+      obs = normalize(obs, self.rms_mean, self.rms_std, clip=10)
+    logits = self._logits(obs)
+    names = self.policy.head_names
+    if self._stack_heads:
+      # all heads share the same number of bins, sample them in one call
+      logits = logits.reshape(*logits.shape[:-1], len(names), -1)
+      actions = sample_categorical(logits, self.rng)
+      return {k: actions[..., i] for i, k in enumerate(names)}
+    logits = np.split(logits, self.policy.head_splits, axis=-1)
+    return {k: sample_categorical(l, self.rng) for k, l in zip(names, logits)}
+
+
+def create_np_fc_model(path, seed=None, fused=False):
+  is_action_discrete = {k: True for k in DISC_ACTIONS}
+  action_dim = {k: 41 for k in DISC_ACTIONS}
+  model = NpFCModel(path, 16, is_action_discrete, action_dim, seed=seed, fused=fused)
+  return model
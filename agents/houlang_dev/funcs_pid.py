@@ -89,16 +89,22 @@ class FlyPid:
 
         return [control_aileron, control_elevator, 0, 1]
 
-def fly_with_alt_yaw_vel(plane, action:list, fly_pid):
+def fly_with_alt_yaw_vel(plane, action:list, fly_pid, gains=None):
     """_summary_
 
     Args:
         action (list): [(0-2), (0-4), (0-2)] ,
+        gains (ndarray): GainSchedule.lookup 查出的这架飞机的一行，None 时用 FlyPid 自带的增益、匀速油门 0.395、俯仰限幅 0.7
 
     Returns:
         list: [aileron, elevator, rudder, throttle]
     """
     global last_target_pitch, last_target_heading, last_target_roll
+    level_throttle, elevator_limit = 0.395, 0.7
+    if gains is not None:
+        fly_pid.pid_aileron.Kp, fly_pid.pid_aileron.Ki, fly_pid.pid_aileron.Kd = gains[0:3]
+        fly_pid.pid_elevator.Kp, fly_pid.pid_elevator.Ki, fly_pid.pid_elevator.Kd = gains[3:6]
+        level_throttle, elevator_limit = gains[6], gains[7]
     # 确定转向
     temp_turn = math.degrees(norm_delta_heading[action[1]])
     # 根据当前状态想移动的角度来计算目标滚转角度
@@ -122,11 +128,11 @@ def fly_with_alt_yaw_vel(plane, action:list, fly_pid):
     if norm_delta_velocity[action[2]] < 0:
         cmd_list[3] = 0
     elif norm_delta_velocity[action[2]] == 0:
-        cmd_list[3] = 0.395 # 匀速
+        cmd_list[3] = level_throttle # 匀速
         
     # 限制控制俯仰轴的指令值，防止飞机失控
-    if abs(cmd_list[1])  > 0.7:
-        cmd_list[1] = 0.7 * np.sign(cmd_list[1])
+    if abs(cmd_list[1])  > elevator_limit:
+        cmd_list[1] = elevator_limit * np.sign(cmd_list[1])
         
     # 飞机倒过来飞时特殊处理，俯仰轴取反方向
     if -90 >= math.degrees(plane.roll) or math.degrees(plane.roll) >= 90:
@@ -138,3 +144,199 @@ def fly_with_alt_yaw_vel(plane, action:list, fly_pid):
     
     return cmd_list
 
+
+
+class PIDBank:
+    """ 多架飞机、多个通道的 PID 放在一起算。
+    增益、积分、上一次误差、设定值都是 (飞机数, 通道数) 的数组，每帧整个机队一次向量化计算，
+    计算方式和 PID.compute 一致（含积分限幅、输出限幅、误差除以 length）。
+    飞机用 rows(keys) 换成行号后传给其它方法，一帧里只查一次字典。
+    """
+    def __init__(self, Kp, Ki, Kd, output_limits, windup_guard, lengths=None, init_planes=8):
+        self.Kp = np.asarray(Kp, dtype=np.float64)
+        self.Ki = np.asarray(Ki, dtype=np.float64)
+        self.Kd = np.asarray(Kd, dtype=np.float64)
+        self.base_gains = (self.Kp, self.Ki, self.Kd)
+        n_axes = self.Kp.shape[0]
+        limits = np.array([[-np.inf if lo is None else lo, np.inf if hi is None else hi] for lo, hi in output_limits])
+        self.output_low, self.output_high = limits[:, 0], limits[:, 1]
+        self.windup_guard = np.array([np.inf if g is None else g for g in windup_guard], dtype=np.float64)
+        self.lengths = np.ones(n_axes) if lengths is None else np.asarray(lengths, dtype=np.float64)
+        self.slots = {}  # 飞机ID -> 行号
+        self.setpoint = np.zeros((init_planes, n_axes))
+        self.integral = np.zeros((init_planes, n_axes))
+        self.previous_error = np.zeros((init_planes, n_axes))
+
+    def rows(self, keys):
+        """ 返回 keys 对应的行号，新飞机自动分配一行（状态为 0） """
+        for key in keys:
+            if key not in self.slots:
+                if len(self.slots) == self.integral.shape[0]:
+                    grow = np.zeros_like(self.integral)
+                    self.setpoint = np.concatenate([self.setpoint, grow])
+                    self.integral = np.concatenate([self.integral, grow])
+                    self.previous_error = np.concatenate([self.previous_error, grow])
+                    if self.Kp.ndim == 2:
+                        # 新行先用构造时的增益
+                        self.Kp, self.Ki, self.Kd = [np.concatenate([g, np.tile(g0, (len(grow), 1))])
+                                                     for g, g0 in zip((self.Kp, self.Ki, self.Kd), self.base_gains)]
+                self.slots[key] = len(self.slots)
+        return np.array([self.slots[key] for key in keys], dtype=np.int64)
+
+    def set_setpoint(self, rows, setpoint):
+        self.setpoint[rows] = setpoint
+
+    def set_gains(self, rows, Kp, Ki, Kd):
+        """ 按行设置增益（调参、增益表用），第一次调用时增益从 (通道数,) 扩成 (行数, 通道数) """
+        if self.Kp.ndim == 1:
+            n = self.integral.shape[0]
+            self.Kp, self.Ki, self.Kd = [np.tile(g, (n, 1)) for g in (self.Kp, self.Ki, self.Kd)]
+        self.Kp[rows] = Kp
+        self.Ki[rows] = Ki
+        self.Kd[rows] = Kd
+
+    def compute(self, rows, measured_value):
+        """ measured_value: (len(rows), 通道数)，返回同形状的控制输出 """
+        Kp, Ki, Kd = (g[rows] if g.ndim == 2 else g for g in (self.Kp, self.Ki, self.Kd))
+        error = self.setpoint[rows] - measured_value
+        error /= self.lengths
+        integral = self.integral[rows] + error
+        np.clip(integral, -self.windup_guard, self.windup_guard, out=integral)
+        derivative = error - self.previous_error[rows]
+        self.integral[rows] = integral
+        self.previous_error[rows] = error
+
+        output = Kp * error + Ki * integral + Kd * derivative
+        return np.clip(output, self.output_low, self.output_high, out=output)
+
+    def reset(self, rows):
+        self.integral[rows] = 0.0
+        self.previous_error[rows] = 0.0
+
+
+class FlyPidBank(PIDBank):
+    """ 整个机队的 FlyPid，通道为 [aileron, elevator]（FlyPid 里 rudder、throttle 的 PID 没有参与输出） """
+    def __init__(self, init_planes=8):
+        super().__init__(
+            Kp=[0.8, 0.3], Ki=[0.01, 0.02], Kd=[0.1, 0.2],
+            output_limits=[(-1, 1), (-1, 1)], windup_guard=[20.0, 10.0],
+            lengths=[90, 1], init_planes=init_planes)
+
+    def set_tar_value(self, rows, tar_pitch_rate, tar_roll_rate):
+        setpoint = np.empty((len(rows), 2))
+        setpoint[:, 0] = tar_roll_rate
+        setpoint[:, 1] = tar_pitch_rate
+        self.set_setpoint(rows, np.degrees(setpoint, out=setpoint))
+
+    def get_control_cmd(self, rows, omega):
+        """ omega: (N, 2) [omega_p, omega_q]，返回 (N, 4) [aileron, elevator, rudder, throttle] """
+        out = self.compute(rows, np.degrees(omega))
+        cmd = np.zeros((len(rows), 4))
+        cmd[:, 0] = out[:, 0]
+        cmd[:, 1] = -out[:, 1]
+        cmd[:, 3] = 1
+        return cmd
+
+
+def fly_with_alt_yaw_vel_batch(planes, actions, fly_pid_bank, keys, schedule=None):
+    """ fly_with_alt_yaw_vel 的机队版本，一次算完所有飞机
+
+    Args:
+        planes (list): 每架飞机的 myplaneinfo
+        actions (ndarray): (N, 3) 每架飞机的 [(0-2), (0-6), (0-2)]
+        fly_pid_bank (FlyPidBank): 机队 PID
+        keys (list): 每架飞机在 fly_pid_bank 里的 ID
+        schedule (GainSchedule): 增益表，按每架飞机的机型、高度、马赫数查增益、匀速油门和俯仰限幅，None 时用固定值
+
+    Returns:
+        ndarray: (N, 4) [aileron, elevator, rudder, throttle]
+    """
+    state = np.array([(plane.roll, plane.pitch, plane.omega_p, plane.omega_q, plane.height, plane.mach, plane.is_uav)
+                      for plane in planes], dtype=np.float64).reshape(-1, 7)
+    rows = fly_pid_bank.rows(keys)
+    if schedule is None:
+        return fly_with_alt_yaw_vel_arrays(state[:, 0], state[:, 1], state[:, 2:4], actions, fly_pid_bank, rows)
+    gains = schedule.lookup(state[:, 6] > 0, state[:, 4], state[:, 5])
+    fly_pid_bank.set_gains(rows, gains[:, [0, 3]], gains[:, [1, 4]], gains[:, [2, 5]])
+    return fly_with_alt_yaw_vel_arrays(state[:, 0], state[:, 1], state[:, 2:4], actions, fly_pid_bank, rows,
+                                       level_throttle=gains[:, 6], elevator_limit=gains[:, 7])
+
+
+def fly_with_alt_yaw_vel_arrays(roll, pitch, omega, actions, fly_pid_bank, rows, level_throttle=0.395,
+                                elevator_limit=0.7):
+    """ fly_with_alt_yaw_vel_batch 直接吃数组的版本，离线调参（arena.autotune）时不用构造飞机对象
+
+    Args:
+        roll, pitch (ndarray): (N,) 滚转角、俯仰角
+        omega (ndarray): (N, 2) [omega_p, omega_q]
+        actions (ndarray): (N, 3) 每架飞机的 [(0-2), (0-6), (0-2)]
+        fly_pid_bank (FlyPidBank): 机队 PID
+        rows (ndarray): (N,) 每架飞机在 fly_pid_bank 里的行号
+        level_throttle (float / ndarray): 保持速度时的油门，可以每架飞机不同
+        elevator_limit (float / ndarray): 俯仰指令的限幅，可以每架飞机不同
+
+    Returns:
+        ndarray: (N, 4) [aileron, elevator, rudder, throttle]
+    """
+    actions = np.asarray(actions, dtype=np.int64).reshape(-1, 3)
+
+    # 确定转向，根据想移动的角度来计算目标滚转角度
+    temp_turn = np.degrees(norm_delta_heading[actions[:, 1]])
+    rate = np.abs(temp_turn) / 35
+    target_roll = np.where(np.abs(temp_turn) < 4, 0, np.radians(90) * rate * np.sign(temp_turn))
+    target_pitch = np.arctan2(norm_delta_altitude[actions[:, 0]], 500)
+
+    # 设置目标姿态角角速度
+    fly_pid_bank.set_tar_value(rows, target_pitch - pitch, target_roll - roll)
+    cmd = fly_pid_bank.get_control_cmd(rows, omega)
+
+    # 控制加力来改变速度
+    delta_velocity = norm_delta_velocity[actions[:, 2]]
+    cmd[delta_velocity < 0, 3] = 0
+    level = delta_velocity == 0
+    cmd[level, 3] = np.broadcast_to(level_throttle, level.shape)[level] # 匀速
+
+    # 限制控制俯仰轴的指令值，防止飞机失控
+    np.clip(cmd[:, 1], -elevator_limit, elevator_limit, out=cmd[:, 1])
+
+    # 飞机倒过来飞时特殊处理，俯仰轴取反方向
+    roll_deg = np.degrees(roll)
+    inverted = (roll_deg <= -90) | (roll_deg >= 90)
+    cmd[inverted, 1] *= -1
+
+    return cmd
+
+
+# 增益表的列：aileron、elevator 两组 PID 增益，匀速油门，俯仰指令限幅
+SCHEDULE_COLUMNS = ['aileron_Kp', 'aileron_Ki', 'aileron_Kd', 'elevator_Kp', 'elevator_Ki', 'elevator_Kd',
+                    'throttle', 'elevator_limit']
+SCHEDULE_AIRFRAMES = ['manned', 'uav']
+# 手调的俯仰限幅 0.7 是真仿真里验证过的，表里的限幅只在 6 自由度代理模型上调过，不允许比它更松
+ELEVATOR_LIMIT_MAX = 0.7
+
+
+class GainSchedule:
+    """ 按 (机型, 高度带, 马赫数带) 查的增益表，由 arena/gain_schedule.py 离线生成。
+    高度、马赫数都是等宽分带，查表就是算下标再取一行（超出范围按两端的带），整个机队一次向量化查完。
+    """
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.table = data['table']  # (机型, 高度带, 马赫数带, 列)
+            self.altitude_bands = data['altitude_bands']  # (起点, 带宽, 带数)
+            self.mach_bands = data['mach_bands']
+            columns = list(data['columns'])
+            airframes = list(data['airframes'])
+        # 列和机型按本文件的顺序排好，查表时不用再按名字找
+        self.table = self.table[[airframes.index(a) for a in SCHEDULE_AIRFRAMES]][..., [columns.index(c) for c in SCHEDULE_COLUMNS]]
+        limit = SCHEDULE_COLUMNS.index('elevator_limit')
+        self.table[..., limit] = np.minimum(self.table[..., limit], ELEVATOR_LIMIT_MAX)
+
+    @staticmethod
+    def _band(value, bands):
+        start, width, n = bands
+        return np.clip(((np.asarray(value, dtype=np.float64) - start) // width).astype(np.int64), 0, int(n) - 1)
+
+    def lookup(self, is_uav, height, mach):
+        """ (N,) 的机型、高度、马赫数 -> (N, len(SCHEDULE_COLUMNS)) """
+        return self.table[np.asarray(is_uav, dtype=np.int64), self._band(height, self.altitude_bands),
+                          self._band(mach, self.mach_bands)]
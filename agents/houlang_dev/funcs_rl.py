@@ -6,6 +6,14 @@ import cloudpickle
 import torch
 from torch import nn
 
+from .funcs_np import (
+  normalize, clip_obs, get_obs, get_control_action, action2cmd, 
+  Action, DISC_ACTIONS, FCModelBase
+)
+
+LSTMState = collections.namedtuple('LSTMState', 'h c')
+
+
 def get_activation(act_name, **kwargs):
   activations = {
     None: lambda x: x,
@@ -45,6 +53,77 @@ def tree_map(func, tree, *args, is_leaf=None, level=None):
     return func(tree, *args)
 
 
+class RNNLayer(nn.Module):
+  def __init__(self, inputs_dim, outputs_dim, rnn_type, rnn_layers=1, rnn_init='orthogonal', rnn_norm=False):
+    super(RNNLayer, self).__init__()
+    self.rnn_type = rnn_type
+    self._rnn_layers = rnn_layers
+
+    if rnn_type == 'lstm':
+      self.rnn = nn.LSTM(inputs_dim, outputs_dim, num_layers=self._rnn_layers)
+    elif rnn_type == 'gru':
+      self.rnn = nn.GRU(inputs_dim, outputs_dim, num_layers=self._rnn_layers)
+    else:
+      raise NotImplementedError(rnn_type)
+    if rnn_norm:
+      self.norm = nn.LayerNorm(outputs_dim)
+    else:
+      self.norm = None
+
+  def forward(self, x, state, reset):
+    # Let's figure out which steps in the sequence have a zero for any agent
+    # We will always assume t=0 has a zero in it as that makes the logic cleaner
+    is_reset = ((reset[1:] == 1.0)
+                .any(dim=-1)
+                .nonzero()
+                .squeeze()
+                .cpu())
+
+    # +1 to correct the reset[1:]
+    if is_reset.dim() == 0:
+      # Deal with scalar
+      is_reset = [is_reset.item() + 1]
+    else:
+      is_reset = (is_reset + 1).numpy().tolist()
+
+    # # add t=0 and t=T to the list
+    is_reset = [0] + is_reset + [x.size(0)]
+
+    outputs = []
+    for i in range(len(is_reset) - 1):
+      # We can now process steps that don't have any zeros in masks together!
+      # This is much faster
+      start_idx = is_reset[i]
+      end_idx = is_reset[i + 1]
+      mask = 1 - reset[start_idx].unsqueeze(-1).contiguous()
+      state = tree_map(lambda x: (x * mask).contiguous(), state)
+      h, state = self.rnn(x[start_idx:end_idx], state)
+      outputs.append(h)
+
+    # assert len(outputs) == T
+    # x is a (T, N, -1) tensor
+    x = torch.cat(outputs, dim=0)
+
+    if self.norm:
+      x = self.norm(x)
+    if self.rnn_type == 'lstm':
+      state = LSTMState(*state)
+
+    return x, state
+
+  def step(self, x, state):
+    # 推理时每帧只走一步：x 是 (N, D)，state 直接用 nn.LSTM / nn.GRU 的布局 (layers, N, units)，
+    # 不扫 reset、不分段、不 permute，也就没有 .cpu() 这样的主机同步
+    x, state = self.rnn(x.unsqueeze(0), state)
+    x = x.squeeze(0)
+    if self.norm:
+      x = self.norm(x)
+    if self.rnn_type == 'lstm':
+      state = LSTMState(*state)
+
+    return x, state
+
+
 def _prepare_for_rnn(x):
   if x is None:
     return x, None
@@ -115,8 +194,17 @@ class MLP(nn.Module):
     self.rnn_type = rnn_type
     self.rnn_layers = rnn_layers
     self.rnn_units = rnn_units
-    self.rnn = None
-    input_dim = u
+    if rnn_type is None:
+      self.rnn = None
+      input_dim = u
+    else:
+      self.rnn = RNNLayer(
+        u, rnn_units, rnn_type, 
+        rnn_layers=rnn_layers, 
+        rnn_init=rnn_init, 
+        rnn_norm=rnn_norm
+      )
+      input_dim = rnn_units
     
     if out_size is not None:
       self.out_layer = nn.Linear(input_dim, out_size)
@@ -124,10 +212,47 @@ class MLP(nn.Module):
       self.out_layer = None
 
   def forward(self, x, reset=None, state=None):
+    if self.rnn is None:
+      x = self.layers(x)
+      if self.out_layer is not None:
+        x = self.out_layer(x)
+      return x
+    else:
+      x = self.layers(x)
+      x, shape = _prepare_for_rnn(x)
+      reset, _ = _prepare_for_rnn(reset)
+      if state is None:
+        if self.rnn_type == 'lstm':
+          state = LSTMState(
+            torch.zeros(shape[1], shape[2], self.rnn_layers, self.rnn_units).to(device=x.device), 
+            torch.zeros(shape[1], shape[2], self.rnn_layers, self.rnn_units).to(device=x.device)
+          )
+        else:
+          state = torch.zeros(shape[1], shape[2], self.rnn_layers, self.rnn_units).to(device=x.device)
+      state = _prepare_rnn_state(state, (self.rnn_layers, shape[1] * shape[2], self.rnn_units))
+      x, state = self.rnn(x, state, reset)
+      x = _recover_shape(x, shape)
+      state = _recover_rnn_state(state, (shape[1], shape[2], self.rnn_layers, self.rnn_units))
+      if self.out_layer is not None:
+        x = self.out_layer(x)
+      return x, state
+
+  def initial_state(self, n, device='cpu'):
+    """ step 用的全零状态，布局 (layers, n, units) """
+    if self.rnn is None:
+      return None
+    zeros = lambda: torch.zeros(self.rnn_layers, n, self.rnn_units, device=device)
+    if self.rnn_type == 'lstm':
+      return LSTMState(zeros(), zeros())
+    return zeros()
+
+  def step(self, x, state=None):
     x = self.layers(x)
+    if self.rnn is not None:
+      x, state = self.rnn.step(x, state)
     if self.out_layer is not None:
-        x = self.out_layer(x)
-    return x
+      x = self.out_layer(x)
+    return x, state
 
 
 class CategoricalOutput(nn.Module):
@@ -255,44 +380,59 @@ class Policy(nn.Module):
       outs[name] = d
     return outs, state
 
-
-def expand_dims_match(x: np.ndarray, target: np.ndarray):
-  """ Expands dimensions of x to match target,
-  an efficient implementation of the following process 
-    while len(x.shape) < len(target.shape):
-      x = np.expand_dims(x, -1)
-  """
-  if x.ndim == target.ndim:
-    return x
-  elif x.shape == target.shape[-x.ndim:]:
-    # adding axes to the front
-    return x[(*(None,)*(target.ndim - x.ndim), *[slice(None) for _ in x.shape])]
-  elif x.shape == target.shape[:x.ndim]:
-    # adding axes to the end
-    return x[(*[slice(None) for _ in x.shape], *(None,)*(target.ndim - x.ndim))]
-  else:
-    raise ValueError(f'Incompatible shapes: {(x.shape, target.shape)}')
+  def step(self, x, state=None, action_mask=None):
+    """ 单步推理，x: (N, obs_dim)，state 的布局见 MLP.initial_state """
+    x, state = self.net.step(x, state)
+    outs = {}
+    for name, layer in self.heads.items():
+      if self.use_action_mask.get(name, False):
+        outs[name] = layer(x, action_mask=action_mask[name])
+      else:
+        outs[name] = layer(x)
+    return outs, state
 
 
-def normalize(x, mean, std, zero_center=True, clip=None, mask=None, 
-        dim_mask=None, np=np):
-  """ Normalize x using mean and std
-  mask chooses which samples to apply normalization
-  dim_mask masks out dimensions with small variance
+class StatefulPolicy:
+  """ 对战时用的循环策略：每架飞机占一个固定槽位，(h, c) 留在这里，每帧调用一次只前进一步。
+  飞机被击落或重新开局时用 reset_slots 把对应槽位清零，其他飞机的状态不受影响。
   """
-  x_new = x
-  dtype = x.dtype
-  if zero_center:
-    x_new = x_new - mean
-  std = std if dim_mask is None else np.where(dim_mask, std, 1.)
-  x_new = x_new / std
-  if clip:
-    x_new = np.clip(x_new, -clip, clip)
-  if mask is not None:
-    mask = expand_dims_match(mask, x_new)
-    x_new = np.where(mask, x_new, x)
-  x = x.astype(dtype)
-  return x_new
+  def __init__(self, policy, n_slots):
+    self.policy = policy.eval()
+    self.n_slots = n_slots
+    self.device = policy.tpdv['device']
+    self.state = policy.net.initial_state(n_slots, self.device)
+
+  def reset_slots(self, slots=None):
+    """ slots: 槽位下标的列表，或者 (n_slots,) 的 bool 数组，None 表示全部清零 """
+    if self.state is None:
+      return
+    if slots is None:
+      self.state = self.policy.net.initial_state(self.n_slots, self.device)
+      return
+    slots = torch.as_tensor(slots, device=self.device)
+    if slots.dtype == torch.bool:
+      keep = (~slots).float().view(1, -1, 1)
+      self.state = tree_map(lambda x: x * keep, self.state)
+    else:
+      self.state = tree_map(lambda x: x.index_fill(1, slots.long(), 0.), self.state)
+
+  @torch.no_grad()
+  def __call__(self, obs, reset=None, action_mask=None):
+    """_summary_
+
+    Args:
+        obs: (n_slots, obs_dim)，已经归一化，死掉的槽位随便填
+        reset: (n_slots,) 的 0/1，这一帧开始前要清零的槽位，乘法实现，不会触发同步
+
+    Returns:
+        outs: {动作名: logits 或 (mean, scale)}
+    """
+    obs = torch.as_tensor(obs, **self.policy.tpdv)
+    if reset is not None and self.state is not None:
+      keep = 1 - torch.as_tensor(reset, **self.policy.tpdv).view(1, -1, 1)
+      self.state = tree_map(lambda x: x * keep, self.state)
+    outs, self.state = self.policy.step(obs, self.state, action_mask)
+    return outs
 
 
 def load_params(path_dir):
@@ -303,79 +443,8 @@ def load_params(path_dir):
   return model_params, rms_params
 
 
-def discrete2continuous(action, n_bins=41):
-  assert np.all(action < n_bins), (action, n_bins)
-  new_action = action * 2 / (n_bins - 1) - 1
-  assert np.all(new_action <= 1) and np.all(new_action >= -1), (action, new_action, n_bins)
-  return new_action
-  
-
-def get_control_action(action):
-  disc_control = np.stack([
-    action[Action.AILERON], 
-    action[Action.ELEVATOR], 
-    action[Action.RUDDER], 
-    action[Action.THROTTLE]
-  ], -1)
-  control = discrete2continuous(disc_control)
-  return control
-
-
-def action2cmd(action):
-  if action is None:
-    return {}
-
-  act = list(action)
-  act[-1] = (act[-1] + 1) / 2
-  cmd = {'control': act}
-  assert 0 <= cmd['control'][-1] <= 1, (cmd['control'])
-
-  return cmd
-
-
-def get_obs(info, target_status):
-  obs = []
-  is_uav = info.is_uav
-  delta_altitude = (target_status[0] - info.height) / 1000
-  delta_velocity = (target_status[1] - info.sp) / 340
-  target_heading = target_status[2]
-  current_heading = info.yaw
-  if target_heading > np.pi and current_heading < 0:
-    current_heading += 2*np.pi
-  elif target_heading < -np.pi and current_heading > 0:
-    current_heading -= 2*np.pi
-  delta_heading = (target_heading - current_heading) / np.pi
-  height = info.height / 10000
-  roll = info.roll / np.pi
-  pitch = info.pitch / np.pi
-  aoa = info.alpha
-  sideslip = info.beta
-  omega = [info.omega_p, info.omega_q, info.omega_r]
-  v_north = info.v_north / 340
-  v_east = info.v_east / 340 
-  v_down = info.v_down / 340  #地向
-  v = info.sp / 340    #地速 空速是tas
-
-  obs = np.array([
-    is_uav,                 # 0. is_uav           (unit: bool)
-    delta_altitude,         # 1. delta_h          (unit: m)
-    delta_velocity,         # 2. delta_v          (unit: m/s)
-    delta_heading,          # 3. delta_heading    (unit: °)
-    height,                 # 4. altitude         (unit: m)
-    roll, pitch,            # 5, 6. roll, pitch   (unit: rad)
-    aoa, sideslip,          # 7, 8. aoa, sideslip (unit: rad)
-    *omega,                 # 9, 10, 11. omega    (unit: rad/s)  
-    v_north,                # 12. v_body_x        (unit: m/s)
-    v_east,                 # 16. v_body_y        (unit: m/s)
-    v_down,                 # 14. v_body_z        (unit: m/s)
-    v,                      # 15. vc              (unit: m/s)
-  ], np.float32)
-
-  return obs
-
-
-class FCModel:
-  def __init__(self, path, obs_dim, is_action_discrete, action_dim):
+class FCModel(FCModelBase):
+  def __init__(self, path, obs_dim, is_action_discrete, action_dim, fused=False):
     model_params, rms_params = load_params(path)
     self.policy = Policy(
       obs_dim, is_action_discrete, action_dim, 
@@ -384,68 +453,78 @@ class FCModel:
     self.is_action_discrete = is_action_discrete
     self.rms_mean = rms_params.mean
     self.rms_std = np.sqrt(rms_params.var + 1e-8)
+    self._stack_heads = all(is_action_discrete.values()) \
+      and len(set(action_dim.values())) == 1
     # print('fc rms mean', self.rms_mean)
     # print('fc rms std', self.rms_std)
+    if fused:
+      self.fuse_normalization()
+
+  def _logits(self, obs):
+    with torch.no_grad():
+      out, _ = self.policy(torch.from_numpy(obs))
+    return np.concatenate([out[k].numpy() for k in self.is_action_discrete], -1)
+
+  def _get_first_layer(self):
+    l = self.policy.net.layers[0][0]
+    return l.weight.detach().numpy().T, l.bias.detach().numpy()
+
+  def _set_first_layer(self, w, b):
+    l = self.policy.net.layers[0][0]
+    with torch.no_grad():
+      l.weight.copy_(torch.from_numpy(w.T))
+      l.bias.copy_(torch.from_numpy(b))
 
   def __call__(self, obs):
     obs = obs.astype(np.float32)
     # print('fc obs', obs)
-    obs = normalize(obs, self.rms_mean, self.rms_std, clip=10)
+    if self.fused:
+      obs = clip_obs(obs, self.obs_low, self.obs_high)
+    else:
+      obs = normalize(obs, self.rms_mean, self.rms_std, clip=10)
     # print('fc norm obs', obs)
     obs = torch.from_numpy(obs)
-    out, _ = self.policy(obs)
-    outs = {}
-    for k, v in self.is_action_discrete.items():
-      if v:
-        outs[k] = torch.distributions.Categorical(logits=out[k]).sample()
-      else:
-        outs[k] = torch.distributions.Normal(*out[k]).sample()
+    with torch.no_grad():
+      out, _ = self.policy(obs)
+      if self._stack_heads:
+        # all heads share the same number of bins, sample them in one call
+        logits = torch.stack([out[k] for k in self.is_action_discrete])
+        actions = torch.distributions.Categorical(logits=logits).sample()
+        return dict(zip(self.is_action_discrete, actions))
+      outs = {}
+      for k, v in self.is_action_discrete.items():
+        if v:
+          outs[k] = torch.distributions.Categorical(logits=out[k]).sample()
+        else:
+          outs[k] = torch.distributions.Normal(*out[k]).sample()
     return outs
   
-  def clip_target(self, target, target_limit=[[1000, 300], [14500, 450]]):
-    target[:2] = np.clip(target[:2], target_limit[0], target_limit[1])
-    assert np.all(target[:2] >= target_limit[0]), target
-    return target
-
-  def get_current_status(self, info):
-    current_status = np.zeros(3)
-    current_status[0] = info.height
-    current_status[1] = info.sp
-    current_status[2] = info.yaw
-    return current_status
-
-  def get_target(self, info, delta):
-    current_status = self.get_current_status(info)
-    target = current_status + delta
-    target = self.clip_target(target)
-    return target
-  
-  def control_cmd_from_obs(self, obs):
-    outs = self(obs)
-    outs = tree_map(lambda x: x.numpy(), outs)
-    # print('outs', outs)
-    control = get_control_action(outs)
-    cmd = action2cmd(control)
-    return cmd
-
-  def control_cmd(self, info, target):
-    obs = get_obs(info, target)
-    cmd = self.control_cmd_from_obs(obs)
-    return cmd
-
-
-class Action:
-  AILERON = 'action_aileron'
-  ELEVATOR = 'action_elevator'
-  RUDDER = 'action_rudder'
-  THROTTLE = 'action_throttle'
+  def _to_numpy(self, outs):
+    return tree_map(lambda x: x.numpy(), outs)
 
 
-DISC_ACTIONS = set([getattr(Action, k) for k in dir(Action) if not k.startswith('__')])
-
-
-def create_fc_model(path):
+def create_fc_model(path, fused=False):
   is_action_discrete = {k: True for k in DISC_ACTIONS}
   action_dim = {k: 41 for k in DISC_ACTIONS}
-  model = FCModel(path, 16, is_action_discrete, action_dim)
-  return model
\ No newline at end of file
+  model = FCModel(path, 16, is_action_discrete, action_dim, fused=fused)
+  return model
+
+
+def export_np_params(path, out_path):
+  """ Exports model.pkl into a plain npz weight bundle, which funcs_np
+  loads without torch
+  """
+  model_params, rms_params = load_params(path)
+  params = {k: v.detach().cpu().numpy() for k, v in model_params.items()}
+  params['rms.mean'] = np.asarray(rms_params.mean)
+  params['rms.var'] = np.asarray(rms_params.var)
+  np.savez(out_path, **params)
+
+
+if __name__ == '__main__':
+  import argparse
+  parser = argparse.ArgumentParser()
+  parser.add_argument('path', help='model.pkl')
+  parser.add_argument('out_path', help='model.npz')
+  args = parser.parse_args()
+  export_np_params(args.path, args.out_path)
@@ -1,5 +1,5 @@
+import math
 import numpy as np
-import torch
 
 # Reformat the print output for easier copying and pasting
 def reformat_array_for_print(name, arr):
@@ -27,37 +27,41 @@ def degrees_limit(angle):
         return angle + 360
     return angle
 
-def estimate_direction_pytorch(positions):
-    """ 使用 PyTorch 进行线性回归估计方向向量 """
-    positions = torch.tensor(positions, dtype=torch.float32)
-    t = torch.arange(positions.size(0), dtype=torch.float32).reshape(-1, 1)
-    t_with_bias = torch.cat([t, torch.ones_like(t)], dim=1)
-
-    # 使用伪逆求解线性回归参数，以防止奇异矩阵错误
-    XTX_pinv = torch.linalg.pinv(t_with_bias.T.matmul(t_with_bias))
-    XTy = t_with_bias.T.matmul(positions)
-    params = XTX_pinv.matmul(XTy)
-    direction = params[:-1].squeeze()  # 不需要截距
-
-    norm = torch.linalg.norm(direction)
+def estimate_direction(positions):
+    """ 线性回归估计方向向量（最小二乘斜率的闭式解），positions: (n, 3) """
+    positions = np.asarray(positions, dtype=np.float64)
+    n = positions.shape[0]
+    t = np.arange(n, dtype=np.float64)
+    denom = n * np.dot(t, t) - t.sum() ** 2
+    if denom <= 0:
+        return np.zeros(positions.shape[1])  # 少于两个点时斜率为0
+    direction = (n * t @ positions - t.sum() * positions.sum(0)) / denom  # 不需要截距
+
+    norm = np.linalg.norm(direction)
     if norm == 0:
-        return direction.numpy()  # 如果方向向量的模为0，返回原向量
-    return (direction / norm).numpy()
-
-def is_facing_target(target_positions, aircraft_positions, debug=False):
-    target_direction = estimate_direction_pytorch(target_positions)
-    aircraft_direction = estimate_direction_pytorch(aircraft_positions)
+        return direction  # 如果方向向量的模为0，返回原向量
+    return direction / norm
 
+def facing_from_directions(target_direction, aircraft_direction, target_last, aircraft_last):
     cos_theta = np.dot(target_direction, aircraft_direction)
 
     # 当两者方向的夹角大于90度时，认为是背对状态
     facing_target = cos_theta < 0
 
     # 预测目标的新位置，注意这里是减去500倍的速度向量
-    target_position = target_positions[-1] - target_direction * 1000
+    target_position = target_last - target_direction * 1000
 
     # 判断飞机是否在目标前方
-    is_ahead_of_target = np.dot(target_direction, aircraft_positions[-1] - target_positions[-1]) > 0
+    is_ahead_of_target = np.dot(target_direction, aircraft_last - target_last) > 0
+
+    return facing_target, cos_theta, target_position, is_ahead_of_target
+
+def is_facing_target(target_positions, aircraft_positions, debug=False):
+    target_direction = estimate_direction(target_positions)
+    aircraft_direction = estimate_direction(aircraft_positions)
+
+    facing_target, cos_theta, target_position, is_ahead_of_target = facing_from_directions(
+        target_direction, aircraft_direction, target_positions[-1], aircraft_positions[-1])
 
     if debug:
         reformat_array_for_print("target: ", target_positions)
@@ -69,6 +73,84 @@ def is_facing_target(target_positions, aircraft_positions, debug=False):
 
     return facing_target, cos_theta, target_position, is_ahead_of_target
 
+class DirectionTrack:
+    """ 单个实体最近window个位置的流式最小二乘。
+    维护 sum(t), sum(t^2), sum(p), sum(t*p)，新样本进来、旧样本出窗口都是O(1)，不用每次重新求解。
+    t 取样本的全局序号（整数，t 与 t^2 的累加和是精确的），斜率与时间原点无关。
+    """
+    def __init__(self, window):
+        self.window = window
+        self.buf = np.zeros((window, 3))
+        self.n = 0      # 窗口内样本数
+        self.t = 0      # 累计加入的样本数
+        self.s_t = 0
+        self.s_tt = 0
+        self.s_p = np.zeros(3)
+        self.s_tp = np.zeros(3)
+
+    def append(self, position):
+        i = self.t % self.window
+        if self.n == self.window:
+            old_t = self.t - self.window
+            old = self.buf[i]
+            self.s_t -= old_t
+            self.s_tt -= old_t * old_t
+            self.s_p -= old
+            self.s_tp -= old_t * old
+        else:
+            self.n += 1
+        self.buf[i] = position
+        p = self.buf[i]
+        self.s_t += self.t
+        self.s_tt += self.t * self.t
+        self.s_p += p
+        self.s_tp += self.t * p
+        self.t += 1
+
+    def last(self):
+        return self.buf[(self.t - 1) % self.window]
+
+    def direction(self):
+        denom = self.n * self.s_tt - self.s_t * self.s_t
+        if denom <= 0:
+            return np.zeros(3)
+        direction = (self.n * self.s_tp - self.s_t * self.s_p) / denom
+        norm = np.linalg.norm(direction)
+        if norm == 0:
+            return direction
+        return direction / norm
+
+class DirectionEstimator:
+    """ 按实体ID维护DirectionTrack，和 is_facing_target(tracks[-window:], ...) 的结果一致 """
+    def __init__(self, window=20):
+        self.window = window
+        self.tracks = {}
+
+    def __contains__(self, key):
+        return key in self.tracks and self.tracks[key].n > 0
+
+    def update(self, key, position):
+        if key not in self.tracks:
+            self.tracks[key] = DirectionTrack(self.window)
+        self.tracks[key].append(position)
+
+    def remove(self, key):
+        self.tracks.pop(key, None)
+
+    def count(self, key):
+        return self.tracks[key].n if key in self.tracks else 0
+
+    def last(self, key):
+        return self.tracks[key].last()
+
+    def direction(self, key):
+        return self.tracks[key].direction()
+
+    def is_facing_target(self, target_key, aircraft_key):
+        target, aircraft = self.tracks[target_key], self.tracks[aircraft_key]
+        return facing_from_directions(
+            target.direction(), aircraft.direction(), target.last(), aircraft.last())
+
 
 if __name__ == "__main__":
     # 导弹轨迹数据
@@ -4,9 +4,13 @@ import os
 from sturnus.geo import *
 import warnings
 from .blue_agent_demo import Agent as BaseAgent
-from .funcs_pid import FlyPid,fly_with_alt_yaw_vel  # 确保 FlyPid 模块正确引用
-from .funcs_rule import Vector3, degrees_limit, is_facing_target
-from .funcs_rl import create_fc_model
+from .funcs_pid import FlyPid, GainSchedule, fly_with_alt_yaw_vel  # 确保 FlyPid 模块正确引用
+from .funcs_rule import Vector3, degrees_limit, DirectionEstimator
+from .funcs_np import create_np_fc_model
+from .funcs_track import TrackStore, KalmanTracker, MISSILE_VEL_VAR
+from .funcs_geo import closest_approach, assess_threats, pairwise_geometry
+from .funcs_assign import assign, assign_weapons, distance_cost, engagement_cost
+from .funcs_lar import LaunchTable, in_launch_gates
 
 class Agent(BaseAgent):
     def __init__(self, side):
@@ -29,12 +33,18 @@ class Agent(BaseAgent):
         self.assigned_targets = {}  # 存储每个飞机分配的目标点
         self.use_fake_heat_zone = {}  # 每个飞机是否使用假热区
 
+        self.human_plane_id_list = []
         self.uav_plane_id_list = []
+        self.assign_interval = 100  # 每隔多少帧重新分配一次假热区
+        self.weapon_targets = {}  # 飞机ID -> {弹种: 目标ID}，每帧由 assign_weapon_targets 更新
         self.full_enemy_plane_id_list = []
-        self.myplane_tracks = {}  # 记录我方每架飞机的轨迹
-        self.enemy_plane_tracks = {} # 记录敌方每架飞机的轨迹
-        self.missile_tracks = {}  # 记录每个导弹的轨迹
-        self.missile_plane_distance_tracks = {}
+        self.myplane_tracks = TrackStore()  # 记录我方每架飞机的轨迹（只保留最近64个点）
+        self.enemy_plane_tracks = TrackStore() # 记录敌方每架飞机的轨迹
+        self.missile_tracks = TrackStore()  # 记录每个导弹的轨迹
+        self.direction_20 = DirectionEstimator(20)  # 滑动窗口回归的方向估计，等价于对 tracks[-20:] 做回归
+        self.direction_10 = DirectionEstimator(10)
+        self.enemy_kalman = KalmanTracker('cv')  # 融合三个来源的敌机航迹，平滑后的位置/速度
+        self.missile_kalman = KalmanTracker('ca', noise_std=100.)  # 来袭导弹的航迹
 
         self.expired_missiles = set()  # 存储过时的导弹 ID
         self.dangerous_missiles = set()
@@ -46,8 +56,13 @@ class Agent(BaseAgent):
         self.mid_lock_time = 0
 
         current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, "model.pkl")
-        self.rl_fc_model = create_fc_model(model_path)
+        model_path = os.path.join(current_dir, "model.npz")  # 由funcs_rl.export_np_params从model.pkl导出，推理不再依赖torch
+        self.rl_fc_model = create_np_fc_model(model_path, fused=True)
+        self.launch_table = LaunchTable(os.path.join(current_dir, "lar.npz"))  # 由 arena/lar.py 离线生成
+        self.launch_threshold = 0.5  # 查表命中概率不低于它才发射
+        # 增益表（由 arena/gain_schedule.py 离线生成）只在 6 自由度代理模型上调过，真仿真里验证之前默认不用，飞控用 FlyPid 的手调增益
+        self.use_gain_schedule = False
+        self.gain_schedule = GainSchedule(os.path.join(current_dir, "gain_schedule.npz")) if self.use_gain_schedule else None
         self.rl_targets = {}
         self.use_this_rl_target_times = {}
     
@@ -61,33 +76,37 @@ class Agent(BaseAgent):
         return math.sqrt(
             (missile_info.x - plane_info.x) ** 2 +
             (missile_info.y - plane_info.y) ** 2 +
-            (missile_info.y - plane_info.z) ** 2
+            (missile_info.z - plane_info.z) ** 2
         )
     
-    def assign_targets(self, obs, debug=False):
-        # 初始化目标分配
-        human_plane_ids = [my_id for my_id, my_plane in obs.my_planes.items() if not my_plane.is_uav]
-        self.uav_plane_id_list = [my_id for my_id, my_plane in obs.my_planes.items() if my_plane.is_uav]
+    def assign_targets(self, obs, plane_ids=None, debug=False):
+        """ 把假热区分给飞机，有人机和无人机各自求一次总距离最小的分配
+
+        Args:
+            plane_ids (list): 只重新分配这些飞机，None 表示开局时全部分配
+        """
+        if plane_ids is None:
+            # 初始化目标分配
+            self.human_plane_id_list = [my_id for my_id, my_plane in obs.my_planes.items() if not my_plane.is_uav]
+            self.uav_plane_id_list = [my_id for my_id, my_plane in obs.my_planes.items() if my_plane.is_uav]
+            plane_ids = list(obs.my_planes.keys())
+            for my_id in plane_ids:
+                self.use_fake_heat_zone[my_id] = True
+                self.phase[my_id] = 1
 
         # 提取 fake_heat_zone 中的目标点
-        human_targets = ["av1", "av2"]
-        uav_targets = ["uav1", "uav2", "uav3", "uav4"]
-
-        # 分配给有人机
-        for my_id in human_plane_ids:
-            closest_target = min(human_targets, key=lambda t: self.calculate_distance_3d(obs.my_planes[my_id], self.fake_head_zone_center_dict[t]))
-            self.assigned_targets[my_id] = self.fake_head_zone_center_dict[closest_target]
-            self.use_fake_heat_zone[my_id] = True
-            human_targets.remove(closest_target)
-            self.phase[my_id] = 1
-
-        # 分配给无人机
-        for my_id in self.uav_plane_id_list:
-            closest_target = min(uav_targets, key=lambda t: self.calculate_distance_3d(obs.my_planes[my_id], self.fake_head_zone_center_dict[t]))
-            self.assigned_targets[my_id] = self.fake_head_zone_center_dict[closest_target]
-            self.use_fake_heat_zone[my_id] = True
-            uav_targets.remove(closest_target)
-            self.phase[my_id] = 1
+        groups = [(self.human_plane_id_list, ["av1", "av2"]), (self.uav_plane_id_list, ["uav1", "uav2", "uav3", "uav4"])]
+        for group_ids, zone_names in groups:
+            ids = [my_id for my_id in group_ids if my_id in plane_ids and my_id in obs.my_planes]
+            if not ids:
+                continue
+            zones = [self.fake_head_zone_center_dict[t] for t in zone_names]
+            cost = distance_cost([[obs.my_planes[my_id].x, obs.my_planes[my_id].y, obs.my_planes[my_id].z] for my_id in ids],
+                                 [[zone.x, zone.y, zone.z] for zone in zones])
+            # 飞机比区域多时允许共用，但先分散开
+            capacity = -(-len(ids) // len(zones))
+            for my_id, k in zip(ids, assign(cost, capacity=capacity, repeat_penalty=1e5)):
+                self.assigned_targets[my_id] = zones[k]
 
         # 打印分配结果
         if debug:
@@ -95,6 +114,43 @@ class Agent(BaseAgent):
             for my_id, target in self.assigned_targets.items():
                 print(f"飞机ID: {my_id}, 目标: {[target.x,target.y,target.z]}")
 
+    def assign_weapon_targets(self, obs, shooter_ids):
+        """ 全编队一起给中距弹 / 近距弹分配目标：锁定、满足原来的距离和角度条件、且查发射区表命中概率够高的配对才可行，
+        多架飞机锁定同一目标时会尽量分散到不同目标上
+
+        Args:
+            shooter_ids (list): 这一帧基类指令里有 'weapon' 的飞机，只有它们参与分配
+        """
+        my_ids = list(obs.my_planes.keys())
+        can_fire = [my_id in shooter_ids for my_id in my_ids]
+        self.weapon_targets = {my_id: {} for my_id in my_ids}
+        my_positions = [[p.x, p.y, p.z] for p in obs.my_planes.values()]
+        my_velocities = [[p.v_north, p.v_east, p.v_down] for p in obs.my_planes.values()]
+        for missile_type, lock_attr in (('mid_missile', 'mid_lock_list'), ('short_missile', 'short_lock_list')):
+            target_ids = sorted({target_id for my_plane in obs.my_planes.values() for target_id in getattr(my_plane, lock_attr)
+                                 if target_id in self.enemy_kalman})
+            if not target_ids:
+                continue
+            target_index = {target_id: j for j, target_id in enumerate(target_ids)}
+            locked = np.zeros((len(my_ids), len(target_ids)), dtype=bool)
+            for i, my_plane in enumerate(obs.my_planes.values()):
+                for target_id in getattr(my_plane, lock_attr):
+                    if target_id in target_index:
+                        locked[i, target_index[target_id]] = True
+            # 敌机位置和速度用卡尔曼航迹，高度差 = 目标高度 - 我方高度 = -(z_目标 - z_我方)
+            geo = pairwise_geometry(my_positions, self.enemy_kalman.positions(target_ids),
+                                    my_velocities, self.enemy_kalman.velocities(target_ids))
+            hit_prob = self.launch_table.lookup(missile_type, geo.dist_3d, geo.aspect, -geo.rel[..., 2], geo.closure_rate)
+            # 进入角来自航迹速度，刚起始的航迹速度还没收敛（初值为 0）时不打
+            vel_var = self.enemy_kalman.covariances(target_ids)[:, 3:6, 3:6].trace(axis1=1, axis2=2)
+            converged = vel_var < 3 * 50 ** 2
+            feasible = (locked & in_launch_gates(missile_type, geo.dist_3d, geo.cos_theta)
+                        & (hit_prob >= self.launch_threshold) & converged)
+            missiles_left = [my_plane.loadout.get(missile_type, 0) for my_plane in obs.my_planes.values()]
+            cost = engagement_cost(geo.dist_3d, geo.cos_theta, missiles_left, feasible, hit_prob)
+            for my_id, j in zip(my_ids, assign_weapons(can_fire, cost, repeat_penalty=1.)):
+                if j >= 0:
+                    self.weapon_targets[my_id][missile_type] = target_ids[j]
 
     def get_action_cmd(self, target, plane, mode="fix_point", debug=False):
         """_summary_
@@ -184,57 +240,35 @@ class Agent(BaseAgent):
 
     def get_weapon_launch_info(self, obs, my_plane, debug=False):
         weapon_launch_info = {}
-        if len(my_plane.mid_lock_list)>0 and my_plane.loadout.get('mid_missile', 0)>0:
-                best_target = None
-                min_distance = float('inf')
-                for target_id in my_plane.mid_lock_list:
-                    if target_id in self.enemy_plane_tracks:
-                        target_positions = np.array(self.enemy_plane_tracks[target_id][-20:])
-                        aircraft_positions = np.array(self.myplane_tracks[my_plane.ind][-20:])
-                        _, cos_theta, _, _ = is_facing_target(target_positions, aircraft_positions, debug=debug)
-                        
-                        if cos_theta > 0.3:
-                            distance = self.calculate_distance_3d(Vector3(*aircraft_positions[-1]), Vector3(*target_positions[-1]))
-                            if distance < min_distance and distance < 30000:
-                                min_distance = distance
-                                best_target = target_id
-
-                if best_target:
-                    weapon_launch_info = {
-                        'type': 'mid_missile',
-                        'target': best_target
-                    }
-                    self.mid_missile_time[my_plane.ind] = obs.sim_time
-
-        if len(my_plane.short_lock_list)>0 and my_plane.loadout.get('short_missile', 0)>0:
-                best_target = None
-                min_distance = float('inf')
-                for target_id in my_plane.short_lock_list:
-                    if target_id in self.enemy_plane_tracks:
-                        target_positions = np.array(self.enemy_plane_tracks[target_id][-20:])
-                        aircraft_positions = np.array(self.myplane_tracks[my_plane.ind][-20:])
-                        _, cos_theta, _, _ = is_facing_target(target_positions, aircraft_positions,debug=debug)
-                        
-                        if cos_theta > -0.3:
-                            distance = self.calculate_distance_3d(Vector3(*aircraft_positions[-1]), Vector3(*target_positions[-1]))
-                            if distance < min_distance:
-                                min_distance = distance
-                                best_target = target_id
-
-                if best_target:
-                    weapon_launch_info = {
-                        'type': 'short_missile',
-                        'target': best_target
-                    }
-                    self.short_missile_time[my_plane.ind] = obs.sim_time
+        targets = self.weapon_targets.get(my_plane.ind, {})
+        if 'mid_missile' in targets:
+            weapon_launch_info = {
+                'type': 'mid_missile',
+                'target': targets['mid_missile']
+            }
+            self.mid_missile_time[my_plane.ind] = obs.sim_time
+
+        if 'short_missile' in targets:
+            weapon_launch_info = {
+                'type': 'short_missile',
+                'target': targets['short_missile']
+            }
+            self.short_missile_time[my_plane.ind] = obs.sim_time
 
         return weapon_launch_info
 
+    def forget_missile(self, missile_id):
+        """ 导弹失效或消失后清掉它的所有记录 """
+        self.missile_tracks.remove(missile_id)
+        self.direction_10.remove(missile_id)
+        self.missile_kalman.remove(missile_id)
+        self.dangerous_missiles.discard(missile_id)
+
     def update_enemy_plane_tracks(self, obs):
         if len(obs.awacs_infos) and len(self.full_enemy_plane_id_list)==0:
             for awacs_i in obs.awacs_infos:
                 self.full_enemy_plane_id_list.append(awacs_i.ind)
-                self.enemy_plane_tracks[awacs_i.ind] = []
+                self.enemy_plane_tracks.add(awacs_i.ind)
         
         if len(obs.awacs_infos):
             alive_enemy_inds = [awacs_i.ind for awacs_i in obs.awacs_infos]
@@ -242,30 +276,43 @@ class Agent(BaseAgent):
                 if enemy_id not in alive_enemy_inds:
                     # 如果敌机不再活跃，从跟踪列表中移除该敌机的跟踪信息
                     if enemy_id in self.enemy_plane_tracks:
-                        del self.enemy_plane_tracks[enemy_id]
+                        self.enemy_plane_tracks.remove(enemy_id)
+                        self.direction_20.remove(enemy_id)
+                    self.enemy_kalman.remove(enemy_id)
                     # 同时从全敌机列表中移除该敌机
                     self.full_enemy_plane_id_list.remove(enemy_id)
 
             percise_visible_enemy_ids = set()
             for enemy_id, enemy_plane in obs.enemy_planes.items():
-                self.enemy_plane_tracks[enemy_id].append([enemy_plane.x, enemy_plane.y, enemy_plane.z])
+                self.enemy_plane_tracks.append(enemy_id, [enemy_plane.x, enemy_plane.y, enemy_plane.z], obs.sim_time)
+                self.direction_20.update(enemy_id, [enemy_plane.x, enemy_plane.y, enemy_plane.z])
                 percise_visible_enemy_ids.add(enemy_id)
 
             rws_visible_enemy_ids = set()
             for entity_info in obs.rws_infos:
                 if entity_info.ind in self.full_enemy_plane_id_list and entity_info.ind not in percise_visible_enemy_ids:
-                    self.enemy_plane_tracks[entity_info.ind].append([entity_info.x, entity_info.y, entity_info.z])
+                    self.enemy_plane_tracks.append(entity_info.ind, [entity_info.x, entity_info.y, entity_info.z], obs.sim_time)
+                    self.direction_20.update(entity_info.ind, [entity_info.x, entity_info.y, entity_info.z])
                     rws_visible_enemy_ids.add(entity_info.ind)
 
             for entity_info in obs.awacs_infos:
                 if entity_info.ind in self.full_enemy_plane_id_list and entity_info.ind not in percise_visible_enemy_ids and \
                     entity_info.ind not in rws_visible_enemy_ids:
-                    self.enemy_plane_tracks[entity_info.ind].append([entity_info.x, entity_info.y, entity_info.z])
+                    self.enemy_plane_tracks.append(entity_info.ind, [entity_info.x, entity_info.y, entity_info.z], obs.sim_time)
+                    self.direction_20.update(entity_info.ind, [entity_info.x, entity_info.y, entity_info.z])
+
+            # 卡尔曼航迹：先整体外推，再按精度从低到高依次用三个来源更新
+            self.enemy_kalman.predict(obs.sim_time)
+            self.enemy_kalman.update_infos(
+                [e for e in obs.awacs_infos if e.ind in self.full_enemy_plane_id_list], 'awacs_infos')
+            self.enemy_kalman.update_infos(
+                [e for e in obs.rws_infos if e.ind in self.full_enemy_plane_id_list], 'rws_infos')
+            self.enemy_kalman.update_infos(obs.enemy_planes.values(), 'enemy_planes', use_vel=True)
                 
-            max_length = max((len(tracks) for tracks in self.enemy_plane_tracks.values()), default=0)
+            max_length = max((self.enemy_plane_tracks.count(enemy_id) for enemy_id in self.enemy_plane_tracks.keys()), default=0)
             # print("max_length: ", max_length)
-            for enemy_id, tracks in self.enemy_plane_tracks.items():
-                if len(tracks) < max_length:
+            for enemy_id in self.enemy_plane_tracks.keys():
+                if self.enemy_plane_tracks.count(enemy_id) < max_length:
                     warnings.warn("各存活敌机的位置记录不可能时间戳对不齐", UserWarning)
                 
 
@@ -277,18 +324,58 @@ class Agent(BaseAgent):
 
         if self.run_counts == 0:
             self.assign_targets(obs,debug=debug_flag)
+        elif self.run_counts % self.assign_interval == 0:
+            # 还在飞向假热区的飞机按当前位置重新分配
+            self.assign_targets(obs, [my_id for my_id in obs.my_planes if self.use_fake_heat_zone.get(my_id)])
 
         self.update_enemy_plane_tracks(obs)
         raw_cmd_dict =  super().step(obs)
 
-        for my_id, my_plane in obs.my_planes.items():
+        # 我方所有飞机的位置一次性写入轨迹
+        my_ids = list(obs.my_planes.keys())
+        my_positions = [[p.x, p.y, p.z] for p in obs.my_planes.values()]
+        # 整个机队一次查增益表（机型、高度带、马赫数带），每架飞机一行；不用增益表时每架飞机给 None
+        gain_rows = [None] * len(my_ids)
+        if self.gain_schedule is not None:
+            gain_rows = self.gain_schedule.lookup([p.is_uav for p in obs.my_planes.values()],
+                                                  [p.height for p in obs.my_planes.values()],
+                                                  [p.mach for p in obs.my_planes.values()])
+        self.myplane_tracks.extend(my_ids, my_positions, obs.sim_time)
+        for my_id, position in zip(my_ids, my_positions):
+            self.direction_20.update(my_id, position)
+            self.direction_10.update(my_id, position)
+        self.assign_weapon_targets(obs, [my_id for my_id in my_ids if 'weapon' in raw_cmd_dict[my_id]])
+
+        # 来袭导弹的卡尔曼航迹，没被告警的帧只外推，太久没出现的（命中或自毁）直接丢掉
+        missile_infos = [e for e in obs.rws_infos
+                         if e.ind not in self.full_enemy_plane_id_list and e.ind not in self.expired_missiles]
+        self.missile_kalman.update_infos(missile_infos, 'rws_infos', t=obs.sim_time)
+        for missile_id in [k for k in self.missile_kalman.keys() if self.missile_kalman.age(k) > 5]:
+            self.forget_missile(missile_id)
+
+        # 我方飞机 x 来袭导弹的最近接近点每帧只算一次，导弹速度取卡尔曼航迹
+        missile_ids = [e.ind for e in missile_infos]
+        alarm = np.array([[my_id in e.alarm_ind_list for e in missile_infos] for my_id in my_ids],
+                         dtype=bool).reshape(len(my_ids), len(missile_infos))
+        my_velocities = [[p.v_north, p.v_east, p.v_down] for p in obs.my_planes.values()]
+        threat_cpa = closest_approach(my_positions, my_velocities,
+                                      self.missile_kalman.positions(missile_ids), self.missile_kalman.velocities(missile_ids))
+        # 速度估计还没收敛的新航迹（速度从 0 起步）既不排威胁也不判失效
+        vel_var = self.missile_kalman.covariances(missile_ids)[:, 3:6, 3:6].trace(axis1=1, axis2=2)
+        threat_order, is_threat, expired = assess_threats(threat_cpa, alarm, vel_var < MISSILE_VEL_VAR)
+
+        # 危险过、对所有告警对象都在远离的导弹判为失效
+        for j in np.flatnonzero(expired):
+            if missile_ids[j] in self.dangerous_missiles:
+                self.expired_missiles.add(missile_ids[j])
+                self.forget_missile(missile_ids[j])
+                if debug_flag:
+                    print("expired_missiles: ", self.expired_missiles)
+
+        for i, (my_id, my_plane) in enumerate(obs.my_planes.items()):
             if not self.ini_pid or my_id not in self.id_pidctl_dict:
                 self.id_pidctl_dict[my_id] = FlyPid()
 
-            if my_id not in self.myplane_tracks:
-                self.myplane_tracks[my_id] = []
-            self.myplane_tracks[my_id].append([my_plane.x, my_plane.y, my_plane.z])
-
             if my_id not in self.rl_targets:
                 self.rl_targets[my_id] = None
             if my_id not in self.use_this_rl_target_times:
@@ -308,42 +395,30 @@ class Agent(BaseAgent):
                 self.phase[my_id] = 2
             
             closest_missile = None
-            for entity_info in obs.rws_infos:
-                if entity_info.ind in self.full_enemy_plane_id_list or entity_info.ind in self.expired_missiles:
+            for j, entity_info in enumerate(missile_infos):
+                if alarm[i, j] and entity_info.ind not in self.expired_missiles:
+                    self.missile_tracks.append(entity_info.ind, [entity_info.x, entity_info.y, entity_info.z], obs.sim_time)
+                    self.direction_10.update(entity_info.ind, [entity_info.x, entity_info.y, entity_info.z])
+
+            # 判断威胁：按到最近点的时间从近到远看，第一枚在我们前方的就是要躲的
+            for j in threat_order[i]:
+                if not is_threat[i, j]:
+                    break
+                entity_info = missile_infos[j]
+                if entity_info.ind in self.expired_missiles or threat_cpa.dist_2d[i, j] >= 35000:
                     continue
-
-                if my_id in entity_info.alarm_ind_list:
-                    distance = self.calculate_distance_3d(my_plane, entity_info)
-                    if entity_info.ind not in self.missile_tracks:
-                        self.missile_tracks[entity_info.ind] = []
-                        self.missile_plane_distance_tracks[entity_info.ind] = []
-                    self.missile_tracks[entity_info.ind].append([entity_info.x, entity_info.y, entity_info.z])
-                    self.missile_plane_distance_tracks[entity_info.ind].append(distance)
-
-                    if entity_info.ind in self.dangerous_missiles and len(self.missile_plane_distance_tracks[entity_info.ind]) > 40:
-                        if self.missile_plane_distance_tracks[entity_info.ind][-1] - self.missile_plane_distance_tracks[entity_info.ind][0] > 1000:
-                            self.expired_missiles.add(entity_info.ind)
-                            if debug_flag:
-                                print("expired_missiles: ",self.expired_missiles)
-                            continue
-
-                    # 判断威胁
-                    if (closest_missile is None or distance < self.calculate_distance_3d(my_plane, closest_missile)) and \
-                            (self.calculate_distance_2d(my_plane, entity_info) < 35000):
-                        self.dangerous_missiles.add(entity_info.ind)
-                        if len(self.missile_tracks[entity_info.ind])>10:
-                            _, _, _, is_ahead_of_enemy = is_facing_target(np.array(self.missile_tracks[entity_info.ind][-10:]), 
-                                                        np.array(self.myplane_tracks[my_plane.ind][-10:]))
-                            if is_ahead_of_enemy: # TODO: 有危险了就不要再走阵型了，至少有人机赶紧开战
-                                closest_missile = entity_info
-                                for uav_id in self.uav_plane_id_list:
-                                    self.phase[uav_id] = 2
-                                    self.use_fake_heat_zone[uav_id] = False
-                                
+                self.dangerous_missiles.add(entity_info.ind)
+                if self.missile_tracks.count(entity_info.ind)>10:
+                    _, _, _, is_ahead_of_enemy = self.direction_10.is_facing_target(entity_info.ind, my_plane.ind)
+                    if is_ahead_of_enemy: # TODO: 有危险了就不要再走阵型了，至少有人机赶紧开战
+                        closest_missile = entity_info
+                        for uav_id in self.uav_plane_id_list:
+                            self.phase[uav_id] = 2
+                            self.use_fake_heat_zone[uav_id] = False
+                        break
 
             if closest_missile:
-                _, cos_theta, can_face_target_position, _ = is_facing_target(np.array(self.missile_tracks[closest_missile.ind][-10:]), 
-                                                        np.array(self.myplane_tracks[my_plane.ind][-10:]),debug=debug_flag) 
+                _, cos_theta, can_face_target_position, _ = self.direction_10.is_facing_target(closest_missile.ind, my_plane.ind)
                 
                 if cos_theta < 0.5:
                     if debug_flag:
@@ -351,7 +426,7 @@ class Agent(BaseAgent):
                     target_pos = Vector3(can_face_target_position[0],can_face_target_position[1],my_plane.z)
                     action = self.get_action_cmd(target_pos, my_plane, "missile", debug = debug_flag)
                     action[0] = 1  # 不改变高度可以让转向加快
-                    raw_cmd_dict[my_id]['control'] = fly_with_alt_yaw_vel(my_plane, action, self.id_pidctl_dict[my_id])
+                    raw_cmd_dict[my_id]['control'] = fly_with_alt_yaw_vel(my_plane, action, self.id_pidctl_dict[my_id], gain_rows[i])
                 else:
                     if debug_flag:
                         print("不太好躲!!! 不躲了!!!")
@@ -373,7 +448,7 @@ class Agent(BaseAgent):
             if self.phase[my_id] == 1:
                 target_pos = self.assigned_targets[my_id]
                 action = self.get_action_cmd(target_pos, my_plane, "fix_point", debug = debug_flag)
-                raw_cmd_dict[my_id]['control'] = fly_with_alt_yaw_vel(my_plane, action, self.id_pidctl_dict[my_id])
+                raw_cmd_dict[my_id]['control'] = fly_with_alt_yaw_vel(my_plane, action, self.id_pidctl_dict[my_id], gain_rows[i])
             
             if my_plane.z > 6500:
                 if debug_flag:
@@ -0,0 +1,294 @@
+import argparse
+import time
+
+import numpy as np
+
+from .control import FlyPidBank, fly_with_alt_yaw_vel_arrays, norm_delta_altitude, norm_delta_heading
+from .flight_model import FighterDynamics
+from .jsbsim_xml import load_aircraft
+
+'''
+fly_with_alt_yaw_vel 的 PID 增益离线自动调参
+'''
+# FlyPid 的增益原来是手调的。这里把 (增益组 x 初始状态 x 机动) 的所有组合放进同一个 FighterDynamics 里，
+# 每一帧用 fly_with_alt_yaw_vel_arrays（和智能体里的 batch 版本同一套逻辑，增益按行不同）给所有飞机算指令，
+# 一次推进几千架飞机的闭环。每个机动前半段给一个阶跃动作，后半段改回平飞，对滚转、俯仰两个轴分别算
+# 上升时间、超调和跟踪误差（都是对整个 (帧数, 飞机数) 数组的向量化运算），加权成一个代价。
+# 搜索用 CMA-ES，在 log10(增益) 空间里进行，初始均值是现在手调的增益。
+# 只调 aileron、elevator 两个通道：FlyPid 里 rudder、throttle 的 PID 没有接到输出上。
+# 仿真里有人机和无人机用的是同一个 fighter.xml，区别只在 AIRFRAMES 的动力学参数（无人机按半油算），
+# 拿到真仿真的机型数据后改这里再重新跑。
+# 用法：
+#   python -m arena.autotune -o agents/houlang_dev/pid_gains.npz
+
+GAIN_NAMES = ['aileron_Kp', 'aileron_Ki', 'aileron_Kd', 'elevator_Kp', 'elevator_Ki', 'elevator_Kd']
+DEFAULT_GAINS = np.array([0.8, 0.01, 0.1, 0.3, 0.02, 0.2])
+
+# 机型 -> FighterDynamics 的 conf 覆盖
+AIRFRAMES = {
+    'manned': {},
+    'uav': {'fuel_fraction': 0.5},
+}
+
+# 初始状态 [高度, 真空速]
+DEFAULT_CONDITIONS = np.array([[3000., 200.], [6000., 250.], [9000., 300.]])
+
+# 机动：前半段的动作 [高度(0-2), 航向(0-6), 速度(0-2)]，后半段都回到平飞 [1, 3, 1]
+MANEUVERS = {
+    'climb': [0, 3, 1],
+    'dive': [2, 3, 1],
+    'left': [1, 0, 1],
+    'right': [1, 6, 1],
+    'climb_right': [0, 5, 1],
+}
+LEVEL_ACTION = [1, 3, 1]
+
+# 代价里各项的权重
+WEIGHTS = {'rise_time': 1., 'overshoot': 2., 'tracking': 1., 'chatter': 0.2, 'departure': 1.}
+# 超出这两个值的迎角、过载算作接近失控，按超出的量（迎角以 5° 为单位，过载以 1g 为单位）计入 departure
+DEPARTURE_ALPHA = np.radians(20.)
+DEPARTURE_NZ = 7.5
+
+
+def targets(actions):
+    """ 动作对应的目标滚转角、俯仰角，和 fly_with_alt_yaw_vel 里的算法一致 """
+    actions = np.asarray(actions, dtype=np.int64).reshape(-1, 3)
+    temp_turn = np.degrees(norm_delta_heading[actions[:, 1]])
+    target_roll = np.where(np.abs(temp_turn) < 4, 0, np.radians(90) * np.abs(temp_turn) / 35 * np.sign(temp_turn))
+    return target_roll, np.arctan2(norm_delta_altitude[actions[:, 0]], 500)
+
+
+def rollout(gains, airframe='manned', conditions=DEFAULT_CONDITIONS, maneuvers=MANEUVERS, duration=10., model=None,
+            dt=1 / 20., elevator_limit=0.7, throttle=0.395):
+    """_summary_
+
+    Args:
+        gains (ndarray): (P, 6) 增益组，顺序同 GAIN_NAMES；(P, C, 6) 时每个初始状态用各自的增益（调增益表用）
+        airframe (str): AIRFRAMES 里的机型
+        conditions (ndarray): (C, 2) 初始 [高度, 真空速]
+        maneuvers (dict): {名字: 前半段动作}
+        duration (float): 每个机动的总时长，一半阶跃、一半回平飞
+        model (AircraftModel): 飞机模型，None 时加载 fighter
+        elevator_limit (float / ndarray): 俯仰指令限幅，标量、(P,) 或 (P, C)
+        throttle (float / str): 保持速度时的油门，'trim' 表示用每个初始状态的配平油门
+
+    Returns:
+        dict: 'roll' / 'pitch' / 'target_roll' / 'target_pitch' / 'alpha' / 'nz' / 'cmd' 都是 (帧数, P, C, M, ...) 的历史，
+              'switch' 是切回平飞的帧号，'dt' 是帧间隔
+    """
+    gains = np.atleast_2d(np.asarray(gains, dtype=np.float64))
+    conditions = np.atleast_2d(np.asarray(conditions, dtype=np.float64))
+    p, c, m = len(gains), len(conditions), len(maneuvers)
+    n = p * c * m
+    dyn = FighterDynamics(n, model, AIRFRAMES[airframe])
+    shape = (p, c, m)
+    index = np.indices(shape).reshape(3, -1)
+    pos = np.zeros((n, 3))
+    pos[:, 2] = dyn.conf['z_ref'] - conditions[index[1], 0]
+    trim = dyn.reset(pos, np.zeros((n, 3)), conditions[index[1], 1])
+    level_throttle = trim if isinstance(throttle, str) and throttle == 'trim' else throttle
+    elevator_limit = np.broadcast_to(np.asarray(elevator_limit, dtype=np.float64).reshape(
+        np.shape(elevator_limit) + (1,) * (3 - np.ndim(elevator_limit))), shape).ravel()
+
+    bank = FlyPidBank(init_planes=n)
+    rows = bank.rows(range(n))
+    per_plane = gains[index[0], index[1]] if gains.ndim == 3 else gains[index[0]]
+    # GAIN_NAMES 的顺序是 [aileron 的 Kp Ki Kd, elevator 的 Kp Ki Kd]，FlyPidBank 的通道是 [aileron, elevator]
+    bank.set_gains(rows, per_plane[:, [0, 3]], per_plane[:, [1, 4]], per_plane[:, [2, 5]])
+
+    steps = int(round(duration / dt))
+    switch = steps // 2
+    step_actions = np.array(list(maneuvers.values()), dtype=np.int64)[index[2]]
+    level_actions = np.tile(LEVEL_ACTION, (n, 1))
+    history = {key: np.empty((steps, n)) for key in ('roll', 'pitch', 'target_roll', 'target_pitch', 'alpha', 'nz')}
+    history['cmd'] = np.empty((steps, n, 2))
+    for t in range(steps):
+        actions = step_actions if t < switch else level_actions
+        roll, pitch = dyn.euler[:, 0], dyn.euler[:, 1]
+        cmd = fly_with_alt_yaw_vel_arrays(roll, pitch, dyn.omega[:, :2], actions, bank, rows,
+                                          level_throttle=level_throttle, elevator_limit=elevator_limit)
+        # 记的是算指令时的状态，每一段的第一帧就是阶跃前的值
+        history['roll'][t], history['pitch'][t] = roll, pitch
+        history['alpha'][t], history['nz'][t] = dyn.alpha, dyn.nz
+        history['target_roll'][t], history['target_pitch'][t] = targets(actions)
+        history['cmd'][t] = cmd[:, :2]
+        dyn.step(cmd, dt)
+    result = {key: value.reshape(steps, *shape, *value.shape[2:]) for key, value in history.items()}
+    result['switch'] = switch
+    result['dt'] = dt
+    return result
+
+
+# ----------------------------------------------------------------------
+# 指标
+
+def step_metrics(value, target, switch, dt, min_step=np.radians(5.), scale=np.radians(10.)):
+    """_summary_
+
+    Args:
+        value (ndarray): (T, ...) 一个轴的角度历史
+        target (ndarray): (T, ...) 目标角度，在 0 和 switch 两处阶跃
+        switch (int): 第二段开始的帧号
+        dt (float): 帧间隔
+        min_step (float): 阶跃小于这个值时这一段不算上升时间和超调，只算偏离目标的程度
+        scale (float): 没有阶跃时跟踪误差的归一化尺度
+
+    Returns:
+        dict: 'rise_time'（占段长的比例，到不了 90% 时为 1）、'overshoot'（占阶跃的比例）、
+              'tracking'（平均绝对误差 / 阶跃）都是 (2, ...)，两段分别算
+    """
+    metrics = {'rise_time': [], 'overshoot': [], 'tracking': []}
+    for start, stop in ((0, switch), (switch, len(value))):
+        segment, goal = value[start:stop], target[start]
+        step = goal - segment[0]
+        valid = np.abs(step) >= min_step
+        safe = np.where(valid, step, 1.)
+        y = (segment - segment[0]) / safe
+        reached = y >= 0.9
+        rise = np.where(reached.any(axis=0), reached.argmax(axis=0), len(segment)) / len(segment)
+        error = np.abs(target[start:stop] - segment).mean(axis=0)
+        metrics['rise_time'].append(np.where(valid, rise, 0.))
+        metrics['overshoot'].append(np.where(valid, np.maximum(y.max(axis=0) - 1., 0.), 0.))
+        metrics['tracking'].append(error / np.where(valid, np.abs(safe), scale))
+    return {key: np.stack(value) for key, value in metrics.items()}
+
+
+def score(result, weights=WEIGHTS, per_condition=False):
+    """ rollout 的结果 -> (P,) 代价，对所有初始状态和机动取平均（per_condition 时只对机动平均，返回 (P, C)）；
+    发散（nan）的增益组给很大的代价 """
+    switch, dt = result['switch'], result['dt']
+    cost = 0.
+    for axis in ('roll', 'pitch'):
+        metrics = step_metrics(result[axis], result['target_' + axis], switch, dt)
+        for key, value in metrics.items():
+            cost = cost + weights[key] * value.sum(axis=0)
+    # 指令的抖动：相邻两帧舵量之差的平均
+    cost = cost + weights['chatter'] * np.abs(np.diff(result['cmd'], axis=0)).mean(axis=0).sum(axis=-1) / dt
+    departure = (np.maximum(result['alpha'] - DEPARTURE_ALPHA, 0.) / np.radians(5.)
+                 + np.maximum(result['nz'] - DEPARTURE_NZ, 0.))
+    cost = np.nan_to_num(cost + weights['departure'] * departure.mean(axis=0), nan=1e3, posinf=1e3)
+    return cost.mean(axis=-1) if per_condition else cost.reshape(len(cost), -1).mean(axis=1)
+
+
+# ----------------------------------------------------------------------
+# 搜索
+
+class CMAES:
+    """ (μ/μ_w, λ)-CMA-ES，参数取 Hansen 教程里的默认值 """
+
+    def __init__(self, mean, sigma, popsize=None, seed=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.sigma = sigma
+        n = len(self.mean)
+        self.popsize = popsize or 4 + int(3 * np.log(n))
+        self.mu = self.popsize // 2
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / np.sum(self.weights ** 2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chin = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.C = np.eye(n)
+        self.generation = 0
+        self.rng = np.random.default_rng(seed)
+
+    def ask(self):
+        """ (popsize, n) 的一批候选 """
+        eigval, eigvec = np.linalg.eigh(self.C)
+        self._B, self._D = eigvec, np.sqrt(np.maximum(eigval, 1e-20))
+        z = self.rng.standard_normal((self.popsize, len(self.mean)))
+        return self.mean + self.sigma * (z * self._D) @ self._B.T
+
+    def tell(self, x, cost):
+        """ x: ask 返回的候选，cost: (popsize,) 代价，越小越好 """
+        n = len(self.mean)
+        order = np.argsort(cost)[:self.mu]
+        old = self.mean
+        self.mean = self.weights @ x[order]
+        y = (self.mean - old) / self.sigma
+        inv_sqrt_c = self._B @ np.diag(1 / self._D) @ self._B.T
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c @ y
+        self.generation += 1
+        hsig = (np.linalg.norm(self.ps) / np.sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chin
+                < 1.4 + 2 / (n + 1))
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * y
+        steps = (x[order] - old) / self.sigma
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * (steps.T * self.weights) @ steps)
+        self.sigma *= np.exp(self.cs / self.damps * (np.linalg.norm(self.ps) / self.chin - 1))
+
+
+def tune(airframe='manned', generations=30, popsize=64, sigma=0.3, seed=0, bounds=(-4., 1.), model=None,
+         verbose=True, **kwargs):
+    """_summary_
+
+    Args:
+        airframe (str): AIRFRAMES 里的机型
+        generations (int): CMA-ES 迭代代数
+        popsize (int): 每代的增益组数，所有增益组 x 初始状态 x 机动一起推进
+        sigma (float): log10(增益) 空间里的初始步长
+        bounds (tuple): log10(增益) 的范围
+        kwargs: 透传给 rollout（conditions、maneuvers、duration）
+
+    Returns:
+        tuple: (最好的增益 (6,), 它的代价, 手调增益的代价)
+    """
+    model = model or load_aircraft('fighter')
+    es = CMAES(np.log10(DEFAULT_GAINS), sigma, popsize, seed)
+    # 第一代把手调增益也放进去，结果至少不比它差
+    best_gains = DEFAULT_GAINS
+    default_cost = best_cost = None
+    for generation in range(generations):
+        start = time.time()
+        x = np.clip(es.ask(), *bounds)
+        if generation == 0:
+            x[0] = np.log10(DEFAULT_GAINS)
+        cost = score(rollout(10 ** x, airframe, model=model, **kwargs))
+        if generation == 0:
+            default_cost = best_cost = cost[0]
+        es.tell(x, cost)
+        if cost.min() < best_cost:
+            best_cost, best_gains = cost.min(), 10 ** x[cost.argmin()]
+        if verbose:
+            print(f'{airframe} 第 {generation} 代：本代最好 {cost.min():.3f}，历史最好 {best_cost:.3f}，'
+                  f'sigma {es.sigma:.3f}，耗时 {time.time() - start:.1f}s')
+    return best_gains, best_cost, default_cost
+
+
+def save_gains(path, gains):
+    """ gains: {机型: (6,) 增益}，存成 'airframes'、'gain_names'、'gains' (机型数, 6) """
+    names = list(gains)
+    np.savez(path, airframes=np.array(names), gain_names=np.array(GAIN_NAMES),
+             gains=np.stack([gains[name] for name in names]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='fly_with_alt_yaw_vel 的 PID 增益离线自动调参')
+    parser.add_argument('-o', '--out', default='agents/houlang_dev/pid_gains.npz')
+    parser.add_argument('--airframe', action='append', default=None, choices=list(AIRFRAMES))
+    parser.add_argument('--generations', type=int, default=30)
+    parser.add_argument('--popsize', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    model = load_aircraft('fighter')
+    gains = {}
+    for airframe in args.airframe or list(AIRFRAMES):
+        best, best_cost, default_cost = tune(airframe, args.generations, args.popsize, seed=args.seed, model=model,
+                                             duration=args.duration)
+        gains[airframe] = best
+        print(f'{airframe}: 代价 {default_cost:.3f} -> {best_cost:.3f}，'
+              + '，'.join(f'{name}={value:.4g}' for name, value in zip(GAIN_NAMES, best)))
+    save_gains(args.out, gains)
+    print(f'saved to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import ast
+import glob
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import time
+
+'''
+对局结果缓存
+'''
+# 同样的双方代码、想定、种子和仿真配置，结果是确定的，不用再跑一局 600 秒。
+# key 是这些内容的哈希（代码按文件内容算，不看修改时间），每条结果存成 <key前两位>/<key>.json，
+# 命中时更新文件的修改时间，总大小超过上限时按修改时间从旧到新删（LRU）。
+# 多个进程同时写也没关系：先写临时文件再 os.replace，同一个 key 的内容本来就一样。
+
+PACKAGE_SUFFIXES = ('.py', '.pyd', '.so', '.pkl', '.npz', '.json')
+
+
+def _sha1(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+    return digest.hexdigest()
+
+
+def hash_package(path):
+    """ 智能体所在包目录下所有源码、pyd 和模型文件的内容哈希（不导入模块），顶层模块只哈希它自己 """
+    module_name = path.partition(':')[0]
+    if '.' in module_name:
+        # 没有 __init__.py 的命名空间包（比如 agents.chao）没有 origin
+        root = list(importlib.util.find_spec(module_name.rsplit('.', 1)[0]).submodule_search_locations)[0]
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+            files.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith(PACKAGE_SUFFIXES))
+    else:
+        origin = importlib.util.find_spec(module_name).origin
+        root, files = os.path.dirname(origin), [origin]
+    digest = hashlib.sha1(path.encode())
+    for full in files:
+        digest.update(os.path.relpath(full, root).replace(os.sep, '/').encode())
+        with open(full, 'rb') as fin:
+            digest.update(fin.read())
+    return digest.hexdigest()[:16]
+
+
+def _module_file(root, name):
+    """ 顶层包目录 root 下模块 name 对应的文件，name 不是模块（比如 from pkg.mod import 进来的变量）时返回 None """
+    base = os.path.join(root, *name.split('.')[1:])
+    for candidate in (os.path.join(base, '__init__.py'), base + '.py'):
+        if os.path.isfile(candidate):
+            return candidate
+    for candidate in sorted(glob.glob(glob.escape(base) + '.*')):
+        if candidate.endswith(('.pyd', '.so')):
+            return candidate
+    return None
+
+
+def _local_imports(full, name, top):
+    """ 源码里 import 的、顶层包是 top 的模块名（静态解析，不导入；函数体里的 import 也算） """
+    with open(full, 'rb') as fin:
+        tree = ast.parse(fin.read(), full)
+    package = name if full.endswith('__init__.py') else name.rpartition('.')[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = importlib.util.resolve_name('.' * node.level + (node.module or ''), package) \
+                if node.level else node.module
+            names.add(base)
+            # from pkg import submodule
+            names.update(f'{base}.{alias.name}' for alias in node.names)
+    return {n for n in names if n.split('.')[0] == top}
+
+
+def hash_module(path):
+    """ 模块本身、它的上级包 __init__.py，以及递归 import 到的同一顶层包里的模块，按文件内容哈希（不导入模块）。
+    依赖里有编译过的扩展模块（.pyd / .so）时看不到它再 import 什么，退回 hash_package 哈希整个包
+    """
+    module_name = path.partition(':')[0]
+    top = module_name.split('.')[0]
+    spec = importlib.util.find_spec(top)
+    if spec.submodule_search_locations is None:
+        return hash_package(path)
+    root = list(spec.submodule_search_locations)[0]
+    seen, pending, files = set(), [module_name], []
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        full = _module_file(root, name)
+        if full is None:
+            continue
+        if not full.endswith('.py'):
+            return hash_package(path)
+        files.append(full)
+        pending.extend(_local_imports(full, name, top))
+        if '.' in name:
+            pending.append(name.rpartition('.')[0])
+    digest = hashlib.sha1(path.encode())
+    for full in sorted(files):
+        digest.update(os.path.relpath(full, root).replace(os.sep, '/').encode())
+        with open(full, 'rb') as fin:
+            digest.update(fin.read())
+    return digest.hexdigest()[:16]
+
+
+def hash_scen(scen):
+    """ 想定按解析后的内容哈希，改缩进、换行不影响 """
+    if isinstance(scen, str):
+        with open(scen, 'r') as fin:
+            scen = json.load(fin)
+    return _sha1(json.dumps(scen, sort_keys=True))[:16]
+
+
+def hash_sim(sim):
+    """ 仿真代码 + default_conf 的哈希，conf 先找同包的 conf 模块（hddf2sim.conf），再找仿真模块本身。
+    代码只算仿真模块和它用到的模块（hash_module），同包里无关的文件（runner、recorder ……）改了不影响缓存
+    """
+    module_name = sim.partition(':')[0]
+    conf = None
+    for name in (module_name.rsplit('.', 1)[0] + '.conf', module_name):
+        try:
+            conf = importlib.import_module(name).default_conf
+            break
+        except (ImportError, AttributeError):
+            continue
+    return _sha1(hash_module(sim), json.dumps(conf, sort_keys=True, default=repr))[:16]
+
+
+class KeyMaker:
+    """ 一批对局共用，同一个智能体包 / 想定 / 仿真只哈希一次 """
+
+    def __init__(self):
+        self.hashes = {}
+
+    def _memo(self, func, arg):
+        k = (func.__name__, arg if isinstance(arg, str) else json.dumps(arg, sort_keys=True))
+        if k not in self.hashes:
+            self.hashes[k] = func(arg)
+        return self.hashes[k]
+
+    def __call__(self, job):
+        return _sha1(json.dumps([
+            self._memo(hash_package, job['red']),
+            self._memo(hash_package, job['blue']),
+            self._memo(hash_scen, job['scen']),
+            self._memo(hash_sim, job['sim']),
+            job['seed'],
+            job['max_steps'],
+        ]))
+
+
+class ResultCache:
+    def __init__(self, path, max_bytes=256 * 2 ** 20):
+        """_summary_
+
+        Args:
+            path (str): 缓存目录
+            max_bytes (int): 总大小上限，超过后按 LRU 删
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], f'{key}.json')
+
+    def __contains__(self, key):
+        return os.path.exists(self._file(key))
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            with open(path, 'r') as fin:
+                result = json.load(fin)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as fout:
+            json.dump(result, fout, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def entries(self):
+        """ [(修改时间, 大小, 路径)]，从旧到新 """
+        entries = []
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                if filename.endswith('.json'):
+                    full = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(full)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, full))
+        return sorted(entries)
+
+    def evict(self):
+        """ 删掉最久没用过的结果直到总大小不超过上限，返回删掉的条数 """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, full in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(full)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        entries = self.entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries), 'time': time.time()}
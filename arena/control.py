@@ -0,0 +1,237 @@
+import numpy as np
+
+'''
+飞控观测、动作换算和机队 PID
+'''
+# arena 里的训练环境、推理服务、调参脚本要用到的智能体侧逻辑，从 agents/houlang*/funcs_np.py、funcs_pid.py 复制过来，
+# arena 不再导入某个具体的智能体包（智能体包要能单独打包提交，也不能反过来依赖 arena）。
+# 两边必须保持一致：get_obs 的布局就是飞控模型的输入，fly_with_alt_yaw_vel_arrays 就是调参调的那套控制律，
+# tests/test_control.py 会拿随机输入逐项比对，改了任何一边都要同步另一边。
+
+norm_delta_altitude = np.array([500, 0, -500])
+norm_delta_heading = np.array([-np.pi / 6, -np.pi / 12, -np.pi / 36, 0, np.pi / 36, np.pi / 12, np.pi / 6])
+norm_delta_velocity = np.array([0.05, 0, -0.05])
+
+
+def discrete2continuous(action, n_bins=41):
+    assert np.all(action < n_bins), (action, n_bins)
+    new_action = action * 2 / (n_bins - 1) - 1
+    assert np.all(new_action <= 1) and np.all(new_action >= -1), (action, new_action, n_bins)
+    return new_action
+
+
+def get_control_action(action):
+    disc_control = np.stack([
+        action[Action.AILERON],
+        action[Action.ELEVATOR],
+        action[Action.RUDDER],
+        action[Action.THROTTLE]
+    ], -1)
+    control = discrete2continuous(disc_control)
+    return control
+
+
+def action2cmd(action):
+    if action is None:
+        return {}
+
+    act = list(action)
+    act[-1] = (act[-1] + 1) / 2
+    cmd = {'control': act}
+    assert 0 <= cmd['control'][-1] <= 1, (cmd['control'])
+
+    return cmd
+
+
+def get_obs(info, target_status):
+    obs = []
+    is_uav = info.is_uav
+    delta_altitude = (target_status[0] - info.height) / 1000
+    delta_velocity = (target_status[1] - info.sp) / 340
+    target_heading = target_status[2]
+    current_heading = info.yaw
+    if target_heading > np.pi and current_heading < 0:
+        current_heading += 2*np.pi
+    elif target_heading < -np.pi and current_heading > 0:
+        current_heading -= 2*np.pi
+    delta_heading = (target_heading - current_heading) / np.pi
+    height = info.height / 10000
+    roll = info.roll / np.pi
+    pitch = info.pitch / np.pi
+    aoa = info.alpha
+    sideslip = info.beta
+    omega = [info.omega_p, info.omega_q, info.omega_r]
+    v_north = info.v_north / 340
+    v_east = info.v_east / 340
+    v_down = info.v_down / 340  #地向
+    v = info.sp / 340    #地速 空速是tas
+
+    obs = np.array([
+        is_uav,                 # 0. is_uav           (unit: bool)
+        delta_altitude,         # 1. delta_h          (unit: m)
+        delta_velocity,         # 2. delta_v          (unit: m/s)
+        delta_heading,          # 3. delta_heading    (unit: °)
+        height,                 # 4. altitude         (unit: m)
+        roll, pitch,            # 5, 6. roll, pitch   (unit: rad)
+        aoa, sideslip,          # 7, 8. aoa, sideslip (unit: rad)
+        *omega,                 # 9, 10, 11. omega    (unit: rad/s)
+        v_north,                # 12. v_body_x        (unit: m/s)
+        v_east,                 # 16. v_body_y        (unit: m/s)
+        v_down,                 # 14. v_body_z        (unit: m/s)
+        v,                      # 15. vc              (unit: m/s)
+    ], np.float32)
+
+    return obs
+
+
+class Action:
+    AILERON = 'action_aileron'
+    ELEVATOR = 'action_elevator'
+    RUDDER = 'action_rudder'
+    THROTTLE = 'action_throttle'
+
+
+DISC_ACTIONS = set([getattr(Action, k) for k in dir(Action) if not k.startswith('__')])
+
+
+class PIDBank:
+    """ 多架飞机、多个通道的 PID 放在一起算。
+    增益、积分、上一次误差、设定值都是 (飞机数, 通道数) 的数组，每帧整个机队一次向量化计算，
+    计算方式和 PID.compute 一致（含积分限幅、输出限幅、误差除以 length）。
+    飞机用 rows(keys) 换成行号后传给其它方法，一帧里只查一次字典。
+    """
+    def __init__(self, Kp, Ki, Kd, output_limits, windup_guard, lengths=None, init_planes=8):
+        self.Kp = np.asarray(Kp, dtype=np.float64)
+        self.Ki = np.asarray(Ki, dtype=np.float64)
+        self.Kd = np.asarray(Kd, dtype=np.float64)
+        self.base_gains = (self.Kp, self.Ki, self.Kd)
+        n_axes = self.Kp.shape[0]
+        limits = np.array([[-np.inf if lo is None else lo, np.inf if hi is None else hi] for lo, hi in output_limits])
+        self.output_low, self.output_high = limits[:, 0], limits[:, 1]
+        self.windup_guard = np.array([np.inf if g is None else g for g in windup_guard], dtype=np.float64)
+        self.lengths = np.ones(n_axes) if lengths is None else np.asarray(lengths, dtype=np.float64)
+        self.slots = {}  # 飞机ID -> 行号
+        self.setpoint = np.zeros((init_planes, n_axes))
+        self.integral = np.zeros((init_planes, n_axes))
+        self.previous_error = np.zeros((init_planes, n_axes))
+
+    def rows(self, keys):
+        """ 返回 keys 对应的行号，新飞机自动分配一行（状态为 0） """
+        for key in keys:
+            if key not in self.slots:
+                if len(self.slots) == self.integral.shape[0]:
+                    grow = np.zeros_like(self.integral)
+                    self.setpoint = np.concatenate([self.setpoint, grow])
+                    self.integral = np.concatenate([self.integral, grow])
+                    self.previous_error = np.concatenate([self.previous_error, grow])
+                    if self.Kp.ndim == 2:
+                        # 新行先用构造时的增益
+                        self.Kp, self.Ki, self.Kd = [np.concatenate([g, np.tile(g0, (len(grow), 1))])
+                                                     for g, g0 in zip((self.Kp, self.Ki, self.Kd), self.base_gains)]
+                self.slots[key] = len(self.slots)
+        return np.array([self.slots[key] for key in keys], dtype=np.int64)
+
+    def set_setpoint(self, rows, setpoint):
+        self.setpoint[rows] = setpoint
+
+    def set_gains(self, rows, Kp, Ki, Kd):
+        """ 按行设置增益（调参、增益表用），第一次调用时增益从 (通道数,) 扩成 (行数, 通道数) """
+        if self.Kp.ndim == 1:
+            n = self.integral.shape[0]
+            self.Kp, self.Ki, self.Kd = [np.tile(g, (n, 1)) for g in (self.Kp, self.Ki, self.Kd)]
+        self.Kp[rows] = Kp
+        self.Ki[rows] = Ki
+        self.Kd[rows] = Kd
+
+    def compute(self, rows, measured_value):
+        """ measured_value: (len(rows), 通道数)，返回同形状的控制输出 """
+        Kp, Ki, Kd = (g[rows] if g.ndim == 2 else g for g in (self.Kp, self.Ki, self.Kd))
+        error = self.setpoint[rows] - measured_value
+        error /= self.lengths
+        integral = self.integral[rows] + error
+        np.clip(integral, -self.windup_guard, self.windup_guard, out=integral)
+        derivative = error - self.previous_error[rows]
+        self.integral[rows] = integral
+        self.previous_error[rows] = error
+
+        output = Kp * error + Ki * integral + Kd * derivative
+        return np.clip(output, self.output_low, self.output_high, out=output)
+
+    def reset(self, rows):
+        self.integral[rows] = 0.0
+        self.previous_error[rows] = 0.0
+
+
+class FlyPidBank(PIDBank):
+    """ 整个机队的 FlyPid，通道为 [aileron, elevator]（FlyPid 里 rudder、throttle 的 PID 没有参与输出） """
+    def __init__(self, init_planes=8):
+        super().__init__(
+            Kp=[0.8, 0.3], Ki=[0.01, 0.02], Kd=[0.1, 0.2],
+            output_limits=[(-1, 1), (-1, 1)], windup_guard=[20.0, 10.0],
+            lengths=[90, 1], init_planes=init_planes)
+
+    def set_tar_value(self, rows, tar_pitch_rate, tar_roll_rate):
+        setpoint = np.empty((len(rows), 2))
+        setpoint[:, 0] = tar_roll_rate
+        setpoint[:, 1] = tar_pitch_rate
+        self.set_setpoint(rows, np.degrees(setpoint, out=setpoint))
+
+    def get_control_cmd(self, rows, omega):
+        """ omega: (N, 2) [omega_p, omega_q]，返回 (N, 4) [aileron, elevator, rudder, throttle] """
+        out = self.compute(rows, np.degrees(omega))
+        cmd = np.zeros((len(rows), 4))
+        cmd[:, 0] = out[:, 0]
+        cmd[:, 1] = -out[:, 1]
+        cmd[:, 3] = 1
+        return cmd
+
+
+def fly_with_alt_yaw_vel_arrays(roll, pitch, omega, actions, fly_pid_bank, rows, level_throttle=0.395,
+                                elevator_limit=0.7):
+    """ 智能体里 fly_with_alt_yaw_vel_batch 直接吃数组的版本，离线调参（arena.autotune）时不用构造飞机对象
+
+    Args:
+        roll, pitch (ndarray): (N,) 滚转角、俯仰角
+        omega (ndarray): (N, 2) [omega_p, omega_q]
+        actions (ndarray): (N, 3) 每架飞机的 [(0-2), (0-6), (0-2)]
+        fly_pid_bank (FlyPidBank): 机队 PID
+        rows (ndarray): (N,) 每架飞机在 fly_pid_bank 里的行号
+        level_throttle (float / ndarray): 保持速度时的油门，可以每架飞机不同
+        elevator_limit (float / ndarray): 俯仰指令的限幅，可以每架飞机不同
+
+    Returns:
+        ndarray: (N, 4) [aileron, elevator, rudder, throttle]
+    """
+    actions = np.asarray(actions, dtype=np.int64).reshape(-1, 3)
+
+    # 确定转向，根据想移动的角度来计算目标滚转角度
+    temp_turn = np.degrees(norm_delta_heading[actions[:, 1]])
+    rate = np.abs(temp_turn) / 35
+    target_roll = np.where(np.abs(temp_turn) < 4, 0, np.radians(90) * rate * np.sign(temp_turn))
+    target_pitch = np.arctan2(norm_delta_altitude[actions[:, 0]], 500)
+
+    # 设置目标姿态角角速度
+    fly_pid_bank.set_tar_value(rows, target_pitch - pitch, target_roll - roll)
+    cmd = fly_pid_bank.get_control_cmd(rows, omega)
+
+    # 控制加力来改变速度
+    delta_velocity = norm_delta_velocity[actions[:, 2]]
+    cmd[delta_velocity < 0, 3] = 0
+    level = delta_velocity == 0
+    cmd[level, 3] = np.broadcast_to(level_throttle, level.shape)[level] # 匀速
+
+    # 限制控制俯仰轴的指令值，防止飞机失控
+    np.clip(cmd[:, 1], -elevator_limit, elevator_limit, out=cmd[:, 1])
+
+    # 飞机倒过来飞时特殊处理，俯仰轴取反方向
+    roll_deg = np.degrees(roll)
+    inverted = (roll_deg <= -90) | (roll_deg >= 90)
+    cmd[inverted, 1] *= -1
+
+    return cmd
+
+
+# 增益表的列：aileron、elevator 两组 PID 增益，匀速油门，俯仰指令限幅
+SCHEDULE_COLUMNS = ['aileron_Kp', 'aileron_Ki', 'aileron_Kd', 'elevator_Kp', 'elevator_Ki', 'elevator_Kd',
+                    'throttle', 'elevator_limit']
+SCHEDULE_AIRFRAMES = ['manned', 'uav']
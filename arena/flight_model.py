@@ -0,0 +1,507 @@
+import numpy as np
+
+from .jsbsim_xml import load_aircraft
+from .pointmass import G, PointMassSim, _merge_conf, default_conf as pointmass_conf
+from .telemetry import TelemetrySink
+
+'''
+向量化的 6 自由度飞行动力学
+'''
+# 气动力、力矩、推力都直接用 gym_jsbsim 里 fighter.xml / F100-PW-229.xml 的表（arena.jsbsim_xml 编译好的），
+# K 架飞机的状态（位置、机体速度、四元数、角速度、舵面、发动机）放在数组里，一次调用推进 K 架。
+# 指令和 send_commands 一样是 [aileron, elevator, rudder, throttle]，杆到指令的映射（杆力 -> 过载 / 滚转角速度，
+# 油门 -> 发动机位置）也用 XML 里的 fcs_function，但飞控内回路没有照搬 XML 里几百个开关和滤波器，
+# 换成了非线性动态逆：按期望角加速度算需要的力矩，用舵面的有限差分效率反解舵偏，再经作动器的一阶惯性和速率限制。
+# 所以杆量到响应的稳态关系和 JSBSim 一致（中立杆保持 1g、满杆 9g、滚转角速度上限 308°/s），过渡过程是近似的。
+# 不考虑地球自转和曲率、风、燃油消耗和起落架，只用于在 Linux 上做大批量的飞控调参和强化学习采样。
+# 用法：
+#   dyn = FighterDynamics(k)
+#   throttle = dyn.reset(pos, euler, speed)      # 配平到平飞，返回配平油门
+#   dyn.step(control)                            # control: (k, 4)
+#   python -m arena.runner --sim arena.flight_model:FighterSim ...
+
+FT = 0.3048
+LBF = 4.4482216
+LBF_FT = LBF * FT
+SLUG_FT2 = 1.35581795
+LB = 0.45359237
+PSF = 47.880259
+KTS = 0.514444
+EARTH_RADIUS = 6371000.
+
+dynamics_conf = {
+    'substeps': 4,               # 每个仿真步内积分几次（真仿真 20Hz，这里 80Hz）
+    'z_ref': 10000.,             # z = z_ref - height
+    'fuel_fraction': 1.,
+    'engine_tau': 0.8,           # 发动机转速到位置指令的一阶惯性时间常数
+    'actuator_bandwidth': 20.,   # 舵机的一阶惯性带宽（rad/s），XML 里是 20
+    # 舵面 [平尾（度）, 副翼（归一化）, 方向舵（归一化）] 的范围和速率限制
+    'surface_limit': [25., 1., 1.],
+    'surface_rate': [60., 160. / 43., 4.],
+    'pitch_bandwidth': 5.,       # 角速度跟踪的带宽，动态逆里期望角加速度 = 带宽 * 角速度误差
+    'roll_bandwidth': 6.,
+    'yaw_bandwidth': 3.,
+    'nz_gain': 1.,               # 过载误差到俯仰角速度指令的比例、积分增益
+    'nz_integral_gain': 1.,
+    'max_alpha': 25.,            # 迎角限制（度），超过后按 alpha_gain 压低俯仰角速度指令
+    'alpha_gain': 0.2,
+    'max_yaw_rate': 0.1,         # 方向舵满舵对应的偏航角速度（rad/s），和 pointmass 一样
+    'beta_gain': 2.,             # 侧滑角到偏航角速度指令的增益，用来消除侧滑
+}
+
+# 给 FighterSim 用的配置：pointmass 的配置加上 'dynamics'
+default_conf = _merge_conf(pointmass_conf, {'dynamics': dynamics_conf})
+
+
+def atmosphere(height):
+    """ 国际标准大气，height（m）-> (温度 K, 压强 Pa, 密度 kg/m³, 声速 m/s) """
+    h = np.clip(height, -1000., 20000.)
+    troposphere = h < 11000.
+    temp = np.where(troposphere, 288.15 - 0.0065 * h, 216.65)
+    pressure = np.where(troposphere, 101325. * (temp / 288.15) ** 5.25588,
+                        22632.1 * np.exp(-(h - 11000.) / 6341.62))
+    density = pressure / (287.053 * temp)
+    return temp, pressure, density, np.sqrt(1.4 * 287.053 * temp)
+
+
+def euler_to_quat(euler):
+    roll, pitch, yaw = [np.asarray(a, dtype=np.float64) / 2 for a in np.moveaxis(np.asarray(euler), -1, 0)]
+    cr, sr, cp, sp, cy, sy = np.cos(roll), np.sin(roll), np.cos(pitch), np.sin(pitch), np.cos(yaw), np.sin(yaw)
+    return np.stack([cr * cp * cy + sr * sp * sy, sr * cp * cy - cr * sp * sy,
+                     cr * sp * cy + sr * cp * sy, cr * cp * sy - sr * sp * cy], axis=-1)
+
+
+def quat_to_euler(quat):
+    w, x, y, z = np.moveaxis(quat, -1, 0)
+    roll = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    pitch = np.arcsin(np.clip(2 * (w * y - z * x), -1., 1.))
+    yaw = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return np.stack([roll, pitch, yaw], axis=-1)
+
+
+def quat_to_dcm(quat):
+    """ 机体系到 NED 的方向余弦矩阵，(..., 3, 3) """
+    w, x, y, z = np.moveaxis(quat, -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], -1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], -1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], -1),
+    ], -2)
+
+
+class FighterDynamics:
+    def __init__(self, n, model=None, conf=None):
+        """_summary_
+
+        Args:
+            n (int): 飞机数
+            model (AircraftModel): jsbsim_xml.load_aircraft 的结果，None 时加载 fighter
+            conf (dict): 覆盖 dynamics_conf 里的参数
+        """
+        self.n = n
+        self.model = model or load_aircraft('fighter')
+        self.conf = _merge_conf(dynamics_conf, conf)
+        weight, cg, inertia = self.model.mass_properties(self.conf['fuel_fraction'])
+        self.mass = weight * LB
+        self.cg_x_in = cg[0]
+        self.inertia = inertia * SLUG_FT2
+        self.inertia_inv = np.linalg.inv(self.inertia)
+        # 结构坐标系（in，x 向后、z 向上）-> 机体系（m）
+        to_body = np.array([-1., 1., -1.]) / 12. * FT
+        self.arm_aero = (self.model.locations['AERORP'] - cg) * to_body
+        self.arm_thrust = (self.model.locations.get('THRUSTER', cg) - cg) * to_body
+        engine = self.model.engine
+        self.mil_thrust = engine.get('milthrust', 0.)
+        self.max_thrust = engine.get('maxthrust', self.mil_thrust)
+        self.surface_limit = np.array(self.conf['surface_limit'])
+        self.surface_rate = np.array(self.conf['surface_rate'])
+        self.bandwidth = np.array([self.conf['roll_bandwidth'], self.conf['pitch_bandwidth'], self.conf['yaw_bandwidth']])
+        self.reset(np.zeros((n, 3)), np.zeros((n, 3)), np.full(n, 250.))
+
+    # ------------------------------------------------------------------
+    # 状态
+
+    def reset(self, pos, euler, speed, trim=True):
+        """_summary_
+
+        Args:
+            pos (ndarray): (n, 3) 位置，z = z_ref - height
+            euler (ndarray): (n, 3) [roll, pitch, yaw]
+            speed (ndarray): (n,) 真空速
+            trim (bool): 按平飞配平迎角、平尾和发动机（pitch 当成航迹角）
+
+        Returns:
+            ndarray: (n,) 配平油门，trim=False 时为 nan
+        """
+        n = self.n
+        self.pos = np.array(pos, dtype=np.float64).reshape(n, 3)
+        euler = np.array(euler, dtype=np.float64).reshape(n, 3)
+        speed = np.broadcast_to(np.asarray(speed, dtype=np.float64), (n,)).copy()
+        self.quat = euler_to_quat(euler)
+        self.uvw = np.stack([speed, np.zeros(n), np.zeros(n)], -1)
+        self.omega = np.zeros((n, 3))
+        self.surface = np.zeros((n, 3))
+        self.lef = np.zeros(n)
+        self.alpha_lag = np.zeros(n)
+        self.nz_int = np.zeros(n)
+        self.engine_pos = np.ones(n)
+        self.nz = np.ones(n)
+        self.thrust = np.zeros(n)
+        self.specific_force = np.zeros((n, 3))
+        self.throttle = np.zeros(n)
+        throttle = np.full(n, np.nan)
+        if trim:
+            throttle = self._trim(euler, speed)
+        self._update_outputs()
+        return throttle
+
+    def reset_from_ic(self, name='basic_ic', trim=True):
+        """ 用 XML 初始条件文件（model.initial_conditions[name]）里的高度、速度和姿态初始化所有飞机 """
+        ic = self.model.initial_conditions[name]
+        pos = np.zeros((self.n, 3))
+        pos[:, 2] = self.conf['z_ref'] - ic.get('altitude', 0.) * FT
+        euler = np.radians([ic.get('phi', 0.), ic.get('theta', 0.), ic.get('psi', 0.)])
+        speed = np.linalg.norm([ic.get(k, 0.) for k in ('ubody', 'vbody', 'wbody')]) * FT
+        return self.reset(pos, np.tile(euler, (self.n, 1)), speed, trim)
+
+    @property
+    def height(self):
+        return self.conf['z_ref'] - self.pos[:, 2]
+
+    def _air_data(self):
+        temp, pressure, density, sound = atmosphere(self.height)
+        tas = np.maximum(np.linalg.norm(self.uvw, axis=1), 1.)
+        u, v, w = self.uvw.T
+        alpha = np.arctan2(w, u)
+        beta = np.arcsin(np.clip(v / tas, -1, 1))
+        return pressure, density, sound, tas, alpha, beta
+
+    def _props(self, control, euler):
+        """ 一次求值要用到的所有外部属性，单位换算到 JSBSim 的英制 """
+        pressure, density, sound, tas, alpha, beta = self._air_data()
+        c = self.model.constants
+        tas_ft = tas / FT
+        mach = tas / sound
+        lef_norm = self.lef / 25.
+        aileron, elevator, rudder, throttle = control.T
+        props = {
+            'aero/alpha-rad': alpha, 'aero/alpha-deg': np.degrees(alpha), 'aero/beta-deg': np.degrees(beta),
+            'aero/qbar-psf': 0.5 * density * tas ** 2 / PSF,
+            'aero/bi2vel': c['metrics/bw-ft'] / (2 * tas_ft), 'aero/ci2vel': c['metrics/cbarw-ft'] / (2 * tas_ft),
+            'aero/h_b-mac-ft': np.maximum(self.height, 0.) / FT / c['metrics/bw-ft'],
+            'attitude/phi-rad': euler[:, 0],
+            'velocities/mach': mach,
+            'velocities/p-aero-rad_sec': self.omega[:, 0], 'velocities/q-aero-rad_sec': self.omega[:, 1],
+            'velocities/r-aero-rad_sec': self.omega[:, 2],
+            'atmosphere/P-psf': pressure / PSF, 'atmosphere/density-altitude': self.height / FT,
+            'inertia/cg-x-in': self.cg_x_in,
+            'fcs/fly-by-wire/pitch/horz-tail-deflection-deg': self.surface[:, 0],
+            'fcs/fly-by-wire/roll/aileron-pos-norm': self.surface[:, 1],
+            'fcs/fly-by-wire/yaw/rudder-pos-norm': self.surface[:, 2],
+            'fcs/fly-by-wire/lef/lef-pos-norm': lef_norm, 'fcs/fly-by-wire/lef/lef-pos-r-norm': 1 - lef_norm,
+            'fcs/fly-by-wire/tef/tef-pos-norm': 0., 'fcs/speedbrake-pos-norm': 0., 'gear/gear-pos-norm': 0.,
+            # 杆、油门和飞控里用到的开关量（正常模式，无备份增益、无 CAT III）
+            'fcs/aileron-cmd-norm': aileron, 'fcs/elevator-cmd-norm': elevator, 'fcs/rudder-cmd-norm': rudder,
+            'fcs/throttle-cmd-deg': 16. + 114. * throttle, 'fcs/fly-by-wire/throttle-limit-ab': 2.,
+            'fcs/fly-by-wire/enable-standby-gains': 0., 'fcs/fly-by-wire/enable-standby-gains-inv': 1.,
+            'fcs/fly-by-wire/q_c_standby': 1400.,
+            'fcs/fly-by-wire/roll/max-cmd-roll-rate': 308., 'fcs/fly-by-wire/enable-cat-III': 0.,
+        }
+        return props
+
+    def _engine_thrust(self, props, engine_pos):
+        """ F100 的推力（N）：转速段按 JSBSim 涡扇模型 idle + (mil - idle) * N2norm²，加力段线性插到最大推力 """
+        get = self.model.get
+        idle = self.mil_thrust * get('propulsion/engine/IdleThrust', props)
+        mil = (self.mil_thrust - idle) * get('propulsion/engine/MilThrust', props)
+        n2 = np.minimum(engine_pos, 1.)
+        thrust = idle + mil * n2 ** 2
+        augment = np.clip(engine_pos - 1., 0., 1.)
+        thrust = thrust + augment * (self.max_thrust * get('propulsion/engine/AugThrust', props) - thrust)
+        return thrust * LBF
+
+    def _moments(self, props):
+        """ 气动力（机体系，N）和绕重心的气动力矩（N·m） """
+        force, moment = self.model.aero_forces(props)
+        force = force * LBF
+        return force, moment * LBF_FT + np.cross(self.arm_aero, force)
+
+    def _batched_props(self, props, k):
+        """ 把 props 里的每个数组沿第一维复制 k 份，用来一次求 k 组扰动 """
+        return {name: np.tile(v, k) if np.ndim(v) else v for name, v in props.items()}
+
+    # ------------------------------------------------------------------
+    # 配平
+
+    def _trim(self, euler, speed, iterations=12):
+        """ 平飞配平：牛顿迭代迎角和平尾，使法向力和俯仰力矩平衡；发动机位置使推力抵消阻力 """
+        n = self.n
+        gamma = euler[:, 1]
+        alpha = np.full(n, np.radians(3.))
+        control = np.zeros((n, 4))
+        steps = np.array([np.radians(.1), .1])
+        for _ in range(iterations):
+            self.quat = euler_to_quat(np.stack([euler[:, 0], gamma + alpha, euler[:, 2]], -1))
+            self.uvw = speed[:, None] * np.stack([np.cos(alpha), np.zeros(n), np.sin(alpha)], -1)
+            self.omega[:] = 0.
+            base = self._props(control, euler)
+            props = self._batched_props(base, 3)
+            props['aero/alpha-rad'][n:2 * n] += steps[0]
+            props['aero/alpha-deg'][n:2 * n] += np.degrees(steps[0])
+            props['fcs/fly-by-wire/pitch/horz-tail-deflection-deg'][2 * n:] += steps[1]
+            force, moment = self._moments(props)
+            # 稳定坐标系下的升力和力矩，推力沿机体 x 轴，分到升力方向上的部分先忽略
+            lift = -(force[:, 2] * np.cos(np.tile(alpha, 3)) - force[:, 0] * np.sin(np.tile(alpha, 3)))
+            residual = np.stack([lift[:n] - self.mass * G * np.cos(gamma), moment[:n, 1]], -1)
+            jac = np.stack([
+                np.stack([(lift[n:2 * n] - lift[:n]) / steps[0], (lift[2 * n:] - lift[:n]) / steps[1]], -1),
+                np.stack([(moment[n:2 * n, 1] - moment[:n, 1]) / steps[0], (moment[2 * n:, 1] - moment[:n, 1]) / steps[1]], -1),
+            ], -2)
+            delta = np.linalg.solve(jac, -residual[..., None])[..., 0]
+            alpha = np.clip(alpha + delta[:, 0], np.radians(-5), np.radians(20))
+            self.surface[:, 0] = np.clip(self.surface[:, 0] + delta[:, 1], -self.surface_limit[0], self.surface_limit[0])
+            qcps = self.model.get('fcs/fly-by-wire/qcps-ratio', base)
+            self.lef = np.clip(1.38 * np.degrees(alpha) - 9.05 * qcps + 1.45, 0., 25.)
+        self.alpha_lag = np.degrees(alpha)
+        drag = -(force[:n, 0] * np.cos(alpha) + force[:n, 2] * np.sin(alpha)) + self.mass * G * np.sin(gamma)
+        # 推力在发动机位置 [0, 2] 上单调，二分求抵消阻力的位置，再用 XML 的油门表反查油门
+        low, high = np.zeros(n), np.full(n, 2.)
+        for _ in range(30):
+            mid = (low + high) / 2
+            enough = self._engine_thrust(base, mid) * np.cos(alpha) >= drag
+            high = np.where(enough, mid, high)
+            low = np.where(enough, low, mid)
+        self.engine_pos = high
+        grid = np.linspace(0., 1., 229)
+        positions = np.stack([self._throttle_position(base, np.full(n, t)) for t in grid], -1)
+        throttle = np.array([np.interp(p, pos, grid) for p, pos in zip(self.engine_pos, positions)])
+        return throttle
+
+    def _throttle_position(self, props, throttle):
+        props = dict(props)
+        for name in ('fcs/throttle-cmd-deg', 'fcs/fly-by-wire/throttle/pos-norm'):
+            props.pop(name, None)
+        props['fcs/throttle-cmd-deg'] = 16. + 114. * throttle
+        return self.model.get('fcs/fly-by-wire/throttle/pos-norm', props)
+
+    # ------------------------------------------------------------------
+    # 推进
+
+    def _control_law(self, props, euler, tas, dt):
+        """ 杆量 -> 角速度指令 -> 动态逆求舵面指令 """
+        conf = self.conf
+        get = self.model.get
+        roll, pitch = euler[:, 0], euler[:, 1]
+        alpha_deg = props['aero/alpha-deg']
+
+        # 俯仰：杆力 -> 过载增量（XML 的表），加 1g 配平后按过载误差的比例积分给俯仰角速度指令
+        command_g = np.clip(get('fcs/fly-by-wire/pitch/command-g', props), get('fcs/fly-by-wire/pitch/F1', props), 8.)
+        bias = np.cos(pitch) * np.cos(roll)
+        nz_cmd = command_g + bias
+        error = nz_cmd - self.nz
+        self.nz_int = np.clip(self.nz_int + error * dt, -2., 2.)
+        q_cmd = G / tas * (nz_cmd - bias + conf['nz_gain'] * error + conf['nz_integral_gain'] * self.nz_int)
+        q_cmd -= conf['alpha_gain'] * np.maximum(alpha_deg - conf['max_alpha'], 0.)
+
+        # 滚转：杆力 -> 滚转角速度（XML 的表）；偏航：协调转弯 + 方向舵 + 消侧滑
+        p_cmd = np.radians(get('fcs/fly-by-wire/roll/command-deg_s', props))
+        r_cmd = (G * np.sin(roll) * np.cos(pitch) / tas - props['fcs/rudder-cmd-norm'] * conf['max_yaw_rate']
+                 + conf['beta_gain'] * np.radians(props['aero/beta-deg']))
+        omega_cmd = np.stack([p_cmd, q_cmd, r_cmd], -1)
+        omega_dot = self.bandwidth * (omega_cmd - self.omega)
+        j_omega = self.omega @ self.inertia.T
+        return omega_dot @ self.inertia.T + np.cross(self.omega, j_omega)
+
+    def _effectiveness(self, props):
+        """ 三个舵面对三轴力矩的有限差分效率 (n, 3, 3)，同时返回当前舵面下的力和力矩 """
+        n = self.n
+        deltas = np.array([1., .05, .05])
+        batched = self._batched_props(props, 4)
+        names = ['fcs/fly-by-wire/pitch/horz-tail-deflection-deg', 'fcs/fly-by-wire/roll/aileron-pos-norm',
+                 'fcs/fly-by-wire/yaw/rudder-pos-norm']
+        # 舵面顶到限位时往回差分
+        sign = np.where(self.surface > self.surface_limit - deltas, -1., 1.)
+        for k, name in enumerate(names):
+            batched[name][(k + 1) * n:(k + 2) * n] += sign[:, k] * deltas[k]
+        force, moment = self._moments(batched)
+        base = moment[:n]
+        # 列的顺序和 surface 一致：[平尾, 副翼, 方向舵]
+        effect = np.stack([(moment[(k + 1) * n:(k + 2) * n] - base) / (sign[:, k:k + 1] * deltas[k]) for k in range(3)], -1)
+        return effect, force[:n], base
+
+    def step(self, control, dt=1 / 20.):
+        """_summary_
+
+        Args:
+            control (ndarray): (n, 4) [aileron, elevator, rudder, throttle]，前三个 [-1, 1]，油门 [0, 1]
+            dt (float): 推进的时间，内部分成 conf['substeps'] 步
+        """
+        control = np.asarray(control, dtype=np.float64).reshape(self.n, 4)
+        control = np.concatenate([np.clip(control[:, :3], -1, 1), np.clip(control[:, 3:], 0, 1)], 1)
+        self.throttle = control[:, 3]
+        substeps = self.conf['substeps']
+        h = dt / substeps
+        for k in range(substeps):
+            self._substep(control, h, update_effectiveness=k == 0)
+        self._update_outputs()
+
+    def _substep(self, control, dt, update_effectiveness):
+        conf = self.conf
+        euler = quat_to_euler(self.quat)
+        props = self._props(control, euler)
+        tas = np.maximum(np.linalg.norm(self.uvw, axis=1), 1.)
+        if update_effectiveness:
+            # 扰动求值用的是复制出来的 props，中间结果不会混进基准状态
+            self._effect, force, moment = self._effectiveness(props)
+        else:
+            force, moment = self._moments(props)
+
+        # 发动机
+        position = self._throttle_position(props, control[:, 3])
+        self.engine_pos += (position - self.engine_pos) * min(dt / conf['engine_tau'], 1.)
+        thrust = self._engine_thrust(props, self.engine_pos)
+        thrust_force = np.stack([thrust, np.zeros(self.n), np.zeros(self.n)], -1)
+        moment = moment + np.cross(self.arm_thrust, thrust_force)
+        total = force + thrust_force
+        self.thrust = thrust
+        self.specific_force = total / self.mass
+        self.nz = -total[:, 2] / (self.mass * G)
+
+        # 飞控：需要的力矩 - 当前力矩，用效率矩阵反解舵面增量
+        required = self._control_law(props, euler, tas, dt)
+        effect = self._effect + np.eye(3) * 1e-3
+        delta = np.linalg.solve(effect, (required - moment)[..., None])[..., 0]
+        target = np.clip(self.surface + delta, -self.surface_limit, self.surface_limit)
+        change = (target - self.surface) * min(conf['actuator_bandwidth'] * dt, 1.)
+        self.surface += np.clip(change, -self.surface_rate * dt, self.surface_rate * dt)
+        # 前缘襟翼：迎角超前滞后 (2s + 7.25) / (s + 7.25) 和冲压比 qc/ps 的调度（XML 的 LEF 通道），25°/s 速率限制
+        alpha_deg = props['aero/alpha-deg']
+        self.alpha_lag += (alpha_deg - self.alpha_lag) * min(7.25 * dt, 1.)
+        qcps = self.model.get('fcs/fly-by-wire/qcps-ratio', props)
+        lef_cmd = np.clip(1.38 * (2 * alpha_deg - self.alpha_lag) - 9.05 * qcps + 1.45, 0., 25.)
+        self.lef += np.clip((lef_cmd - self.lef) * min(7.3529 * dt, 1.), -25. * dt, 25. * dt)
+
+        # 刚体运动：机体系的平动和转动，四元数姿态，NED 位置
+        dcm = quat_to_dcm(self.quat)
+        gravity = np.einsum('nji,j->ni', dcm, np.array([0., 0., G]))
+        uvw_dot = total / self.mass + gravity - np.cross(self.omega, self.uvw)
+        j_omega = self.omega @ self.inertia.T
+        omega_dot = (moment - np.cross(self.omega, j_omega)) @ self.inertia_inv.T
+        self.uvw += uvw_dot * dt
+        self.omega += omega_dot * dt
+        p, q, r = self.omega.T
+        w, x, y, z = self.quat.T
+        quat_dot = 0.5 * np.stack([-x * p - y * q - z * r, w * p + y * r - z * q,
+                                   w * q + z * p - x * r, w * r + x * q - y * p], -1)
+        self.quat += quat_dot * dt
+        self.quat /= np.linalg.norm(self.quat, axis=1, keepdims=True)
+        self.pos += np.einsum('nij,nj->ni', quat_to_dcm(self.quat), self.uvw) * dt
+
+    def _update_outputs(self):
+        """ 和 HDDF2Sim 态势字段对应的量，单位是 m、m/s、rad """
+        pressure, density, sound, tas, alpha, beta = self._air_data()
+        self.euler = quat_to_euler(self.quat)
+        self.vel = np.einsum('nij,nj->ni', quat_to_dcm(self.quat), self.uvw)
+        self.tas = tas
+        self.mach = tas / sound
+        self.cas = tas * np.sqrt(density / 1.225)
+        self.alpha = alpha
+        self.beta = beta
+
+    def properties(self, sim_time=0., origin=None):
+        """_summary_
+
+        Args:
+            sim_time (float): 仿真时间，记到 sim/time/elapsed-sec
+            origin (tuple): NED 原点的 (纬度, 经度)，度；None 时用 basic_ic 里的
+
+        Returns:
+            dict: {JSBSim 属性名: (n,) 数组}，单位和 JSBSim 一致（ft、kts、rad、deg），给 telemetry.TelemetrySink 用
+        """
+        if origin is None:
+            ic = self.model.initial_conditions.get('basic_ic', {})
+            origin = (ic.get('latitude', 0.), ic.get('longitude', 0.))
+        n = self.n
+        height_ft = self.height / FT
+        roll, pitch, yaw = self.euler.T
+        u, v, w = self.uvw.T / FT
+        v_north, v_east, v_down = self.vel.T / FT
+        accel = self.specific_force / FT
+        # 平面近似换算经纬度，对局的范围只有几百公里
+        lat = origin[0] + np.degrees(self.pos[:, 0] / EARTH_RADIUS)
+        lon = origin[1] + np.degrees(self.pos[:, 1] / (EARTH_RADIUS * np.cos(np.radians(origin[0]))))
+        fuel = sum(contents for contents, _ in self.model.tanks) * self.conf['fuel_fraction']
+        return {
+            'position/long-gc-deg': lon, 'position/lat-geod-deg': lat,
+            'position/h-sl-ft': height_ft, 'position/h-agl-ft': height_ft,
+            'attitude/roll-rad': roll, 'attitude/pitch-rad': pitch, 'attitude/psi-deg': np.degrees(yaw) % 360.,
+            'aero/alpha-deg': np.degrees(self.alpha), 'aero/beta-deg': np.degrees(self.beta),
+            'velocities/vc-kts': self.cas / KTS, 'velocities/mach': self.mach,
+            'velocities/u-fps': u, 'velocities/v-fps': v, 'velocities/w-fps': w,
+            'velocities/v-north-fps': v_north, 'velocities/v-east-fps': v_east, 'velocities/v-down-fps': v_down,
+            'velocities/h-dot-fps': -v_down,
+            'velocities/p-rad_sec': self.omega[:, 0], 'velocities/q-rad_sec': self.omega[:, 1],
+            'velocities/r-rad_sec': self.omega[:, 2],
+            'accelerations/Nz': self.nz, 'accelerations/a-pilot-x-ft_sec2': accel[:, 0],
+            'accelerations/a-pilot-y-ft_sec2': accel[:, 1], 'accelerations/a-pilot-z-ft_sec2': accel[:, 2],
+            'fcs/left-aileron-pos-norm': self.surface[:, 1], 'fcs/right-aileron-pos-norm': -self.surface[:, 1],
+            'fcs/elevator-pos-norm': self.surface[:, 0] / self.surface_limit[0],
+            'fcs/rudder-pos-norm': self.surface[:, 2], 'fcs/speedbrake-pos-norm': np.zeros(n),
+            'fcs/throttle-pos-norm': self.throttle,
+            'propulsion/engine/thrust-lbs': self.thrust / LBF, 'propulsion/total-fuel-lbs': np.full(n, fuel),
+            'sim/time/elapsed-sec': np.full(n, sim_time),
+        }
+
+
+class FighterSim(PointMassSim):
+    """ PointMassSim 的飞机换成 FighterDynamics，导弹、雷达、锁定和态势都沿用 PointMassSim """
+
+    def __init__(self, scen, use_tacview=False, save_replay=False, replay_path="replay.acmi", conf=None, seed=None,
+                 model=None, telemetry=None):
+        """ telemetry: 目录，给了就每帧把所有飞机 output_JSB.xml 里的属性记成二进制（arena.telemetry），
+        每次 reset 清空重写，目录里只有当前这一局 """
+        self.model = model or load_aircraft('fighter')
+        self.telemetry_path = telemetry
+        self.telemetry = None
+        super().__init__(scen, use_tacview, save_replay, replay_path, conf=_merge_conf(default_conf, conf), seed=seed)
+
+    def reset(self):
+        super().reset()
+        dyn_conf = _merge_conf(self.conf['dynamics'], {'z_ref': self.conf['z_ref']})
+        self.dynamics = FighterDynamics(len(self.alive), self.model, dyn_conf)
+        self.ctrl[:, 3] = self.dynamics.reset(self.pos, self.euler, self.speed)
+        self._sync()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.telemetry_path is not None:
+            self.telemetry = TelemetrySink(self.telemetry_path, len(self.alive))
+
+    def step(self):
+        done = self.done
+        super().step()
+        if self.telemetry is not None and not done:
+            self.telemetry.record(self.num_steps, self.sim_time, self.dynamics.properties(self.sim_time))
+            if self.done:
+                self.telemetry.close()
+                self.telemetry = None
+
+    def _sync(self):
+        dyn = self.dynamics
+        self.pos[:] = dyn.pos
+        self.euler[:] = dyn.euler
+        self.speed = dyn.tas.copy()
+        self.vel = dyn.vel.copy()
+        self.omega[:] = dyn.omega
+        self.load = dyn.nz.copy()
+
+    def _step_planes(self):
+        self.dynamics.step(self.ctrl, self.dt)
+        self._sync()
+
+    def _plane_infos(self, idx, full):
+        infos = super()._plane_infos(idx, full)
+        dyn = self.dynamics
+        for i, info in zip(idx, infos):
+            info.alpha, info.beta = float(dyn.alpha[i]), float(dyn.beta[i])
+            info.mach, info.cas = float(dyn.mach[i]), float(dyn.cas[i])
+        return infos
@@ -0,0 +1,126 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from .autotune import AIRFRAMES, CMAES, DEFAULT_GAINS, GAIN_NAMES, rollout, score
+from .control import SCHEDULE_AIRFRAMES, SCHEDULE_COLUMNS
+from .flight_model import FighterDynamics, atmosphere
+from .jsbsim_xml import load_aircraft
+
+'''
+fly_with_alt_yaw_vel 的增益表离线生成
+'''
+# arena.autotune 对每种机型只调出一组增益，这里把飞行状态按高度带 x 马赫数带分格，每一格调一组：
+# 格子中心的高度、马赫数作为初始状态，每格各自一个 CMA-ES，但所有格子的候选放在同一次 rollout 里一起推进。
+# 除了两组 PID 增益，俯仰指令限幅也一起搜（代价里有超迎角、超过载的惩罚，低速、大高度的格子会收得更紧），
+# 匀速油门直接取格子中心的配平油门，代替原来固定的 0.395。
+# 结果存成 (机型, 高度带, 马赫数带, 列) 的 npz，智能体用 funcs_pid.GainSchedule 按带号直接取一行。
+# 用法：
+#   python -m arena.gain_schedule -o agents/houlang_dev/gain_schedule.npz --seed-gains agents/houlang_dev/pid_gains.npz
+
+# (起点, 带宽, 带数)，超出范围的按两端的带查
+ALTITUDE_BANDS = (0., 4000., 3)    # 0~4km、4~8km、8km 以上
+MACH_BANDS = (0.5, 0.2, 4)         # 0.7 以下、0.7~0.9、0.9~1.1、1.1 以上
+
+# 俯仰指令限幅的搜索范围，上限是真仿真里验证过的手调值（funcs_pid.ELEVATOR_LIMIT_MAX），代理模型上调出来的只能更紧
+ELEVATOR_LIMIT_RANGE = (0.3, 0.7)
+
+
+def band_centers(bands):
+    start, width, n = bands
+    return start + width * (np.arange(int(n)) + 0.5)
+
+
+def conditions(altitude_bands=ALTITUDE_BANDS, mach_bands=MACH_BANDS):
+    """ 每个格子中心的 [高度, 真空速]，(高度带数 * 马赫数带数, 2)，先按高度后按马赫数排 """
+    height, mach = np.meshgrid(band_centers(altitude_bands), band_centers(mach_bands), indexing='ij')
+    sound = atmosphere(height)[3]
+    return np.stack([height.ravel(), (mach * sound).ravel()], -1)
+
+
+def build_airframe(airframe, seed_gains=DEFAULT_GAINS, generations=20, popsize=24, sigma=0.2, seed=0,
+                   altitude_bands=ALTITUDE_BANDS, mach_bands=MACH_BANDS, model=None, verbose=True, **kwargs):
+    """_summary_
+
+    Args:
+        airframe (str): AIRFRAMES 里的机型
+        seed_gains (ndarray): (6,) 各格子 CMA-ES 的初始增益，一般是 arena.autotune 给这个机型调出来的
+        generations (int): 迭代代数
+        popsize (int): 每格每代的候选数
+        sigma (float): log10 空间里的初始步长
+        kwargs: 透传给 rollout（maneuvers、duration）
+
+    Returns:
+        ndarray: (高度带数, 马赫数带数, len(SCHEDULE_COLUMNS)) 的表
+    """
+    model = model or load_aircraft('fighter')
+    cells = conditions(altitude_bands, mach_bands)
+    n_cells = len(cells)
+    # 每个格子的参数：log10 的 6 个增益 + log10 的俯仰限幅
+    mean = np.append(np.log10(seed_gains), np.log10(0.7))
+    low = np.append(np.full(6, -4.), np.log10(ELEVATOR_LIMIT_RANGE[0]))
+    high = np.append(np.full(6, 1.), np.log10(ELEVATOR_LIMIT_RANGE[1]))
+    searches = [CMAES(mean, sigma, popsize, seed + k) for k in range(n_cells)]
+    best_x = np.tile(mean, (n_cells, 1))
+    best_cost = np.full(n_cells, np.inf)
+    for generation in range(generations):
+        start = time.time()
+        x = np.clip(np.stack([es.ask() for es in searches], 1), low, high)  # (popsize, 格子数, 7)
+        if generation == 0:
+            x[0] = mean
+        cost = score(rollout(10 ** x[..., :6], airframe, cells, model=model, elevator_limit=10 ** x[..., 6],
+                             throttle='trim', **kwargs), per_condition=True)
+        for k, es in enumerate(searches):
+            es.tell(x[:, k], cost[:, k])
+        improved = cost.min(axis=0) < best_cost
+        best_cost[improved] = cost.min(axis=0)[improved]
+        best_x[improved] = x[cost.argmin(axis=0), np.arange(n_cells)][improved]
+        if verbose:
+            print(f'{airframe} 第 {generation} 代：各格最好代价平均 {best_cost.mean():.3f}，耗时 {time.time() - start:.1f}s')
+
+    dyn = FighterDynamics(n_cells, model, AIRFRAMES[airframe])
+    pos = np.zeros((n_cells, 3))
+    pos[:, 2] = dyn.conf['z_ref'] - cells[:, 0]
+    trim = dyn.reset(pos, np.zeros((n_cells, 3)), cells[:, 1])
+    table = np.concatenate([10 ** best_x[:, :6], trim[:, None], 10 ** best_x[:, 6:]], 1)
+    return table.reshape(int(altitude_bands[2]), int(mach_bands[2]), len(SCHEDULE_COLUMNS))
+
+
+def save_schedule(path, tables, altitude_bands=ALTITUDE_BANDS, mach_bands=MACH_BANDS):
+    """ tables: {机型: (高度带数, 马赫数带数, 列数)}，和 funcs_pid.GainSchedule 读的格式一致 """
+    names = list(tables)
+    np.savez(path, table=np.stack([tables[name] for name in names]), airframes=np.array(names),
+             columns=np.array(SCHEDULE_COLUMNS), altitude_bands=np.array(altitude_bands, dtype=np.float64),
+             mach_bands=np.array(mach_bands, dtype=np.float64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='fly_with_alt_yaw_vel 的增益表离线生成')
+    parser.add_argument('-o', '--out', default='agents/houlang_dev/gain_schedule.npz')
+    parser.add_argument('--seed-gains', default='agents/houlang_dev/pid_gains.npz',
+                        help='arena.autotune 的结果，作为各格子的初始增益，文件不存在时用手调增益')
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--popsize', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    assert SCHEDULE_COLUMNS[:6] == GAIN_NAMES
+    seeds = {}
+    if os.path.exists(args.seed_gains):
+        with np.load(args.seed_gains) as data:
+            seeds = dict(zip(data['airframes'], data['gains']))
+    model = load_aircraft('fighter')
+    tables = {}
+    for airframe in SCHEDULE_AIRFRAMES:
+        tables[airframe] = build_airframe(airframe, seeds.get(airframe, DEFAULT_GAINS), args.generations, args.popsize,
+                                          seed=args.seed, model=model)
+        print(f'{airframe}: 匀速油门 {np.round(tables[airframe][..., 6], 3).tolist()}，'
+              f'俯仰限幅 {np.round(tables[airframe][..., 7], 2).tolist()}')
+    save_schedule(args.out, tables)
+    print(f'saved to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener, wait
+
+import numpy as np
+
+from .control import Action, action2cmd, get_control_action, get_obs
+
+'''
+本机批量推理服务
+'''
+# 多个采样进程不再各自加载一份飞控模型、逐条做 batch=1 的前向，而是把观测发给这个服务，
+# 服务把一个时间窗口内收到的请求拼成一个 batch 做一次前向，再按请求拆开发回去。
+# 通信用 multiprocessing.connection（Linux 上是 Unix socket，Windows 上是命名管道），
+# 请求和回复都是裸的 float32 / int64 字节，不走 pickle。
+# 用法：
+#   python -m arena.inference_server --model agents/houlang/model.npz --address /tmp/hd_fc.sock
+#   client = InferenceClient('/tmp/hd_fc.sock'); cmds = client.control_cmd_batch(obs.my_planes, targets)
+
+DEFAULT_ADDRESS = r'\\.\pipe\hd_fc_inference' if sys.platform == 'win32' else '/tmp/hd_fc_inference.sock'
+
+# 回复里每行动作的顺序，和 get_control_action 里的顺序一致
+ACTION_ORDER = [Action.AILERON, Action.ELEVATOR, Action.RUDDER, Action.THROTTLE]
+
+
+def load_model(path, seed=None):
+    """ .npz 用纯 NumPy 的模型（融合归一化），.pkl 用 torch 的 FCModel。
+    模型的前向只在智能体包里有，只有从文件加载模型时才导入，InferenceServer 本身可以传任何模型对象
+    """
+    if path.endswith('.npz'):
+        from agents.houlang.funcs_np import create_np_fc_model
+        return create_np_fc_model(path, seed=seed, fused=True)
+    from agents.houlang.funcs_rl import create_fc_model
+    return create_fc_model(path, fused=True)
+
+
+class InferenceServer:
+    def __init__(self, model, address=DEFAULT_ADDRESS, obs_dim=16, max_batch=4096, window=2e-3, authkey=None):
+        """_summary_
+
+        Args:
+            model: FCModel / NpFCModel，或者任何 model(obs) -> {动作名: (n,)} 的对象
+            address (str): 监听地址
+            max_batch (int): 攒够这么多行就立即前向
+            window (float): 第一条请求到达后最多再等多久（秒）；所有已连接的客户端都在等时不再等
+        """
+        self.model = model
+        self.address = address
+        self.obs_dim = obs_dim
+        self.max_batch = max_batch
+        self.window = window
+        if isinstance(address, str) and not address.startswith('\\\\') and os.path.exists(address):
+            os.remove(address)
+        self.listener = Listener(address, authkey=authkey)
+        self.conns = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.num_batches = 0
+        self.num_rows = 0
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break
+            with self.lock:
+                self.conns.append(conn)
+
+    def _drop(self, conn):
+        with self.lock:
+            if conn in self.conns:
+                self.conns.remove(conn)
+        conn.close()
+
+    def _forward(self, pending):
+        obs = np.concatenate([o for _, o in pending]) if len(pending) > 1 else pending[0][1]
+        outs = self.model._to_numpy(self.model(obs)) if hasattr(self.model, '_to_numpy') else self.model(obs)
+        actions = np.stack([np.asarray(outs[k]) for k in ACTION_ORDER], -1).astype(np.int64)
+        self.num_batches += 1
+        self.num_rows += len(obs)
+        start = 0
+        for conn, o in pending:
+            try:
+                conn.send_bytes(actions[start:start + len(o)].tobytes())
+            except OSError:
+                self._drop(conn)
+            start += len(o)
+
+    def serve_forever(self):
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        pending = []
+        rows = 0
+        deadline = None
+        while self.running:
+            # 每个客户端发一条请求后会等回复，所以已经在 pending 里的连接不用再看
+            with self.lock:
+                idle = [c for c in self.conns if all(c is not p for p, _ in pending)]
+                num_conns = len(self.conns)
+            timeout = 0.05 if deadline is None else max(0., deadline - time.perf_counter())
+            if idle:
+                ready = wait(idle, timeout)
+            else:
+                time.sleep(min(timeout, 1e-3))
+                ready = []
+            for conn in ready:
+                try:
+                    data = conn.recv_bytes()
+                except (EOFError, OSError):
+                    self._drop(conn)
+                    continue
+                obs = np.frombuffer(data, dtype=np.float32).reshape(-1, self.obs_dim)
+                pending.append((conn, obs))
+                rows += len(obs)
+                if deadline is None:
+                    deadline = time.perf_counter() + self.window
+            if pending and (rows >= self.max_batch or len(pending) >= num_conns
+                            or time.perf_counter() >= deadline):
+                self._forward(pending)
+                pending, rows, deadline = [], 0, None
+
+    def start(self):
+        """ 在后台线程里跑，返回线程 """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.running = False
+        self.listener.close()
+        with self.lock:
+            for conn in self.conns:
+                conn.close()
+            self.conns = []
+
+
+class InferenceClient:
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        self.conn = Client(address, authkey=authkey)
+
+    def act(self, obs):
+        """ obs: (n, obs_dim)，返回 (n, 4) 的离散动作，列的顺序是 ACTION_ORDER """
+        obs = np.ascontiguousarray(obs, dtype=np.float32)
+        n = len(obs) if obs.ndim > 1 else 1
+        self.conn.send_bytes(obs.tobytes())
+        return np.frombuffer(self.conn.recv_bytes(), dtype=np.int64).reshape(n, len(ACTION_ORDER))
+
+    def control_cmd_batch(self, infos, targets):
+        """ 和 FCModelBase.control_cmd_batch 一样，返回 {飞机ID: cmd} """
+        ids = [pid for pid in infos if pid in targets]
+        if not ids:
+            return {}
+        obs = np.stack([get_obs(infos[pid], targets[pid]) for pid in ids])
+        actions = self.act(obs)
+        control = get_control_action({k: actions[:, i] for i, k in enumerate(ACTION_ORDER)})
+        return {pid: action2cmd(c) for pid, c in zip(ids, control)}
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本机批量推理服务')
+    parser.add_argument('--model', default='agents/houlang/model.npz')
+    parser.add_argument('--address', default=DEFAULT_ADDRESS)
+    parser.add_argument('--max-batch', type=int, default=4096)
+    parser.add_argument('--window', type=float, default=2e-3, help='批处理时间窗口（秒）')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = InferenceServer(load_model(args.model, seed=args.seed), args.address,
+                             max_batch=args.max_batch, window=args.window)
+    print(f'listening on {args.address}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if server.num_batches:
+            print(f'{server.num_batches} 个 batch，平均 {server.num_rows / server.num_batches:.1f} 行')
+
+
+if __name__ == '__main__':
+    main()
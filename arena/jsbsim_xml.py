@@ -0,0 +1,543 @@
+import argparse
+import copy
+import functools
+import hashlib
+import math
+import operator
+import os
+import pickle
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+'''
+JSBSim 飞机 XML 的解析和编译
+'''
+# 把 gym_jsbsim 里飞机文件的 <table> 编译成 NumPy 插值网格，<function> 编译成嵌套元组的表达式树，
+# 再读出 metrics / mass_balance / 油箱 / 发动机的常数，得到一个可以 pickle 的 AircraftModel。
+# 表达式按属性名求值：props 是 {属性名: ndarray}，一次算 K 架飞机；引用到的具名函数按需求值并写回 props，
+# 同一次求值里只算一遍。表按 JSBSim 的规则查：各维断点不等间距，超出范围按边界截断，不外插。
+# 三维表的各张子表断点不一定一样，编译时并到所有子表断点的并集上（双线性插值在细分网格上取值不变）。
+# 初始条件文件（basic_ic.xml、minimal_ic.xml、aircraft/<name>/reset*.xml）也一起解析，放在 initial_conditions 里。
+# 解析一次约 50ms。编译结果缓存在 ~/.cache/hd_arena/jsbsim/<name>-<哈希>.bin/.meta：哈希只看源文件内容，
+# .bin 是所有表拼起来的 float64 数组，加载时 np.memmap 只读映射，表数据都是它上面的视图，
+# 多个 worker 进程共用操作系统的同一份页缓存，不各自拷贝；.meta 是 pickle 的其余部分（表达式树、常数）。
+# 可以先跑一次 python -m arena.jsbsim_xml 把缓存建好，worker 启动时就只剩打开文件和 unpickle。
+# 用法：
+#   model = load_aircraft('fighter')
+#   props = {'aero/alpha-deg': np.array([2., 4.]), ...}
+#   model.evaluate('aero/coefficient/force/Z_t-lbf', props)
+
+JSBSIM_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gym_jsbsim')
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'hd_arena', 'jsbsim')
+CACHE_VERSION = 2  # 编译结果的格式变了要加一，旧缓存自动失效
+
+# 各种单位换算到 JSBSim 内部用的英制：长度 ft（位置 in）、面积 ft²、重量 lbs、惯量 slug·ft²
+UNITS = {
+    'FT': 1., 'M': 3.2808399, 'IN': 1 / 12.,
+    'FT2': 1., 'M2': 10.7639104,
+    'LBS': 1., 'KG': 2.20462262,
+    'SLUG*FT2': 1., 'KG*M2': 0.737562149,
+    'DEG': 1., 'RAD': 180 / math.pi,
+    'FT/SEC': 1., 'M/SEC': 3.2808399, 'KTS': 1.68780986,
+}
+LOCATION_UNITS = {'IN': 1., 'FT': 12., 'M': 39.3700787}
+
+# 表达式里的运算，参数都是已经求好值的 ndarray
+UNARY_OPS = {
+    'abs': np.abs, 'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'asin': lambda x: np.arcsin(np.clip(x, -1, 1)), 'acos': lambda x: np.arccos(np.clip(x, -1, 1)),
+    'atan': np.arctan, 'exp': np.exp, 'log2': np.log2, 'ln': np.log, 'log10': np.log10, 'sqrt': np.sqrt,
+    'sign': lambda x: np.where(x < 0, -1., 1.), 'integer': np.trunc, 'fraction': lambda x: x - np.trunc(x),
+    'toradians': np.radians, 'todegrees': np.degrees, 'not': lambda x: np.where(x == 0, 1., 0.),
+}
+BINARY_OPS = {
+    'quotient': lambda a, b: np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=b != 0),
+    'pow': np.power, 'atan2': np.arctan2, 'mod': np.fmod,
+    'lt': lambda a, b: (a < b) * 1., 'le': lambda a, b: (a <= b) * 1., 'gt': lambda a, b: (a > b) * 1.,
+    'ge': lambda a, b: (a >= b) * 1., 'eq': lambda a, b: (a == b) * 1., 'nq': lambda a, b: (a != b) * 1.,
+}
+NARY_OPS = {
+    'sum': lambda xs: sum(xs[1:], xs[0]),
+    'product': lambda xs: functools.reduce(operator.mul, xs[1:], xs[0]),
+    'difference': lambda xs: xs[0] - sum(xs[1:], 0.),
+    'min': lambda xs: np.minimum.reduce(np.broadcast_arrays(*xs)),
+    'max': lambda xs: np.maximum.reduce(np.broadcast_arrays(*xs)),
+    'avg': lambda xs: sum(xs[1:], xs[0]) / len(xs),
+    'and': lambda xs: np.logical_and.reduce(np.broadcast_arrays(*xs)) * 1.,
+    'or': lambda xs: np.logical_or.reduce(np.broadcast_arrays(*xs)) * 1.,
+}
+
+
+def locate(breakpoints, x):
+    """ x 在断点里的下标和比例，超出范围截断到两端；只有一个断点时比例恒为 0 """
+    x = np.asarray(x, dtype=np.float64)
+    if len(breakpoints) == 1:
+        return np.zeros(x.shape, dtype=np.int64), np.zeros(x.shape)
+    i = np.clip(np.searchsorted(breakpoints, x, side='right') - 1, 0, len(breakpoints) - 2)
+    return i, np.clip((x - breakpoints[i]) / (breakpoints[i + 1] - breakpoints[i]), 0., 1.)
+
+
+class Table:
+    """ 1~3 维表，axes 按 row / column / table 的顺序，data 的形状是各维断点数 """
+
+    def __init__(self, props, axes, data):
+        self.props = list(props)
+        self.axes = [np.asarray(a, dtype=np.float64) for a in axes]
+        self.data = np.asarray(data, dtype=np.float64)
+        # 断点数组的指纹：同一个属性、同样断点的轴在一次求值里只定位一次
+        self.axis_keys = [(p, a.tobytes()) for p, a in zip(self.props, self.axes)]
+        strides = np.cumprod([1] + [len(a) for a in self.axes[:0:-1]])[::-1]
+        self.corners = []
+        for corner in range(1 << len(self.axes)):
+            bits = [(corner >> d) & 1 if len(self.axes[d]) > 1 else 0 for d in range(len(self.axes))]
+            if bits in [b for b, _ in self.corners]:
+                continue
+            self.corners.append((bits, int(np.dot(bits, strides))))
+        self.strides = [int(s) for s in strides]
+
+    def __call__(self, *values):
+        return self.interpolate([locate(a, v) for a, v in zip(self.axes, values)])
+
+    def interpolate(self, located):
+        """ located: 每一维 locate 的结果，按角点权重求和 """
+        flat = self.data.ravel()
+        base = sum(i * stride for (i, _), stride in zip(located, self.strides))
+        result = 0.
+        for bits, offset in self.corners:
+            weight = 1.
+            for bit, (_, frac) in zip(bits, located):
+                weight = weight * (frac if bit else 1 - frac)
+            result = result + weight * flat[base + offset]
+        return result
+
+
+# ----------------------------------------------------------------------
+# 解析
+
+def _numbers(text):
+    return [float(x) for x in (text or '').split()]
+
+
+def _parse_table_data(element):
+    rows = [_numbers(line) for line in (element.text or '').strip().splitlines()]
+    return [r for r in rows if r]
+
+
+def _parse_2d(element):
+    rows = _parse_table_data(element)
+    cols = rows[0]
+    return [r[0] for r in rows[1:]], cols, [r[1:] for r in rows[1:]]
+
+
+def parse_table(element):
+    lookup = {'row': None, 'column': None, 'table': None}
+    for var in element.findall('independentVar'):
+        lookup[var.get('lookup', 'row')] = var.text.strip()
+    props = [lookup[k] for k in ('row', 'column', 'table') if lookup[k] is not None]
+    data_elements = element.findall('tableData')
+    if len(props) == 1:
+        rows = _parse_table_data(data_elements[0])
+        return Table(props, [[r[0] for r in rows]], [r[1] for r in rows])
+    if len(props) == 2:
+        rows, cols, data = _parse_2d(data_elements[0])
+        return Table(props, [rows, cols], data)
+    # 三维表：每个 breakPoint 一张二维子表，并到断点并集上再叠起来
+    breakpoints = [float(e.get('breakPoint')) for e in data_elements]
+    subtables = []
+    for e in data_elements:
+        rows, cols, data = _parse_2d(e)
+        subtables.append(Table(props[:2], [rows, cols], data))
+    rows = np.unique(np.concatenate([t.axes[0] for t in subtables]))
+    cols = np.unique(np.concatenate([t.axes[1] for t in subtables]))
+    mesh = np.meshgrid(rows, cols, indexing='ij')
+    data = np.stack([t(*mesh) for t in subtables], axis=-1)
+    order = np.argsort(breakpoints)
+    return Table(props, [rows, cols, np.asarray(breakpoints)[order]], data[..., order])
+
+
+def _parse_property(text):
+    text = text.strip()
+    if text.startswith('-'):
+        return ('p', text[1:], -1.)
+    return ('p', text, 1.)
+
+
+def parse_expression(element, tables):
+    """ 把 <function> 下的一个元素编译成表达式树，表对象放进 tables，树里只存下标 """
+    tag = element.tag
+    if tag in ('v', 'value'):
+        return ('v', float(element.text))
+    if tag in ('p', 'property'):
+        return _parse_property(element.text)
+    if tag == 'table':
+        tables.append(parse_table(element))
+        return ('t', len(tables) - 1)
+    children = [parse_expression(c, tables) for c in element if isinstance(c.tag, str) and c.tag != 'description']
+    if tag in UNARY_OPS or tag in BINARY_OPS or tag in NARY_OPS or tag == 'ifthen':
+        return (tag, *children)
+    raise ValueError(f'不支持的函数元素 <{tag}>')
+
+
+def parse_function(element, tables):
+    """ <function> 只有一个子元素（description 除外） """
+    body = [c for c in element if isinstance(c.tag, str) and c.tag != 'description']
+    if len(body) != 1:
+        raise ValueError(f'函数 {element.get("name")} 应该只有一个表达式')
+    return parse_expression(body[0], tables)
+
+
+def _value(element, default_unit='FT'):
+    return float(element.text) * UNITS[element.get('unit', default_unit).upper()]
+
+
+def _location(element):
+    scale = LOCATION_UNITS[element.get('unit', 'IN').upper()]
+    return np.array([float(element.findtext(k, '0')) for k in 'xyz']) * scale
+
+
+def parse_clipto(element, tables):
+    """ <clipto> 的上下限可以是数也可以是属性名 """
+    bounds = []
+    for key in ('min', 'max'):
+        text = element.findtext(key).strip()
+        try:
+            bounds.append(('v', float(text)))
+        except ValueError:
+            bounds.append(_parse_property(text))
+    return bounds
+
+
+class AircraftModel:
+    """ 编译好的飞机模型，只有数组、元组和 Table，可以直接 pickle """
+
+    def __init__(self, name):
+        self.name = name
+        self.functions = {}
+        self.tables = []
+        self.axes = {}
+        self.constants = {}
+        self.metrics = {}
+        self.locations = {}
+        self.inertia = np.zeros((3, 3))
+        self.empty_weight = 0.
+        self.point_masses = []
+        self.tanks = []
+        self.engine = {}
+        self.hysteresis_limits = None
+        self.initial_conditions = {}  # {文件名: {元素名: 值}}，见 parse_initial_conditions
+        self.blob = None  # 从缓存加载时，所有表数据所在的只读 mmap
+
+    def detach(self):
+        """ 把所有表的断点和数据拼成一个 float64 数组，返回 (表里只剩 (偏移, 形状) 的模型副本, 数组) """
+        chunks, offset = [], 0
+
+        def ref(array):
+            nonlocal offset
+            chunks.append(array.ravel())
+            offset += array.size
+            return offset - array.size, array.shape
+
+        skeleton = copy.copy(self)
+        skeleton.blob = None
+        skeleton.tables = []
+        for table in self.tables:
+            stub = copy.copy(table)
+            stub.axes = [ref(a) for a in table.axes]
+            stub.data = ref(table.data)
+            skeleton.tables.append(stub)
+        return skeleton, np.concatenate(chunks) if chunks else np.zeros(0)
+
+    def attach(self, blob):
+        """ detach 的逆操作，表数据都成为 blob 上的视图（不拷贝） """
+        def view(ref):
+            offset, shape = ref
+            return blob[offset:offset + int(np.prod(shape))].reshape(shape)
+
+        for table in self.tables:
+            table.axes = [view(a) for a in table.axes]
+            table.data = view(table.data)
+        self.blob = blob
+
+    # ------------------------------------------------------------------
+    # 求值
+
+    def _eval(self, expr, props):
+        kind = expr[0]
+        if kind == 'v':
+            return expr[1]
+        if kind == 'p':
+            value = self.get(expr[1], props)
+            return value if expr[2] > 0 else -value
+        if kind == 't':
+            table = self.tables[expr[1]]
+            located = []
+            for (prop, fingerprint), axis in zip(table.axis_keys, table.axes):
+                # 定位结果也缓存在 props 里，键是元组，不会和属性名冲突
+                key = ('locate', prop, fingerprint)
+                if key not in props:
+                    props[key] = locate(axis, self.get(prop, props))
+                located.append(props[key])
+            return table.interpolate(located)
+        if kind == 'ifthen':
+            # 两个分支都会算，没选中的分支里可能有负数开方之类的 nan
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cond, a, b = [self._eval(e, props) for e in expr[1:]]
+            return np.where(cond != 0, a, b)
+        args = [self._eval(e, props) for e in expr[1:]]
+        if kind in UNARY_OPS:
+            return UNARY_OPS[kind](np.asarray(args[0], dtype=np.float64))
+        if kind in BINARY_OPS:
+            return BINARY_OPS[kind](*np.broadcast_arrays(*[np.asarray(a, dtype=np.float64) for a in args]))
+        if kind == 'clip':
+            return np.clip(args[0], args[1], args[2])
+        return NARY_OPS[kind](args)
+
+    def get(self, name, props):
+        """ 取属性值：props 里有就直接用，没有就找同名函数求值后写回 props """
+        if name in props:
+            return props[name]
+        if name in self.constants:
+            return self.constants[name]
+        if name not in self.functions:
+            raise KeyError(f'属性 {name} 既不在 props 里，也不是 {self.name} 里定义的函数')
+        props[name] = value = self._eval(self.functions[name], props)
+        return value
+
+    def evaluate(self, names, props):
+        """ names 是一个名字时返回一个数组，是列表时返回列表；props 会被写入中间结果 """
+        if isinstance(names, str):
+            return self.get(names, props)
+        return [self.get(name, props) for name in names]
+
+    def aero_forces(self, props):
+        """ 返回 (force, moment)，都是 (..., 3)：机体系下的力（lbf）和绕气动参考点的力矩（lbf·ft），
+        顺序是 X / Y / Z 和 ROLL / PITCH / YAW """
+        def axis_sum(axis):
+            return sum((self.get(name, props) for name in self.axes.get(axis, [])), 0.)
+        force = np.stack(np.broadcast_arrays(*[axis_sum(a) for a in ('X', 'Y', 'Z')]), axis=-1)
+        moment = np.stack(np.broadcast_arrays(*[axis_sum(a) for a in ('ROLL', 'PITCH', 'YAW')]), axis=-1)
+        return force, moment
+
+    # ------------------------------------------------------------------
+    # 质量
+
+    def mass_properties(self, fuel_fraction=1.):
+        """ 返回 (重量 lbs, 重心位置 in（结构坐标系）, 绕重心的惯量矩阵 slug·ft²（机体坐标系）) """
+        masses = [(self.empty_weight, self.locations['CG'])]
+        masses += [(w, loc) for w, loc in self.point_masses]
+        masses += [(content * fuel_fraction, loc) for content, loc in self.tanks]
+        weight = sum(w for w, _ in masses)
+        cg = sum(w * loc for w, loc in masses) / weight
+        inertia = self.inertia.copy()
+        # 点质量和油箱按平行轴定理加到空机惯量上，结构坐标系 x 向后、z 向上，转到机体系再算
+        for w, loc in masses[1:]:
+            r = (loc - cg) / 12. * np.array([-1., 1., -1.])
+            inertia += w / 32.174 * (np.dot(r, r) * np.eye(3) - np.outer(r, r))
+        return weight, cg, inertia
+
+
+def _parse_metrics(model, element):
+    for child in element:
+        if not isinstance(child.tag, str):
+            continue
+        if child.tag == 'location':
+            model.locations[child.get('name')] = _location(child)
+        else:
+            unit = {'wingarea': 'FT2', 'htailarea': 'FT2', 'vtailarea': 'FT2', 'wing_incidence': 'DEG'}.get(child.tag, 'FT')
+            model.metrics[child.tag] = _value(child, unit)
+    metrics = model.metrics
+    model.constants.update({
+        'metrics/Sw-sqft': metrics.get('wingarea', 0.),
+        'metrics/bw-ft': metrics.get('wingspan', 0.),
+        'metrics/cbarw-ft': metrics.get('chord', 0.),
+        'metrics/Sh-sqft': metrics.get('htailarea', 0.),
+        'metrics/lh-ft': metrics.get('htailarm', 0.),
+        'metrics/Sv-sqft': metrics.get('vtailarea', 0.),
+        'metrics/lv-ft': metrics.get('vtailarm', 0.),
+        'metrics/iw-deg': metrics.get('wing_incidence', 0.),
+    })
+    for axis, value in zip('xyz', model.locations.get('AERORP', np.zeros(3))):
+        model.constants[f'metrics/aero-rp-{axis}-in'] = float(value)
+
+
+def _parse_mass_balance(model, element):
+    moments = {k: _value(element.find(k), 'SLUG*FT2') if element.find(k) is not None else 0.
+               for k in ('ixx', 'iyy', 'izz', 'ixy', 'ixz', 'iyz')}
+    # JSBSim 的惯性积按正值给出，惯量矩阵里取负
+    model.inertia = np.array([
+        [moments['ixx'], -moments['ixy'], -moments['ixz']],
+        [-moments['ixy'], moments['iyy'], -moments['iyz']],
+        [-moments['ixz'], -moments['iyz'], moments['izz']],
+    ])
+    model.empty_weight = _value(element.find('emptywt'), 'LBS')
+    model.locations['CG'] = _location(element.find('location'))
+    for pm in element.findall('pointmass'):
+        model.point_masses.append((_value(pm.find('weight'), 'LBS'), _location(pm.find('location'))))
+
+
+def _parse_engine(model, path):
+    root = ET.parse(path).getroot()
+    engine = {'type': root.tag, 'name': root.get('name')}
+    for child in root:
+        if isinstance(child.tag, str) and child.tag != 'function':
+            engine[child.tag] = float(child.text)
+    # 发动机的函数加上 propulsion/engine/ 前缀，和 JSBSim 里的属性名一致
+    for func in root.findall('function'):
+        name = 'propulsion/engine/' + func.get('name')
+        model.functions[name] = parse_function(func, model.tables)
+    model.engine = engine
+
+
+def parse_initial_conditions(path):
+    """ <initialize> 文件 -> {元素名: 值}，长度换成 ft、速度换成 ft/s、角度换成度，没有单位的（running 等）原样 """
+    conditions = {}
+    for child in ET.parse(path).getroot():
+        if isinstance(child.tag, str):
+            conditions[child.tag] = float(child.text) * UNITS[child.get('unit', 'FT').upper()]
+    return conditions
+
+
+def parse_aircraft(name='fighter', root=JSBSIM_ROOT):
+    """ 解析 aircraft/<name>/<name>.xml、它引用的发动机文件和初始条件文件，返回 (AircraftModel, 用到的文件列表) """
+    path = os.path.join(root, 'aircraft', name, f'{name}.xml')
+    files = [path]
+    tree = ET.parse(path).getroot()
+    model = AircraftModel(tree.get('name', name))
+    _parse_metrics(model, tree.find('metrics'))
+    _parse_mass_balance(model, tree.find('mass_balance'))
+
+    propulsion = tree.find('propulsion')
+    if propulsion is not None:
+        engine = propulsion.find('engine')
+        if engine is not None:
+            engine_path = os.path.join(root, 'engine', engine.get('file') + '.xml')
+            files.append(engine_path)
+            _parse_engine(model, engine_path)
+            thruster = engine.find('thruster')
+            if thruster is not None and thruster.find('location') is not None:
+                model.locations['THRUSTER'] = _location(thruster.find('location'))
+        for tank in propulsion.findall('tank'):
+            if tank.get('type', 'FUEL') == 'FUEL':
+                model.tanks.append((_value(tank.find('contents'), 'LBS'), _location(tank.find('location'))))
+
+    # 飞控里的 fcs_function 也编译进来（油门、杆力到指令的映射等），其他飞控元件（开关、滤波器）不在这里
+    for fcs in tree.iter('fcs_function'):
+        func = fcs.find('function')
+        if func is None:
+            continue
+        expr = parse_function(func, model.tables)
+        clipto = fcs.find('clipto')
+        if clipto is not None:
+            expr = ('clip', expr, *parse_clipto(clipto, model.tables))
+        model.functions[fcs.get('name')] = expr
+
+    aero = tree.find('aerodynamics')
+    hysteresis = aero.find('hysteresis_limits')
+    if hysteresis is not None:
+        model.hysteresis_limits = (_value(hysteresis.find('min'), 'DEG'), _value(hysteresis.find('max'), 'DEG'))
+    for func in aero.findall('function'):
+        model.functions[func.get('name')] = parse_function(func, model.tables)
+    for axis in aero.findall('axis'):
+        model.axes[axis.get('name')] = []
+        for func in axis.findall('function'):
+            model.functions[func.get('name')] = parse_function(func, model.tables)
+            model.axes[axis.get('name')].append(func.get('name'))
+
+    for ic_path in _initial_condition_files(name, root):
+        files.append(ic_path)
+        model.initial_conditions[os.path.splitext(os.path.basename(ic_path))[0]] = parse_initial_conditions(ic_path)
+    return model, files
+
+
+def _content_key(name, files):
+    """ 按源文件的内容（不看路径和修改时间）算缓存的键，换台机器、重新 checkout 都能命中 """
+    digest = hashlib.sha1(f'{CACHE_VERSION}:{name}'.encode())
+    for path in files:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as fin:
+            digest.update(fin.read())
+    return digest.hexdigest()[:16]
+
+
+def _initial_condition_files(name, root):
+    """ 初始条件文件：根目录下的 *_ic.xml 和飞机目录下的 reset*.xml """
+    aircraft_dir = os.path.join(root, 'aircraft', name)
+    files = [os.path.join(root, f) for f in sorted(os.listdir(root)) if f.endswith('_ic.xml')]
+    files += [os.path.join(aircraft_dir, f) for f in sorted(os.listdir(aircraft_dir))
+              if f.startswith('reset') and f.endswith('.xml')]
+    return files
+
+
+def _source_files(name, root):
+    """ 不解析就能知道的源文件：飞机 XML、从里面找出的发动机文件、初始条件文件 """
+    path = os.path.join(root, 'aircraft', name, f'{name}.xml')
+    files = [path]
+    with open(path, 'r', encoding='utf-8') as fin:
+        for line in fin:
+            if '<engine file=' in line:
+                files.append(os.path.join(root, 'engine', line.split('"')[1] + '.xml'))
+    return files + _initial_condition_files(name, root)
+
+
+def save_compiled(model, path):
+    """ 所有表的断点和数据拼成一个 float64 数组写到 <path>.bin（可以直接 mmap），其余部分 pickle 到 <path>.meta。
+    都先写临时文件再 os.replace，.meta 最后落盘，有 .meta 就说明 .bin 是完整的 """
+    skeleton, blob = model.detach()
+    for suffix, write in (('.bin', lambda f: f.write(blob.tobytes())),
+                          ('.meta', lambda f: pickle.dump(skeleton, f, protocol=pickle.HIGHEST_PROTOCOL))):
+        tmp = f'{path}{suffix}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as fout:
+            write(fout)
+        os.replace(tmp, path + suffix)
+
+
+def load_compiled(path):
+    """ 读 .meta，表数据都是 .bin 的只读 mmap 视图：页面按需读入，同一台机器上的进程共用一份页缓存 """
+    with open(path + '.meta', 'rb') as fin:
+        model = pickle.load(fin)
+    model.attach(np.memmap(path + '.bin', dtype=np.float64, mode='r'))
+    return model
+
+
+def compiled_path(name='fighter', root=JSBSIM_ROOT, cache_dir=DEFAULT_CACHE_DIR):
+    """ 缓存文件的路径（不含后缀），键是源文件内容的哈希 """
+    return os.path.join(cache_dir, f'{name}-{_content_key(name, _source_files(name, root))}')
+
+
+def load_aircraft(name='fighter', root=JSBSIM_ROOT, cache_dir=DEFAULT_CACHE_DIR):
+    """ 带磁盘缓存的 parse_aircraft：XML 内容没变时直接 mmap 编译好的表；cache_dir=None 时不缓存 """
+    if cache_dir is None:
+        return parse_aircraft(name, root)[0]
+    path = compiled_path(name, root, cache_dir)
+    if not os.path.exists(path + '.meta'):
+        model, _ = parse_aircraft(name, root)
+        os.makedirs(cache_dir, exist_ok=True)
+        save_compiled(model, path)
+    return load_compiled(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预先编译 JSBSim 飞机 XML，生成 mmap 缓存')
+    parser.add_argument('--aircraft', default='fighter')
+    parser.add_argument('--root', default=JSBSIM_ROOT)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    start = time.time()
+    model, files = parse_aircraft(args.aircraft, args.root)
+    parsed = time.time()
+    path = compiled_path(args.aircraft, args.root, args.cache_dir)
+    os.makedirs(args.cache_dir, exist_ok=True)
+    save_compiled(model, path)
+    load_compiled(path)
+    print(f'{len(files)} 个文件，{len(model.tables)} 张表，{len(model.functions)} 个函数，'
+          f'解析 {parsed - start:.3f}s，加载缓存 {time.time() - parsed:.3f}s')
+    print(f'saved to {path}.bin / .meta')
+
+
+if __name__ == '__main__':
+    # 经由包名调用，pickle 里记下的类才是 arena.jsbsim_xml.AircraftModel 而不是 __main__ 的
+    from arena.jsbsim_xml import main
+    main()
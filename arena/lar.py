@@ -0,0 +1,158 @@
+import argparse
+import time
+
+import numpy as np
+
+from .pointmass import G, MISSILE_TYPE_LIST, _MissilePool, _merge_conf, _normalize_angle, default_conf
+
+'''
+发射可接受区（LAR）表的离线生成
+'''
+# 在 (距离, 目标进入角, 高度差, 接近速度) 的网格上，每一格让 pointmass 的比例导引导弹去打一个
+# 保持航向 / 转到和视线垂直（置尾 90°）/ 转到背离发射点飞（置尾）的目标，进入杀伤半径的比例就是这一格的值（0~1）。
+# 所有格子 x 所有机动放进同一个 _MissilePool 里一起推进，一张表几秒钟就能算完。
+# 结果存成 npz，智能体用 funcs_lar.LaunchTable 做多线性插值查表。
+# 导弹参数是 pointmass 里估出来的，换到真仿真之前要用真仿真的数据重新生成或者校准。
+# 用法：
+#   python -m arena.lar -o agents/houlang/lar.npz
+
+# 每个弹种的网格：进入角 0 为迎头、π 为尾追；高度差为目标高度减我方高度；接近速度为发射瞬间两机的接近速度
+DEFAULT_AXES = {
+    'mid_missile': {
+        'range': np.linspace(0, 80e3, 41),
+        'aspect': np.linspace(0, np.pi, 13),
+        'dh': np.linspace(-6000, 6000, 7),
+        'closing': np.linspace(-200, 1000, 7),
+    },
+    'short_missile': {
+        'range': np.linspace(0, 24e3, 25),
+        'aspect': np.linspace(0, np.pi, 13),
+        'dh': np.linspace(-6000, 6000, 7),
+        'closing': np.linspace(-200, 1000, 7),
+    },
+}
+AXIS_NAMES = ['range', 'aspect', 'dh', 'closing']
+
+# 目标的规避机动：相对“背离发射点”方向要转到的角度，None 表示保持航向
+MANEUVERS = {'straight': None, 'beam': np.pi / 2, 'drag': 0.}
+DEFAULT_MANEUVERS = ('straight', 'beam', 'drag')
+
+
+def engagement_geometry(rng, aspect, dh, closing, target_speed=250., shooter_speed=(100., 600.)):
+    """_summary_
+
+    Args:
+        rng, aspect, dh, closing (ndarray): 形状相同的网格坐标
+        target_speed (float): 目标速度
+        shooter_speed (tuple): 我方速度的范围，接近速度由我方速度补足，超出范围时截断
+
+    Returns:
+        shooter_vel, target_pos, target_vel: (n, 3)，我方在原点，机头对准目标（NED 坐标）
+    """
+    rng, aspect, dh, closing = [np.ravel(np.asarray(a, dtype=np.float64)) for a in (rng, aspect, dh, closing)]
+    horizontal = np.sqrt(np.maximum(rng ** 2 - dh ** 2, 0.))
+    target_pos = np.stack([horizontal, np.zeros_like(rng), -dh], -1)
+    los = target_pos / np.maximum(np.linalg.norm(target_pos, axis=1, keepdims=True), 1.)
+    los[np.linalg.norm(target_pos, axis=1) == 0] = [1., 0., 0.]
+    # 目标速度和 目标->我方（水平方向 -x）的夹角就是进入角
+    target_vel = target_speed * np.stack([-np.cos(aspect), np.sin(aspect), np.zeros_like(aspect)], -1)
+    target_closing = -np.einsum('ij,ij->i', target_vel, los)
+    speed = np.clip(closing - target_closing, *shooter_speed)
+    return speed[:, None] * los, target_pos, target_vel
+
+
+def simulate_engagements(missile_type, shooter_vel, target_pos, target_vel, maneuver, turn_g=4., conf=None):
+    """_summary_
+
+    Args:
+        shooter_vel, target_pos, target_vel (ndarray): (n, 3)，见 engagement_geometry
+        maneuver (ndarray): (n,) 目标要转到的航向相对背离发射点方向的角度，nan 表示保持航向
+        turn_g (float): 目标转弯过载
+
+    Returns:
+        ndarray: (n,) bool，在最大飞行时间内是否进入杀伤半径
+    """
+    conf = _merge_conf(default_conf, conf)
+    n = len(shooter_vel)
+    pool = _MissilePool(conf, capacity=n)
+    kind = MISSILE_TYPE_LIST.index(missile_type)
+    speed, _, fly_time, _, _ = pool.params[kind]
+    pool.n = n
+    pool.pos[:] = 0.
+    norm = np.maximum(np.linalg.norm(shooter_vel, axis=1, keepdims=True), 1e-9)
+    pool.vel[:] = shooter_vel / norm * np.maximum(speed, norm)
+    pool.kind[:] = kind
+    pool.target[:] = np.arange(n)
+    pool.launch_time[:] = 0.
+    pool.alive[:n] = True
+
+    dt = conf['step_time']
+    num_steps = int(round(fly_time / dt))
+    # 飞行时间由这里的循环次数控制，池子里不再判超时，这样导弹失效就等于进入了杀伤半径
+    pool.params[kind, 2] = np.inf
+    pos, vel = np.array(target_pos, dtype=np.float64), np.array(target_vel, dtype=np.float64)
+    alive = np.ones(n, dtype=bool)
+    maneuver = np.asarray(maneuver, dtype=np.float64)
+    evading = ~np.isnan(maneuver)
+    # 水平转弯每步最多转过的角度
+    max_turn = turn_g * G / np.maximum(np.linalg.norm(vel[:, :2], axis=1), 1.) * dt
+    rng = np.random.default_rng(0)
+    for k in range(num_steps):
+        pool.step(pos, vel, alive, dt, k * dt, rng)
+        if not pool.alive[:n].any():
+            break
+        heading = np.arctan2(vel[:, 1], vel[:, 0])
+        away = np.arctan2(pos[:, 1], pos[:, 0])
+        # beam 往离当前航向近的那一侧转
+        side = np.where(_normalize_angle(heading - away) >= 0, 1., -1.)
+        error = _normalize_angle(away + side * np.nan_to_num(maneuver) - heading)
+        turn = np.where(evading, np.clip(error, -max_turn, max_turn), 0.)
+        c, s = np.cos(turn), np.sin(turn)
+        vel[:, 0], vel[:, 1] = c * vel[:, 0] - s * vel[:, 1], s * vel[:, 0] + c * vel[:, 1]
+        pos += vel * dt
+    arrived = ~pool.alive[:n]
+    return arrived
+
+
+def build_table(missile_type, axes=None, maneuvers=DEFAULT_MANEUVERS, conf=None, **kwargs):
+    """ 返回 (grid, axes)，grid 的形状是各轴长度，值是各机动下命中比例的平均 """
+    axes = axes or DEFAULT_AXES[missile_type]
+    mesh = np.meshgrid(*[axes[name] for name in AXIS_NAMES], indexing='ij')
+    shooter_vel, target_pos, target_vel = engagement_geometry(*mesh, **kwargs)
+    n = len(shooter_vel)
+    maneuver = np.repeat([np.nan if MANEUVERS[name] is None else MANEUVERS[name] for name in maneuvers], n)
+    arrived = simulate_engagements(missile_type, np.tile(shooter_vel, (len(maneuvers), 1)),
+                                   np.tile(target_pos, (len(maneuvers), 1)), np.tile(target_vel, (len(maneuvers), 1)),
+                                   maneuver, conf=conf)
+    grid = arrived.reshape(len(maneuvers), *mesh[0].shape).mean(axis=0)
+    return grid.astype(np.float32), axes
+
+
+def save_tables(path, tables):
+    """ tables: {弹种: (grid, axes)}，存成 '<弹种>' 和 '<弹种>/<轴名>' 两类数组 """
+    arrays = {}
+    for missile_type, (grid, axes) in tables.items():
+        arrays[missile_type] = grid
+        for name in AXIS_NAMES:
+            arrays[f'{missile_type}/{name}'] = np.asarray(axes[name], dtype=np.float64)
+    np.savez_compressed(path, **arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发射可接受区表的离线生成')
+    parser.add_argument('-o', '--out', default='agents/houlang/lar.npz')
+    parser.add_argument('--missile', action='append', default=None, choices=MISSILE_TYPE_LIST)
+    args = parser.parse_args()
+
+    tables = {}
+    for missile_type in args.missile or MISSILE_TYPE_LIST:
+        start = time.time()
+        grid, axes = build_table(missile_type)
+        tables[missile_type] = (grid, axes)
+        print(f'{missile_type}: {grid.shape}, 可发射格子占比 {np.mean(grid >= .5):.2f}，耗时 {time.time() - start:.1f}s')
+    save_tables(args.out, tables)
+    print(f'saved to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
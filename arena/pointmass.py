@@ -0,0 +1,371 @@
+import copy
+import types
+
+import numpy as np
+
+'''
+纯 NumPy 的点质量仿真
+'''
+# 接口和 hddf2sim.hddf2sim.HDDF2Sim 一致（reset / get_obs / send_commands / step / done / sim_time），
+# 读同样格式的 scen.json，用来在 Linux 上跑智能体、做基准和造数据：
+#   python -m arena.runner --sim arena.pointmass:PointMassSim --red ... --blue ...
+# 飞机是点质量 + 欧拉角运动学，舵面经一阶惯性变成角速度；导弹是带过载限制的比例导引。
+# 数值都是估出来的，只求行为大致合理，不和 JSBSim 对齐，胜率结论要回到真仿真上确认。
+# 所有单位的状态放在数组里一起推进，每帧只算一次 N x N 的相对几何。
+
+G = 9.81
+
+MISSILE_TYPE_LIST = ['mid_missile', 'short_missile']
+
+default_conf = {
+    'step_time': 1 / 20.0,  # 和真仿真一样 20Hz
+    'z_ref': 10000.,          # z = z_ref - height，和真仿真里 z 的范围对得上（9km 高度时 z≈1000）
+    'init_speed': 250.,
+    'min_speed': 80.,
+    'max_speed': 600.,
+    'max_thrust_acc': 15.,    # 满油门推力产生的加速度
+    'drag_k': 1.5e-4,         # 废阻加速度 = drag_k * v^2
+    'induced_drag_k': 0.3,    # 诱导阻力加速度 = induced_drag_k * 过载^2
+    'max_roll_rate': 3.0,
+    'max_pitch_rate': 0.5,
+    'max_yaw_rate': 0.1,
+    'max_g': 9.,
+    'rate_tau': 0.2,          # 舵面到角速度的一阶惯性时间常数
+    'radar_range': 60e3,
+    'radar_fov': np.radians(60.),
+    'lock': {
+        'mid_missile': {'range': 40e3, 'fov': np.radians(30.)},
+        'short_missile': {'range': 10e3, 'fov': np.radians(45.)},
+    },
+    'missile_cd': 2.0,        # 同一架飞机两次发弹的最小间隔
+    'missile': {
+        'mid_missile': {'speed': 1000., 'max_g': 30., 'fly_time': 60., 'kill_radius': 50., 'hit_prob': 0.8},
+        'short_missile': {'speed': 800., 'max_g': 40., 'fly_time': 20., 'kill_radius': 30., 'hit_prob': 0.9},
+    },
+    'nav_gain': 4.,
+    'missile_ind_start': 1001,
+}
+
+
+def _normalize_angle(angle):
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+def _merge_conf(base, override):
+    conf = copy.deepcopy(base)
+    for k, v in (override or {}).items():
+        if isinstance(v, dict) and isinstance(conf.get(k), dict):
+            conf[k] = _merge_conf(conf[k], v)
+        else:
+            conf[k] = v
+    return conf
+
+
+class PointMassSim:
+    def __init__(self, scen, use_tacview=False, save_replay=False, replay_path="replay.acmi", conf=None, seed=None):
+        """_summary_
+
+        Args:
+            scen (dict): scen.json 格式的想定
+            use_tacview / save_replay / replay_path: 为了和 HDDF2Sim 的构造参数兼容，这里不支持，忽略
+            conf (dict): 覆盖 default_conf 里的参数，嵌套的字典按键合并
+            seed (int): 命中判定的随机种子，None 时从 np.random 取，跟着 runner 的 seed 走
+        """
+        self.scen = scen
+        self.conf = _merge_conf(default_conf, conf)
+        self.seed = seed
+        self.dt = self.conf['step_time']
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # 初始化
+
+    def reset(self):
+        conf = self.conf
+        units = self.scen['units']
+        n = len(units)
+        seed = self.seed if self.seed is not None else np.random.randint(2 ** 31)
+        self.rng = np.random.default_rng(seed)
+        self.start_time = float(self.scen.get('start_time', 0.))
+        self.end_time = float(self.scen.get('end_time', 600.))
+        self.sim_time = self.start_time
+        self.num_steps = 0
+
+        self.inds = np.arange(1, n + 1)
+        self.index = {int(ind): i for i, ind in enumerate(self.inds)}
+        self.is_red = np.array([u['side'] == 'red' for u in units])
+        self.is_uav = np.array([bool(u.get('is_uav', False)) for u in units])
+        self.unit_types = [u.get('type', 'fighter') for u in units]
+        self.alive = np.ones(n, dtype=bool)
+        self.death_time = np.full(n, np.nan)
+
+        self.pos = np.array([[u['x'], u['y'], conf['z_ref'] - u['height']] for u in units], dtype=np.float64).reshape(-1, 3)
+        # 欧拉角 [roll, pitch, yaw]，机体角速度 [p, q, r]
+        self.euler = np.array([[u.get('roll', 0.), u.get('pitch', 0.), u.get('yaw', 0.)] for u in units], dtype=np.float64).reshape(-1, 3)
+        self.speed = np.full(n, conf['init_speed'])
+        self.omega = np.zeros((n, 3))
+        self.omega[:, 1] = G * np.cos(self.euler[:, 1]) * np.cos(self.euler[:, 0]) / self.speed
+        self.load = np.ones(n)
+        # 舵面 [aileron, elevator, rudder, throttle]，没收到指令时保持上一帧
+        self.ctrl = np.zeros((n, 4))
+        self.ctrl[:, 3] = 0.8
+        self.loadout = np.array([[u.get('loadout', {}).get(t, 0) for t in MISSILE_TYPE_LIST] for u in units], dtype=np.int64).reshape(-1, len(MISSILE_TYPE_LIST))
+        self.last_launch = np.full(n, -np.inf)
+        self.vel = self._velocity()
+
+        self.missiles = _MissilePool(self.conf)
+        self.done = False
+        self._update_sensors()
+
+    # ------------------------------------------------------------------
+    # 状态推进
+
+    def _velocity(self):
+        roll, pitch, yaw = self.euler.T
+        return self.speed[:, None] * np.stack([
+            np.cos(pitch) * np.cos(yaw),
+            np.cos(pitch) * np.sin(yaw),
+            -np.sin(pitch),
+        ], axis=1)
+
+    def _step_planes(self):
+        conf, dt = self.conf, self.dt
+        aileron, elevator, rudder, throttle = self.ctrl.T
+        roll, pitch, yaw = self.euler.T
+        v = self.speed
+
+        # 舵面 -> 角速度指令，俯仰通道带 1g 配平，中立杆时保持平飞
+        q_limit = conf['max_g'] * G / v
+        p_cmd = aileron * conf['max_roll_rate']
+        q_cmd = np.clip(-elevator * conf['max_pitch_rate'] + G * np.cos(pitch) * np.cos(roll) / v, -0.5 * q_limit, q_limit)
+        r_cmd = -rudder * conf['max_yaw_rate']
+        omega_cmd = np.stack([p_cmd, q_cmd, r_cmd], axis=1)
+        self.omega += (omega_cmd - self.omega) * min(dt / conf['rate_tau'], 1.)
+        p, q, r = self.omega.T
+
+        # 欧拉角运动学，pitch 当作航迹角，所以减去重力项
+        cos_pitch = np.maximum(np.cos(pitch), 1e-3)
+        turn = q * np.sin(roll) + r * np.cos(roll)
+        roll_dot = p + turn * np.tan(pitch)
+        pitch_dot = q * np.cos(roll) - r * np.sin(roll) - G * np.cos(pitch) / v
+        yaw_dot = turn / cos_pitch
+
+        self.load = v * q / G
+        acc = (throttle * conf['max_thrust_acc'] - conf['drag_k'] * v ** 2
+               - conf['induced_drag_k'] * self.load ** 2 - G * np.sin(pitch))
+
+        self.euler[:, 0] = _normalize_angle(roll + roll_dot * dt)
+        self.euler[:, 1] = np.clip(pitch + pitch_dot * dt, -1.55, 1.55)
+        self.euler[:, 2] = _normalize_angle(yaw + yaw_dot * dt)
+        self.speed = np.clip(v + acc * dt, conf['min_speed'], conf['max_speed'])
+        self.vel = self._velocity()
+        self.pos += self.vel * dt
+
+    def _update_sensors(self):
+        """ 每帧算一次所有飞机两两之间的相对几何，得到雷达照射和两种弹的锁定矩阵，[i, j] 表示 i 看 j """
+        conf = self.conf
+        rel = self.pos[None, :, :] - self.pos[:, None, :]
+        dist = np.linalg.norm(rel, axis=-1)
+        nose = self.vel / self.speed[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cos_off = np.einsum('ik,ijk->ij', nose, rel) / dist
+        hostile = (self.is_red[:, None] != self.is_red[None, :]) & self.alive[:, None] & self.alive[None, :]
+        self.dist = dist
+
+        def in_cone(max_range, fov):
+            return hostile & (dist < max_range) & (cos_off > np.cos(fov))
+
+        self.radar = in_cone(conf['radar_range'], conf['radar_fov'])
+        self.locks = [in_cone(conf['lock'][t]['range'], conf['lock'][t]['fov']) for t in MISSILE_TYPE_LIST]
+
+    def _launch(self, i, weapon):
+        weapon_type = weapon.get('type')
+        if weapon_type not in MISSILE_TYPE_LIST:
+            return
+        k = MISSILE_TYPE_LIST.index(weapon_type)
+        j = self.index.get(weapon.get('target'))
+        if j is None or not self.locks[k][i, j] or self.loadout[i, k] <= 0:
+            return
+        if self.sim_time - self.last_launch[i] < self.conf['missile_cd']:
+            return
+        self.loadout[i, k] -= 1
+        self.last_launch[i] = self.sim_time
+        self.missiles.launch(k, i, j, self.pos[i], self.vel[i], self.sim_time)
+
+    def send_commands(self, cmds, cmd_side='red'):
+        is_red = cmd_side == 'red'
+        for ind, cmd in cmds.items():
+            i = self.index.get(ind)
+            if i is None or not self.alive[i] or self.is_red[i] != is_red:
+                continue
+            if 'control' in cmd:
+                control = np.asarray(cmd['control'], dtype=np.float64)
+                self.ctrl[i, :3] = np.clip(control[:3], -1, 1)
+                self.ctrl[i, 3] = np.clip(control[3], 0, 1)
+            if cmd.get('weapon'):
+                self._launch(i, cmd['weapon'])
+
+    def step(self):
+        if self.done:
+            return
+        self._step_planes()
+        hits = self.missiles.step(self.pos, self.vel, self.alive, self.dt, self.sim_time, self.rng)
+        height = self.conf['z_ref'] - self.pos[:, 2]
+        killed = self.alive & ((height <= 0) | np.isin(np.arange(len(self.alive)), hits))
+        self.alive &= ~killed
+        self.death_time[killed] = self.sim_time
+        self.num_steps += 1
+        self.sim_time = self.start_time + self.num_steps * self.dt
+        self._update_sensors()
+        self.done = bool(self.sim_time >= self.end_time or not self.alive[self.is_red].any()
+                         or not self.alive[~self.is_red].any())
+
+    # ------------------------------------------------------------------
+    # 态势
+
+    def _plane_infos(self, idx, full):
+        """ 把 idx 里的飞机整理成带属性的对象，full=True 时带上只有我方才有的载荷和锁定信息 """
+        conf = self.conf
+        height = conf['z_ref'] - self.pos[idx, 2]
+        tas = self.speed[idx]
+        # 标准大气粗略近似：密度按 9km 标高指数衰减，声速随高度线性下降到 11km
+        cas = tas * np.exp(-height / 18000.)
+        mach = tas / (340.3 - 0.0041 * np.clip(height, 0, 11000))
+        cols = {
+            'ind': self.inds[idx],
+            'x': self.pos[idx, 0], 'y': self.pos[idx, 1], 'z': self.pos[idx, 2], 'height': height,
+            'roll': self.euler[idx, 0], 'pitch': self.euler[idx, 1], 'yaw': self.euler[idx, 2],
+            'v_north': self.vel[idx, 0], 'v_east': self.vel[idx, 1], 'v_down': self.vel[idx, 2],
+            'sp': tas, 'tas': tas, 'cas': cas, 'mach': mach,
+            'omega_p': self.omega[idx, 0], 'omega_q': self.omega[idx, 1], 'omega_r': self.omega[idx, 2],
+            'alpha': 0.01 * self.load[idx], 'beta': np.zeros(len(idx)),
+            'is_uav': self.is_uav[idx],
+        }
+        if full:
+            cols['acc_nz'] = self.load[idx]
+        rows = [dict(zip(cols, values)) for values in zip(*(np.asarray(v).tolist() for v in cols.values()))]
+        infos = []
+        for i, row in zip(idx, rows):
+            row['side'] = 'red' if self.is_red[i] else 'blue'
+            row['type'] = self.unit_types[i]
+            if full:
+                row['loadout'] = dict(zip(MISSILE_TYPE_LIST, self.loadout[i].tolist()))
+                row['mid_lock_list'] = self.inds[self.locks[0][i]].tolist()
+                row['short_lock_list'] = self.inds[self.locks[1][i]].tolist()
+            infos.append(types.SimpleNamespace(**row))
+        return infos
+
+    def _entity_info(self, ind, pos, vel, **kwargs):
+        return types.SimpleNamespace(
+            ind=int(ind), x=float(pos[0]), y=float(pos[1]), z=float(pos[2]),
+            height=float(self.conf['z_ref'] - pos[2]),
+            v_north=float(vel[0]), v_east=float(vel[1]), v_down=float(vel[2]), **kwargs)
+
+    def get_obs(self, side='red'):
+        is_mine = self.alive & (self.is_red == (side == 'red'))
+        is_enemy = self.alive & ~is_mine & (self.is_red != (side == 'red'))
+        mine = np.flatnonzero(is_mine)
+        enemies = np.flatnonzero(is_enemy)
+
+        my_planes = {info.ind: info for info in self._plane_infos(mine, full=True)}
+        seen = enemies[self.radar[mine][:, enemies].any(axis=0)] if len(mine) else enemies[:0]
+        enemy_planes = {info.ind: info for info in self._plane_infos(seen, full=False)}
+        awacs_infos = [self._entity_info(self.inds[j], self.pos[j], self.vel[j]) for j in enemies]
+
+        # 雷达告警：照射我方的敌机，以及打向我方的导弹
+        rws_infos = []
+        for j in enemies:
+            lit = mine[self.radar[j, mine]]
+            if len(lit):
+                rws_infos.append(self._entity_info(self.inds[j], self.pos[j], self.vel[j],
+                                                   alarm_ind_list=self.inds[lit].tolist()))
+        missile_infos = []
+        for m in self.missiles.active():
+            info = self._entity_info(self.missiles.inds[m], self.missiles.pos[m], self.missiles.vel[m],
+                                     type=MISSILE_TYPE_LIST[self.missiles.kind[m]],
+                                     target=int(self.inds[self.missiles.target[m]]),
+                                     fly_time=self.sim_time - self.missiles.launch_time[m])
+            if is_mine[self.missiles.shooter[m]]:
+                missile_infos.append(info)
+            elif is_mine[self.missiles.target[m]]:
+                info.alarm_ind_list = [info.target]
+                rws_infos.append(info)
+
+        return types.SimpleNamespace(
+            sim_time=self.sim_time, side=side,
+            my_planes=my_planes, enemy_planes=enemy_planes,
+            rws_infos=rws_infos, awacs_infos=awacs_infos, missile_infos=missile_infos,
+        )
+
+
+class _MissilePool:
+    """ 所有在飞导弹放在一组数组里，按需翻倍扩容，失效的槽位不回收（一局最多几十发） """
+
+    def __init__(self, conf, capacity=32):
+        self.conf = conf
+        self.params = np.array([[conf['missile'][t][k] for k in ('speed', 'max_g', 'fly_time', 'kill_radius', 'hit_prob')]
+                                for t in MISSILE_TYPE_LIST])
+        self.n = 0
+        self.pos = np.zeros((capacity, 3))
+        self.vel = np.zeros((capacity, 3))
+        self.kind = np.zeros(capacity, dtype=np.int64)
+        self.shooter = np.zeros(capacity, dtype=np.int64)
+        self.target = np.zeros(capacity, dtype=np.int64)
+        self.launch_time = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.inds = conf['missile_ind_start'] + np.arange(capacity)
+
+    def _grow(self):
+        capacity = 2 * len(self.alive)
+        for name in ('pos', 'vel', 'kind', 'shooter', 'target', 'launch_time', 'alive'):
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.inds = self.conf['missile_ind_start'] + np.arange(capacity)
+
+    def launch(self, kind, shooter, target, pos, vel, sim_time):
+        if self.n == len(self.alive):
+            self._grow()
+        m = self.n
+        self.n += 1
+        self.pos[m] = pos
+        self.vel[m] = vel / np.linalg.norm(vel) * max(self.params[kind, 0], np.linalg.norm(vel))
+        self.kind[m], self.shooter[m], self.target[m] = kind, shooter, target
+        self.launch_time[m] = sim_time
+        self.alive[m] = True
+
+    def active(self):
+        return np.flatnonzero(self.alive[:self.n])
+
+    def step(self, plane_pos, plane_vel, plane_alive, dt, sim_time, rng):
+        """ 比例导引推进一步，返回本步被命中的飞机下标 """
+        m = self.active()
+        if len(m) == 0:
+            return np.zeros(0, dtype=np.int64)
+        speed, max_g, fly_time, kill_radius, hit_prob = self.params[self.kind[m]].T
+        tgt = self.target[m]
+        pos, vel = self.pos[m], self.vel[m]
+
+        # a = N * (Ω × v)，Ω = r × v_rel / |r|^2，再限制过载
+        rel = plane_pos[tgt] - pos
+        rel_vel = plane_vel[tgt] - vel
+        omega = np.cross(rel, rel_vel) / np.maximum(np.einsum('ij,ij->i', rel, rel), 1.)[:, None]
+        acc = self.conf['nav_gain'] * np.cross(omega, vel)
+        acc_norm = np.linalg.norm(acc, axis=1, keepdims=True)
+        acc *= np.minimum(1., (max_g * G)[:, None] / np.maximum(acc_norm, 1e-9))
+        new_vel = vel + acc * dt
+        new_vel *= (speed / np.linalg.norm(new_vel, axis=1))[:, None]
+
+        # 本步内相对运动的最近距离，避免高速导弹一步跨过目标
+        rel_vel = plane_vel[tgt] - new_vel
+        t_star = np.clip(-np.einsum('ij,ij->i', rel, rel_vel) / np.maximum(np.einsum('ij,ij->i', rel_vel, rel_vel), 1e-9), 0, dt)
+        miss = np.linalg.norm(rel + rel_vel * t_star[:, None], axis=1)
+
+        self.vel[m] = new_vel
+        self.pos[m] = pos + new_vel * dt
+        arrived = miss < kill_radius
+        hit = arrived & plane_alive[tgt] & (rng.random(len(m)) < hit_prob)
+        expired = arrived | ~plane_alive[tgt] | (sim_time + dt - self.launch_time[m] > fly_time)
+        self.alive[m[expired]] = False
+        return np.unique(tgt[hit])
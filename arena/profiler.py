@@ -0,0 +1,236 @@
+import argparse
+import collections
+import contextlib
+import functools
+import importlib
+import json
+import sys
+import threading
+import time
+import traceback
+
+import numpy as np
+
+'''
+对打循环的逐帧耗时统计
+'''
+# 仿真每个 tick 是 1/20 秒，这里统计对打循环里每一段（双方的 get_obs / step / send_commands、sim.step）
+# 每帧的耗时，以及通过 wrap 挂到智能体内部方法上的分段（航迹更新、选弹、PID ……），
+# 输出 p50/p95/p99/max、对数分桶的直方图、超预算的帧数，并保存最慢几帧的分段耗时和采样到的调用栈。
+# 用法：
+#   python -m arena.profiler --red agents.team_blue.blue_agent_demo:Agent --blue agents.houlang.agent:Agent \
+#       --section blue:update_enemy_plane_tracks --section blue:get_weapon_launch_info \
+#       --section agents.houlang_dev.my_agent_demo:fly_with_alt_yaw_vel -o profile.json
+
+TICK = 1 / 20.0
+
+# 直方图的桶边界：10us ~ 10s，对数均匀
+HIST_EDGES = np.logspace(-5, 1, 25)
+
+
+class StackSampler(threading.Thread):
+    """ 后台线程定时采样主线程的调用栈，每帧的样本在 tick 结束时决定留下还是丢掉 """
+
+    def __init__(self, thread_id, interval=1e-3, depth=30):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.depth = depth
+        self.samples = collections.Counter()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=self.depth)
+            key = ';'.join(f'{f.name} ({f.filename.rsplit("/", 1)[-1]}:{f.lineno})' for f in stack)
+            with self.lock:
+                self.samples[key] += 1
+
+    def take(self):
+        with self.lock:
+            samples, self.samples = self.samples, collections.Counter()
+        return samples
+
+    def stop(self):
+        self.stopped.set()
+
+
+class StepProfiler:
+    def __init__(self, budget=TICK, keep_worst=5, sample_interval=None):
+        """_summary_
+
+        Args:
+            budget (float): 每帧的预算（秒），默认一个仿真 tick
+            keep_worst (int): 保留最慢的几帧的明细
+            sample_interval (float): 调用栈采样间隔（秒），None 表示不采样
+        """
+        self.budget = budget
+        self.keep_worst = keep_worst
+        self.times = collections.defaultdict(list)  # 分段名 -> 每帧耗时
+        self.tick_times = []
+        self.worst = []  # [(总耗时, 明细)]，按耗时从大到小
+        self._current = collections.defaultdict(float)
+        self._tick_start = None
+        self._sim_time = None
+        self.sampler = None
+        if sample_interval:
+            self.sampler = StackSampler(threading.get_ident(), sample_interval)
+            self.sampler.start()
+
+    @contextlib.contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._current[name] += time.perf_counter() - start
+
+    def wrap(self, obj, attr, name=None):
+        """ 把 obj 上的方法/函数换成带计时的版本，智能体本身不用改代码 """
+        func = getattr(obj, attr)
+        name = name or attr
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with self.section(name):
+                return func(*args, **kwargs)
+        setattr(obj, attr, timed)
+        return func
+
+    def begin_tick(self, sim_time=None):
+        self._tick_start = time.perf_counter()
+        self._sim_time = sim_time
+        self._current.clear()
+        if self.sampler:
+            self.sampler.take()
+
+    def end_tick(self):
+        total = time.perf_counter() - self._tick_start
+        tick = len(self.tick_times)
+        self.tick_times.append(total)
+        for name, value in self._current.items():
+            times = self.times[name]
+            # 某些分段不是每帧都有，补 0 让下标和 tick 对齐
+            times.extend([0.] * (tick - len(times)))
+            times.append(value)
+        stacks = self.sampler.take() if self.sampler else None
+        if len(self.worst) < self.keep_worst or total > self.worst[-1][0]:
+            detail = {'tick': tick, 'sim_time': self._sim_time, 'total': total, 'sections': dict(self._current)}
+            if stacks is not None:
+                detail['stacks'] = dict(stacks.most_common(20))
+            self.worst.append((total, detail))
+            self.worst.sort(key=lambda x: -x[0])
+            del self.worst[self.keep_worst:]
+
+    def close(self):
+        if self.sampler:
+            self.sampler.stop()
+            self.sampler.join()
+            self.sampler = None
+
+    def _stats(self, times):
+        times = np.asarray(times)
+        p50, p95, p99 = np.percentile(times, [50, 95, 99])
+        hist, _ = np.histogram(times, bins=np.concatenate([[0.], HIST_EDGES, [np.inf]]))
+        return {
+            'count': int(np.count_nonzero(times)),
+            'mean': float(times.mean()), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+            'max': float(times.max()), 'over_budget': int((times > self.budget).sum()),
+            'hist': hist.tolist(),
+        }
+
+    def report(self):
+        ticks = len(self.tick_times)
+        sections = {name: self._stats(times + [0.] * (ticks - len(times))) for name, times in self.times.items()}
+        return {
+            'budget': self.budget,
+            'ticks': ticks,
+            'hist_edges': HIST_EDGES.tolist(),
+            'tick': self._stats(self.tick_times) if ticks else None,
+            'sections': sections,
+            'worst_ticks': [detail for _, detail in self.worst],
+        }
+
+    def save(self, path):
+        with open(path, 'w') as fout:
+            json.dump(self.report(), fout, ensure_ascii=False, separators=(',', ':'))
+
+    def summary(self):
+        report = self.report()
+        lines = [f"{'section':<40}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'>budget':>9}  (ms)"]
+        rows = [('tick', report['tick'])] + sorted(report['sections'].items(), key=lambda x: -x[1]['p99'])
+        for name, s in rows:
+            if s is None:
+                continue
+            lines.append(f"{name:<40}{s['p50'] * 1e3:>10.3f}{s['p95'] * 1e3:>10.3f}{s['p99'] * 1e3:>10.3f}"
+                         f"{s['max'] * 1e3:>10.3f}{s['over_budget']:>9d}")
+        return '\n'.join(lines)
+
+
+class NullProfiler:
+    """ 不统计时 run_match 用这个，section 直接返回空的 context """
+    _null = contextlib.nullcontext()
+
+    def section(self, name):
+        return self._null
+
+    def begin_tick(self, sim_time=None):
+        pass
+
+    def end_tick(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def attach_sections(profiler, agents, specs):
+    """_summary_
+
+    Args:
+        agents (dict): {'red': red_agent, 'blue': blue_agent}
+        specs (list): 'red:update_enemy_plane_tracks' 包装智能体实例的方法，分段名为 red.agent.update_enemy_plane_tracks
+            （单独一层 agent，'red:step' 不会和 run_match 自己的 red.step 撞名后被加到一起），
+            'agents.houlang_dev.my_agent_demo:fly_with_alt_yaw_vel' 包装模块里的全局函数，分段名为 my_agent_demo.fly_with_alt_yaw_vel
+            （要写调用方所在的模块，from ... import 进来的名字是在调用方模块里查的）
+    """
+    for spec in specs:
+        target, _, attr = spec.partition(':')
+        if target in agents:
+            profiler.wrap(agents[target], attr, f'{target}.agent.{attr}')
+        else:
+            profiler.wrap(importlib.import_module(target), attr, f'{target.rsplit(".", 1)[-1]}.{attr}')
+
+
+def main():
+    from .runner import DEFAULT_SIM, run_match
+
+    parser = argparse.ArgumentParser(description='对打循环的逐帧耗时统计')
+    parser.add_argument('--red', required=True)
+    parser.add_argument('--blue', required=True)
+    parser.add_argument('--scen', default='scen.json')
+    parser.add_argument('--sim', default=DEFAULT_SIM)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-steps', type=int, default=None)
+    parser.add_argument('--section', action='append', default=[], help='智能体内部要单独计时的方法或函数，可重复')
+    parser.add_argument('--budget', type=float, default=TICK, help='每帧预算（秒）')
+    parser.add_argument('--sample-interval', type=float, default=1e-3, help='调用栈采样间隔（秒），0 表示不采样')
+    parser.add_argument('-o', '--out', default='profile.json')
+    args = parser.parse_args()
+
+    profiler = StepProfiler(budget=args.budget, sample_interval=args.sample_interval or None)
+    try:
+        run_match(args.red, args.blue, args.scen, seed=args.seed, sim=args.sim, max_steps=args.max_steps,
+                  profiler=profiler, sections=args.section)
+    finally:
+        profiler.close()
+    profiler.save(args.out)
+    print(profiler.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import glob
+import json
+import os
+import queue
+import shutil
+import threading
+
+import numpy as np
+
+'''
+逐帧对局记录
+'''
+# 每帧把双方的 obs 和指令按列追加到内存里的一小段缓冲，攒够 chunk_ticks 帧就交给后台线程写成
+# 压缩的 npz 分块，内存占用和对局长度无关。三张表，每行都带 tick / sim_time / side：
+#   planes    我方飞机状态，一行一架飞机
+#   commands  双方指令，一行一架飞机
+#   contacts  enemy_planes / rws_infos / awacs_infos 里的目标，rws 按 alarm_ind_list 展开成多行
+# 读的时候 EpisodeReader 先把分块解压合并成每列一个 .npy（只做一次），之后都用 mmap 读。
+# 目录可以重复使用：EpisodeRecorder 打开时先删掉上一局留下的分块、合并结果和 meta.json，
+# meta.json 里记下本局写了哪些分块，EpisodeReader 只合并这些。
+
+SIDES = ['red', 'blue']
+MISSILE_TYPE_LIST = ['mid_missile', 'short_missile']
+CONTACT_SOURCES = ['enemy_planes', 'rws_infos', 'awacs_infos']
+
+PLANE_FIELDS = ['x', 'y', 'z', 'height', 'roll', 'pitch', 'yaw', 'v_north', 'v_east', 'v_down',
+                'sp', 'tas', 'cas', 'mach', 'alpha', 'beta', 'acc_nz', 'omega_p', 'omega_q', 'omega_r']
+CONTACT_FIELDS = ['x', 'y', 'z', 'v_north', 'v_east', 'v_down']
+
+# 表名 -> [(列名, dtype)]
+SCHEMA = {
+    'planes': [('tick', np.int32), ('sim_time', np.float64), ('side', np.int8), ('ind', np.int64)]
+              + [(f, np.float64 if f in ('x', 'y', 'z') else np.float32) for f in PLANE_FIELDS]
+              + [('is_uav', np.bool_), ('mid_missile', np.int8), ('short_missile', np.int8),
+                 ('n_mid_lock', np.int8), ('n_short_lock', np.int8)],
+    'commands': [('tick', np.int32), ('sim_time', np.float64), ('side', np.int8), ('ind', np.int64),
+                 ('aileron', np.float64), ('elevator', np.float64), ('rudder', np.float64), ('throttle', np.float64),
+                 ('weapon_type', np.int8), ('weapon_target', np.int64)],
+    'contacts': [('tick', np.int32), ('sim_time', np.float64), ('side', np.int8), ('source', np.int8), ('ind', np.int64)]
+                + [(f, np.float64 if f in ('x', 'y', 'z') else np.float32) for f in CONTACT_FIELDS]
+                + [('alarm_ind', np.int64)],
+}
+
+
+class EpisodeRecorder:
+    def __init__(self, path, chunk_ticks=1024, max_pending=4, meta=None):
+        """_summary_
+
+        Args:
+            path (str): 输出目录
+            chunk_ticks (int): 多少帧写一个分块
+            max_pending (int): 最多排队多少个没写完的分块，写盘跟不上时 record 会阻塞，内存不会一直涨
+            meta (dict): 额外写进 meta.json 的信息（对阵双方、想定、种子……）
+        """
+        self.path = path
+        self.chunk_ticks = chunk_ticks
+        self.meta = dict(meta or {})
+        os.makedirs(path, exist_ok=True)
+        self._clear()
+        self.num_chunks = 0
+        self.num_rows = {name: 0 for name in SCHEMA}
+        self._ticks_in_chunk = set()
+        self._new_buffers()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _clear(self):
+        """ 删掉目录里上一局的记录，只删本模块写出的文件 """
+        meta_path = os.path.join(self.path, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name in SCHEMA:
+            for chunk in glob.glob(os.path.join(self.path, f'{name}_[0-9][0-9][0-9][0-9][0-9].npz')):
+                os.remove(chunk)
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _new_buffers(self):
+        self.buffers = {name: {col: [] for col, _ in cols} for name, cols in SCHEMA.items()}
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            chunk, columns = item
+            try:
+                for name, cols in columns.items():
+                    np.savez_compressed(os.path.join(self.path, f'{name}_{chunk:05d}.npz'), **cols)
+            except Exception as e:
+                self._error = e
+
+    def _flush(self):
+        if not self._ticks_in_chunk:
+            return
+        columns = {}
+        for name, cols in SCHEMA.items():
+            buffer = self.buffers[name]
+            columns[name] = {col: np.asarray(buffer[col], dtype=dtype) for col, dtype in cols}
+            self.num_rows[name] += len(buffer['tick'])
+        self._queue.put((self.num_chunks, columns))
+        self.num_chunks += 1
+        self._ticks_in_chunk = set()
+        self._new_buffers()
+
+    def _append(self, name, row):
+        buffer = self.buffers[name]
+        for col, value in row.items():
+            buffer[col].append(value)
+
+    def record(self, tick, side, obs, cmd_dict):
+        """ 记录一方在第 tick 帧看到的 obs 和发出的指令 """
+        if self._error is not None:
+            raise self._error
+        if tick not in self._ticks_in_chunk and len(self._ticks_in_chunk) >= self.chunk_ticks:
+            self._flush()
+        self._ticks_in_chunk.add(tick)
+        head = {'tick': tick, 'sim_time': obs.sim_time, 'side': SIDES.index(side)}
+
+        for ind, plane in obs.my_planes.items():
+            row = dict(head, ind=ind)
+            for f in PLANE_FIELDS:
+                row[f] = getattr(plane, f, np.nan)
+            loadout = getattr(plane, 'loadout', {})
+            row['is_uav'] = plane.is_uav
+            row['mid_missile'] = loadout.get('mid_missile', 0)
+            row['short_missile'] = loadout.get('short_missile', 0)
+            row['n_mid_lock'] = len(plane.mid_lock_list)
+            row['n_short_lock'] = len(plane.short_lock_list)
+            self._append('planes', row)
+
+        for ind, cmd in cmd_dict.items():
+            control = cmd.get('control', [np.nan] * 4)
+            weapon = cmd.get('weapon') or {}
+            weapon_type = weapon.get('type')
+            self._append('commands', dict(
+                head, ind=ind, aileron=control[0], elevator=control[1], rudder=control[2], throttle=control[3],
+                weapon_type=MISSILE_TYPE_LIST.index(weapon_type) if weapon_type in MISSILE_TYPE_LIST else -1,
+                weapon_target=weapon.get('target', -1) if weapon_type else -1))
+
+        for source, infos in zip(CONTACT_SOURCES, (obs.enemy_planes.values(), obs.rws_infos, obs.awacs_infos)):
+            for info in infos:
+                row = dict(head, source=CONTACT_SOURCES.index(source), ind=info.ind)
+                for f in CONTACT_FIELDS:
+                    row[f] = getattr(info, f, np.nan)
+                for alarm_ind in getattr(info, 'alarm_ind_list', None) or [-1]:
+                    self._append('contacts', dict(row, alarm_ind=alarm_ind))
+
+    def close(self, result=None):
+        """ 写完剩下的数据和 meta.json，result 是 run_match 的结果，一起存下来 """
+        self._flush()
+        self._queue.put(None)
+        self._writer.join()
+        if self._error is not None:
+            raise self._error
+        chunks = {name: [f'{name}_{chunk:05d}.npz' for chunk in range(self.num_chunks)] for name in SCHEMA}
+        meta = dict(self.meta, num_chunks=self.num_chunks, num_rows=self.num_rows, chunks=chunks,
+                    schema={name: [(col, np.dtype(dtype).str) for col, dtype in cols] for name, cols in SCHEMA.items()},
+                    sides=SIDES, missile_types=MISSILE_TYPE_LIST, contact_sources=CONTACT_SOURCES)
+        if result is not None:
+            meta['result'] = result
+        with open(os.path.join(self.path, 'meta.json'), 'w') as fout:
+            json.dump(meta, fout, ensure_ascii=False, indent=2)
+
+
+class EpisodeReader:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as fin:
+            self.meta = json.load(fin)
+        self._tables = {}
+
+    def _consolidate(self, name):
+        """ 把分块解压合并成每列一个 .npy，只在第一次读这张表时做 """
+        out_dir = os.path.join(self.path, name)
+        done_flag = os.path.join(out_dir, '.done')
+        if os.path.exists(done_flag):
+            return out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        chunks = [os.path.join(self.path, chunk) for chunk in self.meta['chunks'][name]]
+        for col, dtype in self.meta['schema'][name]:
+            out = np.lib.format.open_memmap(os.path.join(out_dir, f'{col}.npy'), mode='w+',
+                                            dtype=np.dtype(dtype), shape=(self.meta['num_rows'][name],))
+            offset = 0
+            for chunk in chunks:
+                with np.load(chunk) as data:
+                    values = data[col]
+                out[offset:offset + len(values)] = values
+                offset += len(values)
+            assert offset == len(out), (name, col, offset, len(out))
+            out.flush()
+            del out
+        open(done_flag, 'w').close()
+        return out_dir
+
+    def table(self, name):
+        """ 返回 {列名: 只读 memmap} """
+        if name not in self._tables:
+            out_dir = self._consolidate(name)
+            self._tables[name] = {col: np.load(os.path.join(out_dir, f'{col}.npy'), mmap_mode='r')
+                                  for col, _ in self.meta['schema'][name]}
+        return self._tables[name]
+
+    def entity(self, name, ind, side=None):
+        """ 某个实体在 name 表里按时间排好的所有行 """
+        table = self.table(name)
+        mask = table['ind'] == ind
+        if side is not None:
+            mask &= table['side'] == SIDES.index(side)
+        return {col: values[mask] for col, values in table.items()}
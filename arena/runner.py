@@ -0,0 +1,282 @@
+import argparse
+import importlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .cache import KeyMaker, ResultCache
+from .profiler import NULL_PROFILER, attach_sections
+from .recorder import EpisodeRecorder
+
+'''
+无界面批量对打
+'''
+# 和 demo_raw.py 的对打循环一样（红方先 step、蓝方后 step，然后 sim.step()），
+# 但默认关掉 tacview 和回放，每局放到进程池里跑，每局结束就把结果写一行 jsonl。
+# 用法：
+#   python -m arena.runner --red agents.team_blue.blue_agent_demo:Agent --blue agents.houlang.agent:Agent \
+#       --scen scen.json -n 100 -j 8 -o results.jsonl
+
+DEFAULT_SIM = 'hddf2sim.hddf2sim:HDDF2Sim'
+
+
+def import_object(path, default_attr='Agent'):
+    """ 'agents.houlang.agent:Agent' -> Agent 类，省略 ':' 后面时取 default_attr """
+    if not isinstance(path, str):
+        return path
+    module_name, _, attr = path.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, attr or default_attr)
+
+
+def load_scen(scen):
+    if isinstance(scen, str):
+        with open(scen, 'r') as fin:
+            return json.load(fin)
+    return scen
+
+
+def summarize(final_obs):
+    """ 根据最后一帧双方的 obs 统计存活和剩余弹量。
+    胜负先比存活的有人机数，再比存活的总数，都相同时记为平局。
+    """
+    result = {}
+    score = {}
+    for side, obs in final_obs.items():
+        planes = list(obs.my_planes.values())
+        manned = sum(not plane.is_uav for plane in planes)
+        result[f'{side}_alive'] = len(planes)
+        result[f'{side}_manned_alive'] = manned
+        result[f'{side}_missiles_left'] = int(sum(sum(plane.loadout.values()) for plane in planes))
+        score[side] = (manned, len(planes))
+    if score['red'] > score['blue']:
+        result['winner'] = 'red'
+    elif score['red'] < score['blue']:
+        result['winner'] = 'blue'
+    else:
+        result['winner'] = 'draw'
+    return result
+
+
+class LossTracker:
+    """ 比较相邻两帧 my_planes 的 ID，记下每架飞机被击落（或坠毁）的时间 """
+
+    def __init__(self):
+        self.planes = {'red': {}, 'blue': {}}  # ID -> is_uav
+        self.events = []
+
+    def update(self, side, obs):
+        planes = self.planes[side]
+        for ind in planes.keys() - obs.my_planes.keys():
+            self.events.append({'sim_time': float(obs.sim_time), 'side': side, 'ind': int(ind), 'is_uav': bool(planes[ind])})
+        self.planes[side] = {ind: plane.is_uav for ind, plane in obs.my_planes.items()}
+
+
+def run_match(red, blue, scen, seed=None, sim=DEFAULT_SIM, max_steps=None,
+              use_tacview=False, save_replay=False, replay_path="replay.acmi", profiler=None, sections=(),
+              recorder=None):
+    """_summary_
+
+    Args:
+        red (str/type): 红方 Agent 类或导入路径
+        blue (str/type): 蓝方 Agent 类或导入路径
+        scen (str/dict): 想定文件路径或已经读好的想定
+        seed (int): 设置 random / np.random 的种子，None 表示不设置
+        sim (str/type): 仿真类或导入路径，默认 HDDF2Sim
+        max_steps (int): 最多推演多少步，None 表示推演到 sim.done
+        profiler (StepProfiler): 逐帧耗时统计，None 表示不统计
+        sections (list): 交给 attach_sections 的智能体内部计时分段
+        recorder (EpisodeRecorder): 逐帧记录双方 obs 和指令，对局结束时连同结果一起 close
+
+    Returns:
+        dict: 步数、仿真时间、耗时、summarize 的统计，以及 losses（每架被击落飞机的时间、阵营、ID）
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    sim_cls = import_object(sim, 'HDDF2Sim')
+    red_cls = import_object(red)
+    blue_cls = import_object(blue)
+
+    sim = sim_cls(load_scen(scen), use_tacview=use_tacview, save_replay=save_replay, replay_path=replay_path)
+    sim.reset()
+    red_agent = red_cls('red')
+    blue_agent = blue_cls('blue')
+    prof = profiler or NULL_PROFILER
+    if profiler is not None and sections:
+        attach_sections(profiler, {'red': red_agent, 'blue': blue_agent}, sections)
+
+    losses = LossTracker()
+    num_steps = 0
+    start = time.perf_counter()
+    while not sim.done and (max_steps is None or num_steps < max_steps):
+        prof.begin_tick(getattr(sim, 'sim_time', None))
+        with prof.section('red.get_obs'):
+            red_obs = sim.get_obs(side='red')
+        losses.update('red', red_obs)
+        with prof.section('red.step'):
+            red_cmd_dict = red_agent.step(red_obs)
+        if recorder is not None:
+            recorder.record(num_steps, 'red', red_obs, red_cmd_dict)
+        with prof.section('red.send_commands'):
+            sim.send_commands(red_cmd_dict, cmd_side='red')
+        with prof.section('blue.get_obs'):
+            blue_obs = sim.get_obs(side='blue')
+        losses.update('blue', blue_obs)
+        with prof.section('blue.step'):
+            blue_cmd_dict = blue_agent.step(blue_obs)
+        if recorder is not None:
+            recorder.record(num_steps, 'blue', blue_obs, blue_cmd_dict)
+        with prof.section('blue.send_commands'):
+            sim.send_commands(blue_cmd_dict, cmd_side='blue')
+        with prof.section('sim.step'):
+            sim.step()
+        prof.end_tick()
+        num_steps += 1
+
+    final_obs = {'red': sim.get_obs(side='red'), 'blue': sim.get_obs(side='blue')}
+    for side, obs in final_obs.items():
+        losses.update(side, obs)
+    result = {
+        'steps': num_steps,
+        'sim_time': float(final_obs['red'].sim_time),
+        'wall_time': time.perf_counter() - start,
+    }
+    result.update(summarize(final_obs))
+    result['losses'] = losses.events
+    if recorder is not None:
+        recorder.close(result)
+    return result
+
+
+def _run_job(job):
+    """ 进程池里跑一局，出错时记录 traceback 而不是让整个进程池挂掉 """
+    result = {k: job[k] for k in ('episode', 'seed', 'red', 'blue', 'scen')}
+    result.update(job.get('tags', {}))
+    try:
+        recorder = None
+        if job.get('record_dir'):
+            recorder = EpisodeRecorder(os.path.join(job['record_dir'], f"episode_{job['episode']:05d}"),
+                                       meta={k: job[k] for k in ('episode', 'seed', 'red', 'blue', 'scen')})
+        result.update(run_match(job['red'], job['blue'], job['scen'], seed=job['seed'],
+                                sim=job['sim'], max_steps=job['max_steps'], recorder=recorder))
+    except Exception:
+        result['error'] = traceback.format_exc()
+    return result
+
+
+def _quiet_worker():
+    # 智能体里有大量 print，批量跑的时候全部丢掉
+    sys.stdout = open(os.devnull, 'w')
+
+
+def make_jobs(red, blue, scen, episodes, seed=0, sim=DEFAULT_SIM, max_steps=None, record_dir=None):
+    return [{
+        'episode': i,
+        'seed': None if seed is None else seed + i,
+        'red': red,
+        'blue': blue,
+        'scen': scen,
+        'sim': sim,
+        'max_steps': max_steps,
+        'record_dir': record_dir,
+    } for i in range(episodes)]
+
+
+def run_jobs(jobs, workers=None, out_path=None, quiet=True, on_result=None, cache=None):
+    """ 在进程池里跑 jobs，每局完成后立即追加写入 out_path（jsonl）并调用 on_result(result)，返回按 episode 排序的结果。
+    给了 cache（ResultCache）时先查缓存，命中的局直接返回（带 cached=True），新跑完且没出错的局写回缓存。
+    要记录逐帧数据的局不查缓存。
+    """
+    results = []
+    keys = {}
+    cached = []
+    if cache is not None:
+        make_key = KeyMaker()
+        todo = []
+        for job in jobs:
+            key = make_key(job)
+            hit = None if job.get('record_dir') else cache.get(key)
+            if hit is None:
+                keys[job['episode']] = key
+                todo.append(job)
+            else:
+                hit.update({k: job[k] for k in ('episode', 'seed', 'red', 'blue', 'scen')}, cached=True)
+                hit.update(job.get('tags', {}))
+                cached.append(hit)
+        jobs = todo
+
+    fout = open(out_path, 'a') if out_path else None
+    pool = None
+    try:
+        if not jobs:
+            finished = iter(())
+        elif workers == 1:
+            finished = map(_run_job, jobs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker if quiet else None)
+            finished = (f.result() for f in as_completed([pool.submit(_run_job, job) for job in jobs]))
+        for result in itertools.chain(cached, finished):
+            results.append(result)
+            key = keys.get(result['episode'])
+            if key is not None and 'error' not in result:
+                cache.put(key, result)
+            if on_result is not None:
+                on_result(result)
+            if fout:
+                fout.write(json.dumps(result, ensure_ascii=False) + '\n')
+                fout.flush()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if fout:
+            fout.close()
+        if cache is not None:
+            cache.evict()
+    return sorted(results, key=lambda r: r['episode'])
+
+
+def run_episodes(red, blue, scen, episodes, workers=None, out_path=None, seed=0,
+                 sim=DEFAULT_SIM, max_steps=None, quiet=True, record_dir=None, cache=None):
+    jobs = make_jobs(red, blue, scen, episodes, seed=seed, sim=sim, max_steps=max_steps, record_dir=record_dir)
+    return run_jobs(jobs, workers=workers, out_path=out_path, quiet=quiet, cache=cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='无界面批量对打')
+    parser.add_argument('--red', required=True, help='红方 Agent，如 agents.team_blue.blue_agent_demo:Agent')
+    parser.add_argument('--blue', required=True, help='蓝方 Agent，如 agents.houlang.agent:Agent')
+    parser.add_argument('--scen', default='scen.json', help='想定文件')
+    parser.add_argument('-n', '--episodes', type=int, default=1)
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('-o', '--out', default='results.jsonl', help='每局结果追加写入的 jsonl 文件')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sim', default=DEFAULT_SIM, help='仿真类的导入路径')
+    parser.add_argument('--max-steps', type=int, default=None)
+    parser.add_argument('--record', default=None, help='逐帧记录每局到这个目录下的 episode_xxxxx')
+    parser.add_argument('--cache', default=None, help='对局结果缓存目录，双方代码、想定、种子和仿真配置都没变的局直接复用')
+    parser.add_argument('--cache-size', type=float, default=256, help='缓存大小上限（MB）')
+    parser.add_argument('--verbose', action='store_true', help='保留智能体的打印')
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache, max_bytes=int(args.cache_size * 2 ** 20)) if args.cache else None
+    results = run_episodes(args.red, args.blue, args.scen, args.episodes, workers=args.workers,
+                           out_path=args.out, seed=args.seed, sim=args.sim,
+                           max_steps=args.max_steps, quiet=not args.verbose, record_dir=args.record, cache=cache)
+    errors = [r for r in results if 'error' in r]
+    wins = {side: sum(r.get('winner') == side for r in results) for side in ('red', 'blue', 'draw')}
+    num_cached = sum(r.get('cached', False) for r in results)
+    print(f"共 {len(results)} 局（缓存命中 {num_cached} 局），红胜 {wins['red']}，蓝胜 {wins['blue']}，平 {wins['draw']}，出错 {len(errors)}")
+    if errors:
+        print(errors[0]['error'])
+
+
+if __name__ == '__main__':
+    main()
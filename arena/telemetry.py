@@ -0,0 +1,131 @@
+import glob
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from .jsbsim_xml import JSBSIM_ROOT
+
+'''
+二进制遥测
+'''
+# gym_jsbsim/output_JSB.xml 的 <chunk> 列出了 JSBSim 文本输出的属性（名字、printf 格式、float / double），
+# 每帧每个属性格式化成一行文本，记录频率一高，格式化和事后解析都很慢。TelemetrySink 沿用这份属性表，但不转文本：
+# 每帧一条定长记录 (tick, sim_time, 每个属性一个 (n,) 的数组，n 是飞机数)，直接赋值进预先分配好的 .npy
+# （np.lib.format.open_memmap），一个分段写满了再开下一个。读的时候 read_telemetry 用 np.load(mmap_mode='r')，
+# 拿到的就是 NumPy 结构化数组。预分配时 tick 填 -1，进程中途退出也能按 tick >= 0 找出写过的记录。
+# 用法：
+#   sink = TelemetrySink('telemetry/ep0', n)
+#   sink.record(tick, sim_time, dyn.properties(sim_time))   # FighterDynamics，或者 FighterSim(telemetry=...)
+#   sink.close()
+#   data = read_telemetry('telemetry/ep0'); data['attitude_roll_rad'][:, i]
+
+OUTPUT_XML = os.path.join(JSBSIM_ROOT, 'output_JSB.xml')
+CHUNK_TYPES = {'double': np.float64, 'float': np.float32, 'int': np.int32, 'bool': np.bool_}
+
+
+def load_output_spec(path=OUTPUT_XML):
+    """ output_JSB.xml 里的 chunk -> [(name, node, dtype)]，node 去掉开头的 / 和 fdm/jsbsim/ 前缀，和属性名一致 """
+    spec = []
+    for chunk in ET.parse(path).getroot().iter('chunk'):
+        node = chunk.findtext('node').strip().lstrip('/')
+        if node.startswith('fdm/jsbsim/'):
+            node = node[len('fdm/jsbsim/'):]
+        spec.append((chunk.findtext('name').strip(), node, CHUNK_TYPES[chunk.findtext('type', 'double').strip()]))
+    return spec
+
+
+def record_dtype(spec, n):
+    """ 一帧的定长记录：tick、sim_time，再每个属性一个 (n,) 的子数组 """
+    return np.dtype([('tick', np.int64), ('sim_time', np.float64)] + [(name, dtype, (n,)) for name, _, dtype in spec])
+
+
+class TelemetrySink:
+    def __init__(self, path, n, spec=None, segment_records=4096, meta=None):
+        """_summary_
+
+        Args:
+            path (str): 输出目录，分段写成 segment_xxxxx.npy，目录里上一局的分段和 meta.json 会先删掉
+            n (int): 飞机数
+            spec (list): load_output_spec 的结果，None 时读 gym_jsbsim/output_JSB.xml
+            segment_records (int): 每个分段预分配多少帧
+            meta (dict): 额外写进 meta.json 的信息
+        """
+        self.path = path
+        self.n = n
+        self.spec = load_output_spec() if spec is None else spec
+        self.dtype = record_dtype(self.spec, n)
+        self.segment_records = segment_records
+        self.meta = dict(meta or {})
+        os.makedirs(path, exist_ok=True)
+        self._clear()
+        self.num_records = 0
+        self.num_segments = 0
+        self._segment = None
+        self._row = 0
+
+    def _clear(self):
+        """ 删掉目录里上一局的记录，只删本模块写出的文件 """
+        meta_path = os.path.join(self.path, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for segment in glob.glob(os.path.join(self.path, 'segment_[0-9][0-9][0-9][0-9][0-9].npy')):
+            os.remove(segment)
+
+    def _open_segment(self):
+        if self._segment is not None:
+            self._segment.flush()
+        self._segment = np.lib.format.open_memmap(
+            os.path.join(self.path, f'segment_{self.num_segments:05d}.npy'), mode='w+',
+            dtype=self.dtype, shape=(self.segment_records,))
+        self._segment['tick'] = -1
+        self.num_segments += 1
+        self._row = 0
+
+    def record(self, tick, sim_time, values):
+        """ values: {JSBSim 属性名（chunk 的 node）: (n,) 数组}，没给的属性记 nan（整数记 0） """
+        if self._segment is None or self._row == self.segment_records:
+            self._open_segment()
+        record = self._segment[self._row]
+        record['tick'] = tick
+        record['sim_time'] = sim_time
+        for name, node, dtype in self.spec:
+            value = values.get(node)
+            if value is not None:
+                record[name] = value
+            elif np.issubdtype(dtype, np.floating):
+                record[name] = np.nan
+        self._row += 1
+        self.num_records += 1
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.flush()
+            self._segment = None
+        meta = dict(self.meta, n=self.n, num_records=self.num_records, num_segments=self.num_segments,
+                    properties=[(name, node, np.dtype(dtype).str) for name, node, dtype in self.spec])
+        with open(os.path.join(self.path, 'meta.json'), 'w') as fout:
+            json.dump(meta, fout, ensure_ascii=False, indent=2)
+
+
+def read_telemetry(path):
+    """ 读 TelemetrySink 写的目录，返回 (帧数,) 的结构化数组；只有一个分段时是只读 mmap 上的视图 """
+    files = sorted(glob.glob(os.path.join(path, 'segment_[0-9][0-9][0-9][0-9][0-9].npy')))
+    meta_path = os.path.join(path, 'meta.json')
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as fin:
+            meta = json.load(fin)
+        # 只认 meta.json 记下的分段数
+        files = files[:meta['num_segments']]
+    segments = [np.load(f, mmap_mode='r') for f in files]
+    if not segments:
+        return np.zeros(0)
+    if meta is not None:
+        last = meta['num_records'] - (len(segments) - 1) * len(segments[0])
+    else:
+        # 没有 close 的目录：最后一个分段里 tick 还是 -1 的是没写过的
+        last = int(np.count_nonzero(segments[-1]['tick'] >= 0))
+    segments[-1] = segments[-1][:last]
+    return segments[0] if len(segments) == 1 else np.concatenate(segments)
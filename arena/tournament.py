@@ -0,0 +1,154 @@
+import argparse
+import itertools
+import json
+import os
+
+from .cache import ResultCache
+from .runner import DEFAULT_SIM, run_jobs
+
+'''
+各版本智能体循环赛 + Elo
+'''
+# 所有智能体两两对阵 × 想定 × 红蓝互换 × 种子，放到 runner 的进程池里跑。
+# 对局结果走 ResultCache，双方代码和想定都没变的对局直接复用，只补跑改过代码的智能体相关的对局。
+# 每轮从初始分开始，按赛程顺序先过一遍缓存命中的结果，再随新结果陆续到达增量更新 Elo，
+# 本轮所有结果写到 results.jsonl，Elo 和战绩写到 ratings.json。
+# 用法：
+#   python -m arena.tournament --agents houlang houlang0803 team_red team_blue -j 8 --seeds 2 -o tournament
+
+DEFAULT_AGENTS = {
+    'houlang': 'agents.houlang.agent:Agent',
+    'houlang0715': 'agents.houlang0715.agent:Agent',
+    'houlang0801': 'agents.houlang0801.agent:Agent',
+    'houlang0803': 'agents.houlang0803.agent:Agent',
+    'houlang_dev': 'agents.houlang_dev.agent:Agent',
+    'team_red': 'agents.team_red.red_agent_demo:Agent',
+    'team_blue': 'agents.team_blue.blue_agent_demo:Agent',
+    # agent_follow 的 step 要偷看对方的 obs，不公平，用位置控制的版本
+    'chao': 'agents.chao.agent_position_control:Agent',
+}
+
+DEFAULT_SCENS = ['scen.json', 'scen_duodan.json', 'scen_fadan.json', 'scen_jiedan.json']
+
+
+class EloTable:
+    def __init__(self, k=16, init=1500.):
+        self.k = k
+        self.init = init
+        self.ratings = {}
+        self.records = {}  # 名字 -> [胜, 平, 负]
+
+    def _ensure(self, name):
+        if name not in self.ratings:
+            self.ratings[name] = self.init
+            self.records[name] = [0, 0, 0]
+
+    def update(self, red, blue, winner):
+        """ winner: 'red' / 'blue' / 'draw' """
+        self._ensure(red)
+        self._ensure(blue)
+        score = {'red': 1., 'blue': 0., 'draw': 0.5}[winner]
+        expected = 1. / (1. + 10 ** ((self.ratings[blue] - self.ratings[red]) / 400.))
+        delta = self.k * (score - expected)
+        self.ratings[red] += delta
+        self.ratings[blue] -= delta
+        i = {1.: 0, 0.5: 1, 0.: 2}[score]
+        self.records[red][i] += 1
+        self.records[blue][2 - i] += 1
+
+    def to_dict(self):
+        return {'k': self.k, 'init': self.init, 'ratings': self.ratings, 'records': self.records}
+
+    def ladder(self):
+        lines = [f"{'agent':<16}{'elo':>8}{'W':>6}{'D':>6}{'L':>6}"]
+        for name, rating in sorted(self.ratings.items(), key=lambda x: -x[1]):
+            w, d, l = self.records[name]
+            lines.append(f'{name:<16}{rating:>8.1f}{w:>6d}{d:>6d}{l:>6d}')
+        return '\n'.join(lines)
+
+
+def schedule(agents, scens, seeds, sim=DEFAULT_SIM, max_steps=None):
+    """ 两两对阵（有序对，红蓝各一次）× 想定 × 种子 """
+    jobs = []
+    for (red, blue), scen, seed in itertools.product(itertools.permutations(agents, 2), scens, range(seeds)):
+        jobs.append({
+            'episode': len(jobs),
+            'seed': seed,
+            'red': agents[red],
+            'blue': agents[blue],
+            'scen': scen,
+            'sim': sim,
+            'max_steps': max_steps,
+            'tags': {'red_name': red, 'blue_name': blue},
+        })
+    return jobs
+
+
+def run_tournament(agents, scens, seeds=1, out_dir='tournament', workers=None, sim=DEFAULT_SIM,
+                   max_steps=None, k=16, cache=None):
+    """_summary_
+
+    Args:
+        agents (dict): 名字 -> Agent 导入路径
+        scens (list): 想定文件
+        seeds (int): 每个对阵配置跑几个种子
+        out_dir (str): results.jsonl 和 ratings.json 所在目录
+        cache (ResultCache): 对局结果缓存，None 时用 out_dir/cache
+
+    Returns:
+        EloTable: 更新后的 Elo 表
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, 'results.jsonl')
+    ratings_path = os.path.join(out_dir, 'ratings.json')
+    if cache is None:
+        cache = ResultCache(os.path.join(out_dir, 'cache'))
+    if os.path.exists(results_path):
+        os.remove(results_path)
+    elo = EloTable(k=k)
+
+    jobs = schedule(agents, scens, seeds, sim=sim, max_steps=max_steps)
+    num_cached = 0
+
+    def on_result(result):
+        nonlocal num_cached
+        num_cached += result.get('cached', False)
+        if 'error' in result:
+            print(f"{result['red_name']} vs {result['blue_name']} ({result['scen']}) 出错")
+            return
+        elo.update(result['red_name'], result['blue_name'], result['winner'])
+        with open(ratings_path, 'w') as fout:
+            json.dump(elo.to_dict(), fout, ensure_ascii=False, indent=2)
+
+    run_jobs(jobs, workers=workers, out_path=results_path, on_result=on_result, cache=cache)
+    print(f'共 {len(jobs)} 局，复用 {num_cached} 局，新跑 {len(jobs) - num_cached} 局')
+    return elo
+
+
+def main():
+    parser = argparse.ArgumentParser(description='各版本智能体循环赛 + Elo')
+    parser.add_argument('--agents', nargs='+', default=list(DEFAULT_AGENTS),
+                        help='DEFAULT_AGENTS 里的名字，或者 名字=模块:类')
+    parser.add_argument('--scens', nargs='+', default=DEFAULT_SCENS)
+    parser.add_argument('--seeds', type=int, default=1)
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('-o', '--out', default='tournament')
+    parser.add_argument('--sim', default=DEFAULT_SIM)
+    parser.add_argument('--max-steps', type=int, default=None)
+    parser.add_argument('--k', type=float, default=16)
+    parser.add_argument('--cache', default=None, help='对局结果缓存目录，默认 <out>/cache，可以和 runner 共用')
+    parser.add_argument('--cache-size', type=float, default=256, help='缓存大小上限（MB）')
+    args = parser.parse_args()
+
+    agents = {}
+    for spec in args.agents:
+        name, _, path = spec.partition('=')
+        agents[name] = path or DEFAULT_AGENTS[name]
+    cache = ResultCache(args.cache or os.path.join(args.out, 'cache'), max_bytes=int(args.cache_size * 2 ** 20))
+    elo = run_tournament(agents, args.scens, seeds=args.seeds, out_dir=args.out, workers=args.workers,
+                         sim=args.sim, max_steps=args.max_steps, k=args.k, cache=cache)
+    print(elo.ladder())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+import functools
+import multiprocessing as mp
+import time
+import traceback
+
+import numpy as np
+
+from .control import discrete2continuous, get_obs
+from .runner import DEFAULT_SIM, import_object, load_scen
+
+'''
+多进程并行环境
+'''
+# K 个仿真各跑在一个子进程里。观测、动作、奖励、done 都放在共享内存的 NumPy 数组里，
+# 主进程写好动作后用信号量通知子进程，子进程写完观测再用信号量通知回来，每步没有任何 pickle。
+# 等子进程的时候定期检查子进程是否还活着（被杀、段错误、仿真 dll 崩溃时信号量永远不会来），
+# 发现有子进程退出或者超时就结束所有子进程并报错，不会一直卡住。
+# 环境只要实现
+#   reset() -> (obs, mask)
+#   step(action) -> (obs, reward, done, mask)
+# obs: (n_agents, obs_dim)，mask: (n_agents,) 表示这个槽位的飞机是否还活着。
+# 飞控训练用 FlightControlEnv；战术层的环境按同样的接口写一个传进来即可。
+
+CMD_RESET, CMD_STEP, CMD_CLOSE = 0, 1, 2
+
+
+class FlightControlEnv:
+    """ 飞控训练环境：双方所有飞机都去跟踪随机目标（高度、速度、航向），每 target_interval 步换一次目标，
+    和 test_fc2.test_fc 的设置一样。观测就是 get_obs（和智能体里 funcs_np.get_obs 一致），动作是四个舵面各 41 档的离散值。
+    """
+    obs_dim = 16
+    action_dim = 4
+    n_bins = 41
+
+    def __init__(self, scen='scen.json', sim=DEFAULT_SIM, target_interval=500, max_steps=3000, seed=None,
+                 target_delta=((-100, -30, -40), (100, 30, 40)), target_limit=((1000, 300), (14500, 450))):
+        self.scen = load_scen(scen)
+        self.n_agents = len(self.scen['units'])
+        self.target_interval = target_interval
+        self.max_steps = max_steps
+        self.target_delta = np.array(target_delta, dtype=np.float64)
+        self.target_limit = np.array(target_limit, dtype=np.float64)
+        self.rng = np.random.default_rng(seed)
+        self.sim = import_object(sim, 'HDDF2Sim')(self.scen, use_tacview=False, save_replay=False,
+                                                  replay_path="replay.acmi")
+
+    def _new_target(self, info):
+        target = np.array([info.height, info.sp, info.yaw]) + self.rng.uniform(*self.target_delta)
+        target[:2] = np.clip(target[:2], *self.target_limit)
+        return target
+
+    def _observe(self):
+        obs = np.zeros((self.n_agents, self.obs_dim), np.float32)
+        mask = np.zeros(self.n_agents, dtype=bool)
+        new_target = self.num_steps % self.target_interval == 0
+        self.infos = {}
+        for side in ('red', 'blue'):
+            for pid, info in self.sim.get_obs(side=side).my_planes.items():
+                # 真仿真里的飞机 ID 是随机的，按 reset 后第一次出现的顺序固定槽位
+                slot = self.slots.setdefault(pid, len(self.slots))
+                if new_target:
+                    self.targets[pid] = self._new_target(info)
+                obs[slot] = get_obs(info, self.targets[pid])
+                mask[slot] = True
+                self.infos[pid] = side
+        return obs, mask
+
+    def reset(self):
+        self.sim.reset()
+        self.num_steps = 0
+        self.slots = {}
+        self.targets = {}
+        return self._observe()
+
+    def step(self, action):
+        control = discrete2continuous(np.asarray(action)).tolist()
+        cmds = {'red': {}, 'blue': {}}
+        for pid, side in self.infos.items():
+            act = control[self.slots[pid]]
+            act[-1] = (act[-1] + 1) / 2
+            cmds[side][pid] = {'control': act}
+        for side, cmd_dict in cmds.items():
+            self.sim.send_commands(cmd_dict, cmd_side=side)
+        self.sim.step()
+        self.num_steps += 1
+        obs, mask = self._observe()
+        # 观测的 1~3 维就是归一化后的高度、速度、航向误差
+        reward = -np.abs(obs[:, 1:4]).mean(axis=1) * mask
+        done = bool(self.sim.done or self.num_steps >= self.max_steps or not mask.any())
+        return obs, reward, done, mask
+
+
+def _shared(ctx, dtype, shape):
+    dtype = np.dtype(dtype)
+    raw = ctx.RawArray('b', int(np.prod(shape)) * dtype.itemsize)
+    return raw, dtype, shape
+
+
+def _view(buf):
+    raw, dtype, shape = buf
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def _worker(k, env_fn, bufs, start, finished, err_conn, auto_reset):
+    # 一维的 done / cmd / status 取长度为 1 的切片，直接取 [k] 得到的是标量拷贝
+    obs, action, reward, done, mask, final_obs, cmd, status = [
+        _view(b)[k] if len(b[2]) > 1 else _view(b)[k:k + 1] for b in bufs]
+    env, init_error = None, None
+    try:
+        env = env_fn()
+    except Exception:
+        init_error = traceback.format_exc()
+    while True:
+        start.acquire()
+        c = int(cmd[0])
+        if c == CMD_CLOSE:
+            finished.release()
+            break
+        try:
+            if env is None:
+                raise RuntimeError(f'环境创建失败：\n{init_error}')
+            if c == CMD_RESET:
+                obs[:], mask[:] = env.reset()
+                reward[:] = 0
+                done[0] = False
+            else:
+                o, r, d, m = env.step(action)
+                reward[:] = r
+                done[0] = d
+                if d and auto_reset:
+                    final_obs[:] = o
+                    o, m = env.reset()
+                obs[:], mask[:] = o, m
+            status[0] = 0
+        except Exception:
+            status[0] = 1
+            err_conn.send(traceback.format_exc())
+        finished.release()
+    if env is not None and hasattr(env, 'close'):
+        env.close()
+
+
+class VecEnv:
+    def __init__(self, env_fns, n_agents, obs_dim, action_dim, action_dtype=np.int64, auto_reset=True,
+                 start_method=None, timeout=None, poll_interval=1.):
+        """_summary_
+
+        Args:
+            env_fns (list): 每个子进程里创建环境的函数，要能 pickle（用 functools.partial，不要用 lambda）
+            n_agents (int): 每个环境的飞机槽位数
+            obs_dim (int): 每架飞机的观测维度
+            action_dim (int): 每架飞机的动作维度
+            auto_reset (bool): done 之后子进程里直接 reset，done 那一步的观测放在 final_obs
+            start_method (str): multiprocessing 的启动方式，None 用平台默认（Windows 上只能 spawn）
+            timeout (float): 一次 reset / step 最多等多少秒，None 表示不限（子进程退出仍然会被发现）
+            poll_interval (float): 等待时每隔多少秒检查一次子进程是否还活着
+        """
+        ctx = mp.get_context(start_method)
+        self.num_envs = len(env_fns)
+        self.auto_reset = auto_reset
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        k = self.num_envs
+        bufs = [
+            _shared(ctx, np.float32, (k, n_agents, obs_dim)),     # obs
+            _shared(ctx, action_dtype, (k, n_agents, action_dim)),  # action
+            _shared(ctx, np.float32, (k, n_agents)),               # reward
+            _shared(ctx, np.bool_, (k,)),                         # done
+            _shared(ctx, np.bool_, (k, n_agents)),                 # mask
+            _shared(ctx, np.float32, (k, n_agents, obs_dim)),     # final_obs
+            _shared(ctx, np.int8, (k,)),                          # cmd
+            _shared(ctx, np.int8, (k,)),                          # status
+        ]
+        (self.obs, self.actions, self.rewards, self.dones, self.masks,
+         self.final_obs, self._cmd, self._status) = [_view(b) for b in bufs]
+        self._starts = [ctx.Semaphore(0) for _ in range(k)]
+        self._finished = ctx.Semaphore(0)
+        self._err_conns = []
+        self._procs = []
+        for i, env_fn in enumerate(env_fns):
+            recv, send = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_worker, args=(i, env_fn, bufs, self._starts[i], self._finished, send, auto_reset),
+                               daemon=True)
+            proc.start()
+            self._err_conns.append(recv)
+            self._procs.append(proc)
+        self._waiting = False
+        self.closed = False
+
+    def _dispatch(self, cmd):
+        self._cmd[:] = cmd
+        for start in self._starts:
+            start.release()
+
+    def _wait(self):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        for _ in range(self.num_envs):
+            while not self._finished.acquire(timeout=self.poll_interval):
+                dead = [(i, proc.exitcode) for i, proc in enumerate(self._procs) if not proc.is_alive()]
+                if dead or (deadline is not None and time.monotonic() > deadline):
+                    self._terminate()
+                    if dead:
+                        raise RuntimeError(f'子进程环境异常退出，(环境下标, exitcode)：{dead}')
+                    raise TimeoutError(f'子进程环境 {self.timeout} 秒内没有返回')
+        if self._status.any():
+            errors = [conn.recv() for conn, bad in zip(self._err_conns, self._status) if bad]
+            raise RuntimeError('子进程环境出错：\n' + '\n'.join(errors))
+
+    def reset(self):
+        """ 返回 (obs, mask)，都是共享内存的视图，下一步会被覆盖，需要保留时自己 copy """
+        self._dispatch(CMD_RESET)
+        self._wait()
+        return self.obs, self.masks
+
+    def step_async(self, actions):
+        self.actions[:] = actions
+        self._dispatch(CMD_STEP)
+        self._waiting = True
+
+    def step_wait(self):
+        self._wait()
+        self._waiting = False
+        return self.obs, self.rewards, self.dones, self.masks
+
+    def step(self, actions):
+        """ actions: (num_envs, n_agents, action_dim)，返回 (obs, reward, done, mask) """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def _terminate(self):
+        for proc in self._procs:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+        self._waiting = False
+        self.closed = True
+
+    def close(self):
+        if self.closed:
+            return
+        if self._waiting:
+            self._wait()
+        self._dispatch(CMD_CLOSE)
+        # 子进程收到 CMD_CLOSE 后自己退出，不用再等信号量；到时间还没退出的直接结束
+        for proc in self._procs:
+            proc.join(self.timeout)
+        self._terminate()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def make_flight_control_vec_env(num_envs, scen='scen.json', sim=DEFAULT_SIM, seed=0, auto_reset=True, **kwargs):
+    scen = load_scen(scen)
+    env_fns = [functools.partial(FlightControlEnv, scen, sim=sim, seed=seed + i, **kwargs) for i in range(num_envs)]
+    return VecEnv(env_fns, len(scen['units']), FlightControlEnv.obs_dim, FlightControlEnv.action_dim,
+                  auto_reset=auto_reset)
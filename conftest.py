@@ -0,0 +1,2 @@
+# test_fc2.py 是在 Windows 上连真仿真跑的脚本（test_fc 的参数是模型目录，不是 pytest 的用例），不收集
+collect_ignore = ['test_fc2.py']
@@ -9,6 +9,9 @@ from agents.team_blue.blue_agent_demo import Agent as BlueAgent
 # from agents.team_blue.blue_agent_demo import Agent as RedAgent
 from agents.chao.agent_follow import Agent as RedAgent
 
+# 这里不走 arena.runner.run_match：agent_follow 的 step 要同时拿到蓝方的 obs（red_agent.step(red_obs, blue_obs)），
+# 所以蓝方先 step，再把蓝方 obs 交给红方，run_match 的接口只给每方自己的 obs
+
 with open("scen_0715.json", "r") as fin:
     scen = json.load(fin)
 
@@ -1,29 +1,9 @@
-import json
-import numpy as np
-from hddf2sim.hddf2sim import HDDF2Sim
-from hddf2sim.conf import default_conf
+from arena.runner import run_match
 
 # from agents.team_blue.blue_agent_new import Agent as BlueAgent
 from agents.team_blue.blue_agent_demo import Agent as BlueAgent
 from agents.houlang0715.agent import Agent as RedAgent
 
-with open("scen_0715.json", "r") as fin:
-    scen = json.load(fin)
-
-sim = HDDF2Sim(scen, use_tacview=True, save_replay=True, replay_path="replay.acmi")
-sim.reset()
-red_agent = RedAgent('red')
-blue_agent = BlueAgent('blue')
-
-while not sim.done:
-    cmds = []
-    red_obs = sim.get_obs(side='red')
-    red_cmd_dict = red_agent.step(red_obs)
-    print(red_cmd_dict)
-    sim.send_commands(red_cmd_dict, cmd_side='red')
-    blue_obs = sim.get_obs(side='blue')
-    blue_cmd_dict = blue_agent.step(blue_obs)
-    cmds.extend(blue_cmd_dict)
-    sim.send_commands(blue_cmd_dict, cmd_side='blue')
-    sim.step()
-input("单局推演结束，按Enter退出。")
\ No newline at end of file
+result = run_match(RedAgent, BlueAgent, "scen_0715.json", use_tacview=True, save_replay=True, replay_path="replay.acmi")
+print(result)
+input("单局推演结束，按Enter退出。")
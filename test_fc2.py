@@ -4,349 +4,9 @@ import numpy as np
 import collections
 import cloudpickle
 import torch
-from torch import nn
-
-from hddf2sim.hddf2sim import HDDF2Sim
-
-LSTMState = collections.namedtuple('LSTMState', 'h c')
-
-
-def get_activation(act_name, **kwargs):
-  activations = {
-    None: lambda x: x,
-    'relu': nn.ReLU(),
-    'leaky_relu': nn.LeakyReLU(),
-    'elu': nn.ELU(),
-    'gelu': nn.GELU(),
-    'sigmoid': nn.Sigmoid(),
-    'tanh': nn.Tanh(),
-  }
-  if isinstance(act_name, str):
-    act_name = act_name.lower()
-  assert act_name in activations, act_name
-  return activations[act_name]
-
-
-def tree_map(func, tree, *args, is_leaf=None, level=None):
-  if tree is None:
-    return tree
-  if is_leaf is not None and is_leaf(tree):
-    return func(tree, *args)
-  if level == 0:
-    return func(tree, *args)
-  if level is not None:
-    level -= 1
-  if isinstance(tree, (list, tuple)):
-    if hasattr(tree, '_fields'):
-      return type(tree)(*[tree_map(func, *x, is_leaf=is_leaf, level=level) 
-                          for x in zip(tree, *args)])
-    else:
-      return type(tree)(tree_map(func, *x, is_leaf=is_leaf, level=level) 
-                        for x in zip(tree, *args))
-  elif isinstance(tree, dict):
-    return type(tree)({k: tree_map(func, v, *[a[k] for a in args], is_leaf=is_leaf, level=level) 
-                       for k, v in tree.items()})
-  else:
-    return func(tree, *args)
-
-
-class RNNLayer(nn.Module):
-  def __init__(self, inputs_dim, outputs_dim, rnn_type, rnn_layers=1, rnn_init='orthogonal', rnn_norm=False):
-    super(RNNLayer, self).__init__()
-    self.rnn_type = rnn_type
-    self._rnn_layers = rnn_layers
-
-    if rnn_type == 'lstm':
-      self.rnn = nn.LSTM(inputs_dim, outputs_dim, num_layers=self._rnn_layers)
-    elif rnn_type == 'gru':
-      self.rnn = nn.GRU(inputs_dim, outputs_dim, num_layers=self._rnn_layers)
-    else:
-      raise NotImplementedError(rnn_type)
-    if rnn_norm:
-      self.norm = nn.LayerNorm(outputs_dim)
-    else:
-      self.norm = None
-
-  def forward(self, x, state, reset):
-    # Let's figure out which steps in the sequence have a zero for any agent
-    # We will always assume t=0 has a zero in it as that makes the logic cleaner
-    is_reset = ((reset[1:] == 1.0)
-                .any(dim=-1)
-                .nonzero()
-                .squeeze()
-                .cpu())
-
-    # +1 to correct the reset[1:]
-    if is_reset.dim() == 0:
-      # Deal with scalar
-      is_reset = [is_reset.item() + 1]
-    else:
-      is_reset = (is_reset + 1).numpy().tolist()
-
-    # # add t=0 and t=T to the list
-    is_reset = [0] + is_reset + [x.size(0)]
-
-    outputs = []
-    for i in range(len(is_reset) - 1):
-      # We can now process steps that don't have any zeros in masks together!
-      # This is much faster
-      start_idx = is_reset[i]
-      end_idx = is_reset[i + 1]
-      mask = 1 - reset[start_idx].unsqueeze(-1).contiguous()
-      state = tree_map(lambda x: (x * mask).contiguous(), state)
-      h, state = self.rnn(x[start_idx:end_idx], state)
-      outputs.append(h)
-
-    # assert len(outputs) == T
-    # x is a (T, N, -1) tensor
-    x = torch.cat(outputs, dim=0)
-
-    if self.norm:
-      x = self.norm(x)
-    if self.rnn_type == 'lstm':
-      state = LSTMState(*state)
-
-    return x, state
-
-
-def _prepare_for_rnn(x):
-  if x is None:
-    return x, None
-  x = x.transpose(0, 1)
-  shape = x.shape
-  x = x.reshape(x.shape[0], -1, *x.shape[3:])
-  return x, shape
-
-
-def _recover_shape(x, shape):
-  x = x.reshape(*shape[:3], x.shape[-1])
-  x = x.transpose(0, 1)
-  return x
-
-
-def _prepare_rnn_state(state, shape):
-  state = tree_map(
-    lambda x: x.permute(2, 0, 1, 3).reshape(shape), state
-  )
-  return state
-
-
-def _recover_rnn_state(state, shape):
-  state = tree_map(
-    lambda x: x.permute(1, 0, 2).reshape(shape), state
-  )
-  return state
-
-
-class MLP(nn.Module):
-  def __init__(
-    self, 
-    input_dim, 
-    units_list=[], 
-    out_size=None, 
-    activation=None, 
-    w_init='glorot_uniform', 
-    b_init='zeros', 
-    name=None, 
-    out_scale=1, 
-    norm=None, 
-    norm_after_activation=False, 
-    norm_kwargs={
-      'elementwise_affine': True, 
-    }, 
-    out_w_init='orthogonal', 
-    out_b_init='zeros', 
-    rnn_type=None, 
-    rnn_layers=1, 
-    rnn_units=None, 
-    rnn_init='orthogonal',
-    rnn_norm=False, 
-  ):
-    super().__init__()
-    units_list = [input_dim] + units_list
-    self.layers = nn.Sequential()
-    for i, u in enumerate(units_list[1:]):
-      layers = nn.Sequential()
-      l = nn.Linear(units_list[i], u)
-      layers.append(l)
-      if norm == 'layer' and not norm_after_activation:
-        layers.append(nn.LayerNorm(u, **norm_kwargs))
-      layers.append(get_activation(activation))
-      if norm == 'layer' and norm_after_activation:
-        layers.append(nn.LayerNorm(u, **norm_kwargs))
-      self.layers.append(layers)
-
-    self.rnn_type = rnn_type
-    self.rnn_layers = rnn_layers
-    self.rnn_units = rnn_units
-    if rnn_type is None:
-      self.rnn = None
-      input_dim = u
-    else:
-      self.rnn = RNNLayer(
-        u, rnn_units, rnn_type, 
-        rnn_layers=rnn_layers, 
-        rnn_init=rnn_init, 
-        rnn_norm=rnn_norm
-      )
-      input_dim = rnn_units
-    
-    if out_size is not None:
-      self.out_layer = nn.Linear(input_dim, out_size)
-    else:
-      self.out_layer = None
-
-  def forward(self, x, reset=None, state=None):
-    if self.rnn is None:
-      x = self.layers(x)
-      if self.out_layer is not None:
-        x = self.out_layer(x)
-      return x
-    else:
-      x = self.layers(x)
-      x, shape = _prepare_for_rnn(x)
-      reset, _ = _prepare_for_rnn(reset)
-      if state is None:
-        if self.rnn_type == 'lstm':
-          state = LSTMState(
-            torch.zeros(shape[1], shape[2], self.rnn_layers, self.rnn_units).to(device=x.device), 
-            torch.zeros(shape[1], shape[2], self.rnn_layers, self.rnn_units).to(device=x.device)
-          )
-        else:
-          state = torch.zeros(shape[1], shape[2], self.rnn_layers, self.rnn_units).to(device=x.device)
-      state = _prepare_rnn_state(state, (self.rnn_layers, shape[1] * shape[2], self.rnn_units))
-      x, state = self.rnn(x, state, reset)
-      x = _recover_shape(x, shape)
-      state = _recover_rnn_state(state, (shape[1], shape[2], self.rnn_layers, self.rnn_units))
-      if self.out_layer is not None:
-        x = self.out_layer(x)
-      return x, state
-
-
-class CategoricalOutput(nn.Module):
-  def __init__(
-    self, 
-    num_inputs, 
-    num_outputs, 
-    out_w_init='orthogonal', 
-    out_b_init='zeros', 
-    out_scale=0.01
-  ):
-    super().__init__()
-    self.linear = nn.Linear(num_inputs, num_outputs)
-    self.out_w_init = out_w_init
-    self.out_b_init = out_b_init
-    self.out_scale = out_scale
-
-  def forward(self, x, action_mask=None):
-    x = self.linear(x)
-    if action_mask is not None:
-      x[action_mask == 0] = -1e10
-    return x
 
-
-class MultivariateNormalOutput(nn.Module):
-  def __init__(
-    self, 
-    num_inputs, 
-    num_outputs, 
-    out_w_init='orthogonal', 
-    out_b_init='zeros', 
-    out_scale=0.01, 
-    out_act='tanh', 
-    sigmoid_scale=True, 
-    std_x_coef=1., 
-    std_y_coef=.5, 
-    init_std=.2,
-    tpdv={'device': 'cpu'},
-  ):
-    super().__init__()
-    self.linear = nn.Linear(num_inputs, num_outputs)
-    self.out_act = get_activation(out_act)
-    self.sigmoid_scale = sigmoid_scale
-    self.std_x_coef = std_x_coef
-    self.std_y_coef = std_y_coef
-    self.init_logstd = np.log(init_std)
-    if sigmoid_scale:
-      self.logstd = nn.Parameter(self.std_x_coef + torch.zeros(num_outputs))
-    else:
-      self.logstd = nn.Parameter(self.init_logstd + torch.zeros(num_outputs))
-    self.tpdv = tpdv
-
-  def forward(self, x):
-    mean = self.linear(x)
-    mean = self.out_act(mean)
-    if self.sigmoid_scale:
-      scale = torch.sigmoid(self.logstd / self.std_x_coef) * self.std_y_coef
-    else:
-      scale = torch.exp(self.logstd)
-    return mean, scale
-
-
-def tpdv(device):
-  return dict(dtype=torch.float32, device=torch.device(device))
-
-
-class Policy(nn.Module):
-  def __init__(
-    self, 
-    input_dim, 
-    is_action_discrete, 
-    action_dim, 
-    out_act=None, 
-    init_std=.2, 
-    sigmoid_scale=True, 
-    std_x_coef=1., 
-    std_y_coef=.5, 
-    use_action_mask={'action': False}, 
-    out_w_init='orthogonal', 
-    out_b_init='zeros', 
-    out_scale=.01, 
-    device='cpu', 
-    **config
-  ):
-    super().__init__()
-    self.tpdv = tpdv(device)
-    self.action_dim = action_dim
-    self.is_action_discrete = is_action_discrete
-
-    self.out_act = out_act
-    self.use_action_mask = use_action_mask
-    self.net = MLP(input_dim, **config)
-    self.heads = {}
-    for k in action_dim:
-      if is_action_discrete[k]:
-        self.heads[k] = CategoricalOutput(
-          config['rnn_units'], action_dim[k], 
-          out_w_init, out_b_init, out_scale)
-      else:
-        self.heads[k] = MultivariateNormalOutput(
-          config['rnn_units'], action_dim[k], 
-          out_w_init, out_b_init, out_scale, 
-          out_act=out_act, sigmoid_scale=sigmoid_scale, 
-          std_x_coef=std_x_coef, std_y_coef=std_y_coef, 
-          init_std=init_std, tpdv=self.tpdv)
-    for k, v in self.heads.items():
-      setattr(self, f'head_{k}', v)
-
-  def forward(self, x, reset=None, state=None, action_mask=None):
-    x, reset, state, action_mask = tree_map(
-      lambda x: x.to(**self.tpdv), (x, reset, state, action_mask))
-    x = self.net(x, reset, state)
-    if isinstance(x, tuple):
-      assert len(x) == 2, x
-      x, state = x
-    
-    outs = {}
-    for name, layer in self.heads.items():
-      if self.use_action_mask.get(name, False):
-        assert self.is_action_discrete[name], self.is_action_discrete[name]
-        am = action_mask[name]
-        d = layer(x, action_mask=am)
-      else:
-        d = layer(x)
-      outs[name] = d
-    return outs, state
+# 网络结构和单步推理（Policy.step、StatefulPolicy）在智能体的 funcs_rl 里，这里只保留离线测试用的加载和测试循环
+from agents.houlang_dev.funcs_rl import Policy, tree_map
 
 
 def expand_dims_match(x: np.ndarray, target: np.ndarray):
@@ -553,6 +213,8 @@ def create_fc_model(path):
 
 
 def test_fc(path):
+  from hddf2sim.hddf2sim import HDDF2Sim
+
   model = create_fc_model(path)
   with open('scen.json', "r") as f:
     scen = json.load(f)
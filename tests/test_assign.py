@@ -0,0 +1,57 @@
+import itertools
+
+import numpy as np
+
+from agents.houlang.funcs_assign import INFEASIBLE, assign, assign_weapons, distance_cost, engagement_cost
+
+
+def test_assign_is_optimal():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        cost = rng.uniform(0, 10, (4, 4))
+        best = min(sum(cost[i, p[i]] for i in range(4)) for p in itertools.permutations(range(4)))
+        result = assign(cost)
+        assert np.isclose(cost[np.arange(4), result].sum(), best)
+
+
+def test_infeasible_and_capacity():
+    cost = np.array([
+        [1., INFEASIBLE],
+        [2., INFEASIBLE],
+        [INFEASIBLE, INFEASIBLE],
+    ])
+    # 只有一个目标可打，容量 1 时只有代价最小的那架分到
+    assert assign(cost).tolist() == [0, -1, -1]
+    assert assign(cost, capacity=2).tolist() == [0, 0, -1]
+
+
+def test_repeat_penalty_spreads_shooters():
+    # 两架飞机都离 0 号目标更近，没有惩罚时都打 0 号，有惩罚时分开
+    dist = distance_cost([[0, 0, 0], [0, 1000, 0]], [[5000, 0, 0], [9000, 0, 0]])
+    cost = engagement_cost(dist, np.ones((2, 2)), [4, 4], np.ones((2, 2), dtype=bool))
+    assert assign(cost, capacity=2).tolist() == [0, 0]
+    assert sorted(assign(cost, capacity=2, repeat_penalty=1.).tolist()) == [0, 1]
+    # 没弹的飞机不分配
+    cost = engagement_cost(dist, np.ones((2, 2)), [0, 4], np.ones((2, 2), dtype=bool))
+    assert assign(cost, capacity=2, repeat_penalty=1.).tolist() == [-1, 0]
+
+
+def test_non_firing_plane_does_not_take_target():
+    # 0 号飞机离 0 号目标最近但这一帧不发弹，0 号目标应该留给会发弹的 1 号飞机
+    dist = distance_cost([[0, 0, 0], [0, 3000, 0]], [[5000, 0, 0], [12000, 0, 0]])
+    cost = engagement_cost(dist, np.ones((2, 2)), [4, 4], np.ones((2, 2), dtype=bool))
+    assert assign(cost, capacity=2, repeat_penalty=1.).tolist() == [0, 1]
+    assert assign_weapons([False, True], cost).tolist() == [-1, 0]
+    assert assign_weapons([True, True], cost).tolist() == [0, 1]
+    assert assign_weapons([False, False], cost).tolist() == [-1, -1]
+
+
+def test_ammo_changes_assignment():
+    # 两架飞机到两个目标的距离、角度都一样，0 号目标把握大、1 号目标把握小，把握大的分给弹少的飞机
+    dist = np.full((2, 2), 10000.)
+    hit_prob = np.array([[.9, .4], [.9, .4]])
+    feasible = np.ones((2, 2), dtype=bool)
+    cost = engagement_cost(dist, np.ones((2, 2)), [1, 4], feasible, hit_prob)
+    assert assign_weapons([True, True], cost).tolist() == [0, 1]
+    cost = engagement_cost(dist, np.ones((2, 2)), [4, 1], feasible, hit_prob)
+    assert assign_weapons([True, True], cost).tolist() == [1, 0]
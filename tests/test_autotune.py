@@ -0,0 +1,34 @@
+import numpy as np
+
+from arena.autotune import CMAES, DEFAULT_GAINS, MANEUVERS, rollout, score, step_metrics
+
+
+def test_step_metrics():
+    # 一阶响应：时间常数 0.5s，10s 里前半段阶跃到 1、后半段回 0
+    dt, switch = 0.05, 100
+    t = np.arange(200) * dt
+    target = np.where(t < 5., 1., 0.)[:, None]
+    value = np.where(t < 5., 1 - np.exp(-t / .5), np.exp(-(t - 5.) / .5) * (1 - np.exp(-10.)))[:, None]
+    metrics = step_metrics(value, target, switch, dt, min_step=.1)
+    # 到 90% 要 0.5 * ln(10) ≈ 1.15s，占 5s 的 0.23
+    np.testing.assert_allclose(metrics['rise_time'][:, 0], 0.24, atol=.02)
+    np.testing.assert_allclose(metrics['overshoot'], 0.)
+    np.testing.assert_allclose(metrics['tracking'][:, 0], 0.5 / 5., atol=.01)
+
+
+def test_cmaes_quadratic():
+    es = CMAES(np.full(4, 3.), 1., seed=0)
+    for _ in range(80):
+        x = es.ask()
+        es.tell(x, np.sum((x - 1.) ** 2, axis=1))
+    np.testing.assert_allclose(es.mean, 1., atol=1e-3)
+
+
+def test_rollout_batches_gain_sets():
+    gains = np.stack([DEFAULT_GAINS, DEFAULT_GAINS * 2])
+    result = rollout(gains, conditions=[[6000., 250.]], maneuvers={'right': MANEUVERS['right']}, duration=2.)
+    assert result['roll'].shape == (40, 2, 1, 1)
+    # 右转的目标滚转角是正的，两组增益都往右滚，增益大的滚得快
+    assert np.all(result['roll'][-1] > 0) and result['roll'][20, 1, 0, 0] > result['roll'][20, 0, 0, 0]
+    cost = score(result)
+    assert cost.shape == (2,) and np.all(np.isfinite(cost))
@@ -0,0 +1,51 @@
+import json
+import os
+
+from arena.cache import KeyMaker, ResultCache, hash_sim
+
+SCEN = os.path.join(os.path.dirname(__file__), '..', 'scen.json')
+
+
+def test_key_and_lru(tmp_path):
+    with open(SCEN, 'r') as fin:
+        scen = json.load(fin)
+    job = {'red': 'agents.team_red.red_agent_demo:Agent', 'blue': 'agents.houlang_dev.agent:Agent',
+           'scen': scen, 'sim': 'arena.pointmass:PointMassSim', 'seed': 0, 'max_steps': None}
+    make_key = KeyMaker()
+    key = make_key(job)
+    assert make_key(dict(job)) == key
+    assert make_key(dict(job, seed=1)) != key
+    assert make_key(dict(job, scen=dict(scen, end_time=300.))) != key
+
+    cache = ResultCache(str(tmp_path), max_bytes=1000)
+    for i in range(10):
+        cache.put(f'{i:02d}' * 20, {'winner': 'red', 'pad': 'x' * 200})
+        os.utime(cache._file(f'{i:02d}' * 20), (i, i))
+    assert cache.get('00' * 20)['winner'] == 'red'  # 命中后变成最新
+    assert cache.evict() > 0
+    assert '00' * 20 in cache and '01' * 20 not in cache and '09' * 20 in cache
+    assert cache.stats()['bytes'] <= 1000
+
+
+def test_hash_sim_follows_imports(tmp_path, monkeypatch):
+    # 一个小的仿真包：sim 用到 dyn（相对导入）和 util（绝对导入），runner 和仿真无关
+    package = tmp_path / 'fakesim'
+    package.mkdir()
+    files = {
+        '__init__.py': '',
+        'sim.py': 'import numpy as np\nfrom .dyn import step\ndefault_conf = {"step_time": 0.05}\n',
+        'dyn.py': 'from fakesim import util\ndef step(x):\n    return x\n',
+        'util.py': 'K = 1\n',
+        'runner.py': 'from .sim import default_conf\n',
+    }
+    for name, source in files.items():
+        (package / name).write_text(source)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    key = hash_sim('fakesim.sim:Sim')
+    (package / 'runner.py').write_text(files['runner.py'] + '# 改了和仿真无关的文件\n')
+    assert hash_sim('fakesim.sim:Sim') == key
+    for name in ('util.py', 'dyn.py', '__init__.py'):
+        (package / name).write_text(files[name] + 'X = 2\n')
+        assert hash_sim('fakesim.sim:Sim') != key
+        key = hash_sim('fakesim.sim:Sim')
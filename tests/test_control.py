@@ -0,0 +1,45 @@
+import types
+
+import numpy as np
+import pytest
+
+from arena import control
+
+AGENTS = ['agents.houlang', 'agents.houlang_dev']
+
+
+@pytest.mark.parametrize('agent', AGENTS)
+def test_matches_agent_copy(agent):
+    # arena.control 是智能体里 funcs_np / funcs_pid 的拷贝，飞控模型的输入和调参用的控制律必须和智能体一致
+    funcs_np = pytest.importorskip(f'{agent}.funcs_np')
+    funcs_pid = pytest.importorskip(f'{agent}.funcs_pid')
+    rng = np.random.default_rng(0)
+    for name in ('norm_delta_altitude', 'norm_delta_heading', 'norm_delta_velocity'):
+        np.testing.assert_array_equal(getattr(control, name), getattr(funcs_pid, name))
+    assert control.SCHEDULE_COLUMNS == funcs_pid.SCHEDULE_COLUMNS
+    assert control.SCHEDULE_AIRFRAMES == funcs_pid.SCHEDULE_AIRFRAMES
+    assert control.DISC_ACTIONS == funcs_np.DISC_ACTIONS
+
+    for _ in range(20):
+        info = types.SimpleNamespace(
+            is_uav=bool(rng.integers(2)), height=rng.uniform(1000, 14000), sp=rng.uniform(150, 450),
+            yaw=rng.uniform(-np.pi, np.pi), roll=rng.uniform(-np.pi, np.pi), pitch=rng.uniform(-1, 1),
+            alpha=rng.normal(), beta=rng.normal(), omega_p=rng.normal(), omega_q=rng.normal(), omega_r=rng.normal(),
+            v_north=rng.normal(0, 300), v_east=rng.normal(0, 300), v_down=rng.normal(0, 50))
+        target = [rng.uniform(1000, 14000), rng.uniform(300, 450), rng.uniform(-1.5 * np.pi, 1.5 * np.pi)]
+        np.testing.assert_array_equal(control.get_obs(info, target), funcs_np.get_obs(info, target))
+    action = {k: rng.integers(0, 41, 8) for k in control.DISC_ACTIONS}
+    np.testing.assert_array_equal(control.get_control_action(action), funcs_np.get_control_action(action))
+    assert control.action2cmd([0., .5, 0., 1.]) == funcs_np.action2cmd([0., .5, 0., 1.])
+
+    banks = [control.FlyPidBank(init_planes=2), funcs_pid.FlyPidBank(init_planes=2)]
+    for tick in range(30):
+        n = 5
+        roll, pitch = rng.uniform(-np.pi, np.pi, n), rng.uniform(-.5, .5, n)
+        omega = rng.normal(0, .5, (n, 2))
+        actions = np.stack([rng.integers(0, 3, n), rng.integers(0, 7, n), rng.integers(0, 3, n)], -1)
+        limit = rng.uniform(.3, .7, n)
+        cmds = [module.fly_with_alt_yaw_vel_arrays(roll, pitch, omega, actions, bank, bank.rows(range(n)),
+                                                   level_throttle=.4, elevator_limit=limit)
+                for module, bank in zip((control, funcs_pid), banks)]
+        np.testing.assert_array_equal(*cmds)
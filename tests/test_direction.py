@@ -0,0 +1,44 @@
+import numpy as np
+
+from agents.houlang.funcs_rule import DirectionEstimator, is_facing_target
+
+
+def regression_direction(positions):
+    """ 原来的做法：对 [t, 1] 做最小二乘，取斜率再归一化 """
+    t = np.arange(len(positions), dtype=np.float64)
+    params = np.linalg.lstsq(np.stack([t, np.ones_like(t)], 1), positions, rcond=None)[0]
+    return params[0] / np.linalg.norm(params[0])
+
+
+def regression_facing(target_positions, aircraft_positions):
+    target_direction = regression_direction(target_positions)
+    aircraft_direction = regression_direction(aircraft_positions)
+    cos_theta = np.dot(target_direction, aircraft_direction)
+    target_position = target_positions[-1] - target_direction * 1000
+    is_ahead_of_target = np.dot(target_direction, aircraft_positions[-1] - target_positions[-1]) > 0
+    return cos_theta < 0, cos_theta, target_position, is_ahead_of_target
+
+
+def test_streaming_matches_regression():
+    window = 20
+    rng = np.random.default_rng(0)
+    # 两条带噪声的转弯航迹，坐标量级和对局里一样（几十公里），长度远超窗口，旧样本要不断出窗口
+    k = np.arange(600.)
+    target = np.c_[40000 - 15 * k, 2e4 * np.sin(k / 150), np.full_like(k, 8000)] + rng.normal(0, 3, (600, 3))
+    aircraft = np.c_[-40000 + 14 * k, 1e4 * np.cos(k / 90), 6000 + k] + rng.normal(0, 3, (600, 3))
+
+    estimator = DirectionEstimator(window)
+    for i in range(len(k)):
+        estimator.update('target', target[i])
+        estimator.update('aircraft', aircraft[i])
+        if i < 2:
+            continue
+        start = max(0, i + 1 - window)
+        expected = regression_facing(target[start:i + 1], aircraft[start:i + 1])
+        streamed = estimator.is_facing_target('target', 'aircraft')
+        batch = is_facing_target(target[start:i + 1], aircraft[start:i + 1])
+        for result in (streamed, batch):
+            assert result[0] == expected[0] and result[3] == expected[3]
+            np.testing.assert_allclose(result[1], expected[1], atol=1e-9)
+            np.testing.assert_allclose(result[2], expected[2], atol=1e-6)
+    assert estimator.count('target') == window
@@ -0,0 +1,143 @@
+import os
+import types
+
+import numpy as np
+import pytest
+
+from agents.houlang import funcs_np
+from agents.houlang.funcs_np import FCModelBase, clip_obs, create_np_fc_model, get_obs, normalize
+
+MODEL_NPZ = os.path.join(os.path.dirname(__file__), '..', 'agents', 'houlang', 'model.npz')
+
+
+def make_torch_model(tmp_path):
+    """ 仓库里的 model.pkl 是 py3.7 的 cloudpickle 存的，这里用同一份权重（model.npz）重新打一个再加载 """
+    torch = pytest.importorskip('torch')
+    cloudpickle = pytest.importorskip('cloudpickle')
+    from agents.houlang.funcs_rl import create_fc_model
+
+    with np.load(MODEL_NPZ) as data:
+        params = dict(data)
+    rms = types.SimpleNamespace(mean=params.pop('rms.mean'), var=params.pop('rms.var'))
+    path = str(tmp_path / 'model.pkl')
+    with open(path, 'wb') as fout:
+        cloudpickle.dump({'model': {k: torch.from_numpy(v) for k, v in params.items()}, 'rms': rms}, fout)
+    return create_fc_model(path)
+
+
+def make_planes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    planes = {}
+    for i in range(n):
+        planes[i + 1] = types.SimpleNamespace(
+            is_uav=bool(i % 2), height=rng.uniform(2000, 12000), sp=rng.uniform(200, 400),
+            yaw=rng.uniform(-np.pi, np.pi), roll=rng.uniform(-1, 1), pitch=rng.uniform(-.3, .3),
+            alpha=rng.uniform(0, .1), beta=rng.uniform(-.02, .02), omega_p=rng.normal(0, .2),
+            omega_q=rng.normal(0, .1), omega_r=rng.normal(0, .05), v_north=rng.normal(0, 200),
+            v_east=rng.normal(0, 200), v_down=rng.normal(0, 20))
+    return planes
+
+
+@pytest.fixture
+def greedy(monkeypatch):
+    """ 采样换成取众数，两边的结果才能逐个比较 """
+    torch = pytest.importorskip('torch')
+    monkeypatch.setattr(torch.distributions.Categorical, 'sample',
+                        lambda self, sample_shape=torch.Size(): self.logits.argmax(-1))
+    monkeypatch.setattr(funcs_np, 'sample_categorical', lambda logits, rng: np.argmax(logits, -1))
+
+
+def test_control_cmd_batch(tmp_path, greedy):
+    model = make_torch_model(tmp_path)
+    planes = make_planes(6)
+    rng = np.random.default_rng(1)
+    targets = {pid: model.get_target(p, [rng.uniform(-2000, 2000), rng.uniform(-50, 50), rng.uniform(-1, 1)])
+               for pid, p in planes.items() if pid != 3}
+    batch = model.control_cmd_batch(planes, targets)
+    # 没有目标的飞机不出指令
+    assert sorted(batch) == sorted(targets)
+    for pid, target in targets.items():
+        np.testing.assert_allclose(batch[pid]['control'], model.control_cmd(planes[pid], target)['control'])
+
+
+def test_numpy_matches_torch(tmp_path, greedy):
+    import torch
+
+    torch_model = make_torch_model(tmp_path)
+    np_model = create_np_fc_model(MODEL_NPZ, seed=0)
+    np.testing.assert_allclose(np_model.rms_std, torch_model.rms_std)
+    planes = make_planes(8)
+    targets = {pid: np_model.get_target(p, [500., 10., .2]) for pid, p in planes.items()}
+    obs = np.stack([get_obs(planes[pid], targets[pid]) for pid in planes])
+    norm_obs = normalize(obs, np_model.rms_mean, np_model.rms_std, clip=10).astype(np.float32)
+    with torch.no_grad():
+        torch_out, _ = torch_model.policy(torch.from_numpy(norm_obs))
+    np_out = np_model.policy(norm_obs)
+    # 两边头的顺序不一定相同，按名字对齐后比较 logits
+    assert set(np_out) == set(torch_out)
+    for k, logits in np_out.items():
+        np.testing.assert_allclose(logits, torch_out[k].numpy(), atol=1e-5)
+
+    np_cmd = np_model.control_cmd_batch(planes, targets)
+    torch_cmd = torch_model.control_cmd_batch(planes, targets)
+    for pid in planes:
+        np.testing.assert_allclose(np_cmd[pid]['control'], torch_cmd[pid]['control'])
+
+
+def test_fused_first_layer():
+    model = create_np_fc_model(MODEL_NPZ)
+    fused = create_np_fc_model(MODEL_NPZ, fused=True)
+    w, b = model._get_first_layer()
+    w_fused, b_fused = fused._get_first_layer()
+    # 一半观测落在裁剪框外面
+    rng = np.random.default_rng(2)
+    obs = (model.rms_mean + model.rms_std * rng.normal(scale=8., size=(512, len(model.rms_mean)))).astype(np.float32)
+    ref = normalize(obs, model.rms_mean, model.rms_std, clip=10) @ w + b
+    out = clip_obs(obs, fused.obs_low, fused.obs_high) @ w_fused + b_fused
+    np.testing.assert_allclose(out, ref, atol=1e-3)
+    np.testing.assert_allclose(fused._logits(clip_obs(obs, fused.obs_low, fused.obs_high)),
+                               model._logits(normalize(obs, model.rms_mean, model.rms_std, clip=10)), atol=1e-3)
+
+
+def test_fc_model_base_is_abstract():
+    with pytest.raises(TypeError):
+        FCModelBase()
+
+
+def tree(state):
+    """ LSTM 的状态是 (h, c)，GRU 只有一个张量 """
+    return state if isinstance(state, tuple) else (state,)
+
+
+@pytest.mark.parametrize('rnn_type', ['lstm', 'gru'])
+def test_stateful_step_matches_sequence(rnn_type):
+    torch = pytest.importorskip('torch')
+    from agents.houlang.funcs_rl import Policy, StatefulPolicy
+
+    torch.manual_seed(0)
+    action_dim = {k: 41 for k in sorted(funcs_np.DISC_ACTIONS)}
+    policy = Policy(16, {k: True for k in action_dim}, action_dim, units_list=[64, 64], activation='relu',
+                    rnn_type=rnn_type, rnn_units=32, rnn_layers=2)
+    # (batch, 时间, 槽位, 维度)，中途有槽位被击落重来
+    B, T, U = 2, 12, 3
+    obs = torch.randn(B, T, U, 16)
+    reset = torch.zeros(B, T, U)
+    reset[0, 5, 1] = reset[1, 8, 2] = reset[1, 9, 0] = 1
+    with torch.no_grad():
+        full, _ = policy(obs, reset=reset)
+
+    stateful = StatefulPolicy(policy, B * U)
+    for t in range(T):
+        outs = stateful(obs[:, t].reshape(B * U, 16), reset=reset[:, t].reshape(B * U))
+        for k, logits in outs.items():
+            torch.testing.assert_close(logits, full[k][:, t].reshape(B * U, -1), atol=1e-5, rtol=1e-5)
+
+    # 按下标清零和按 bool 掩码清零一样，其他槽位不受影响
+    state = stateful.state
+    stateful.reset_slots([1, 4])
+    by_index = stateful.state
+    stateful.state = state
+    stateful.reset_slots(np.isin(np.arange(B * U), [1, 4]))
+    for a, b, s in zip(tree(by_index), tree(stateful.state), tree(state)):
+        torch.testing.assert_close(a, b)
+        assert torch.all(a[:, [1, 4]] == 0) and torch.equal(a[:, [0, 2, 3, 5]], s[:, [0, 2, 3, 5]])
@@ -0,0 +1,83 @@
+import os
+import shutil
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+from arena.flight_model import FighterDynamics
+from arena.jsbsim_xml import JSBSIM_ROOT, compiled_path, load_aircraft, parse_aircraft
+
+
+def test_table_matches_scipy():
+    model, _ = parse_aircraft('fighter')
+    table = next(t for t in model.tables if len(t.axes) == 3)
+    rng = np.random.default_rng(0)
+    points = np.stack([rng.uniform(a[0], a[-1], 200) for a in table.axes], -1)
+    expected = RegularGridInterpolator(table.axes, table.data)(points)
+    np.testing.assert_allclose(table(*points.T), expected, atol=1e-12)
+    # 超出范围按边界截断
+    edge = [a[-1] for a in table.axes]
+    assert np.isclose(table(*[a[-1] + 100 for a in table.axes]), table(*edge))
+
+
+def test_cache_roundtrip(tmp_path):
+    first = load_aircraft('fighter', cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2  # .bin 和 .meta
+    second = load_aircraft('fighter', cache_dir=str(tmp_path))
+    assert sorted(first.functions) == sorted(second.functions)
+    assert second.axes == first.axes
+    # 表数据是 mmap 上的只读视图
+    table = second.tables[0]
+    assert np.shares_memory(table.data, second.blob) and not table.data.flags.writeable
+    parsed, _ = parse_aircraft('fighter')
+    for a, b in zip(parsed.tables, second.tables):
+        np.testing.assert_array_equal(a.data, b.data)
+    assert second.initial_conditions['basic_ic']['altitude'] == 3000.
+
+
+def test_cache_key_follows_content(tmp_path):
+    root = str(tmp_path / 'jsbsim')
+    shutil.copytree(JSBSIM_ROOT, root)
+    # 只改修改时间不换键，改内容才换
+    path = compiled_path('fighter', root, str(tmp_path))
+    assert path == compiled_path('fighter', JSBSIM_ROOT, str(tmp_path))
+    ic = os.path.join(root, 'basic_ic.xml')
+    os.utime(ic, (0, 0))
+    assert compiled_path('fighter', root, str(tmp_path)) == path
+    with open(ic, 'a') as fout:
+        fout.write('\n')
+    assert compiled_path('fighter', root, str(tmp_path)) != path
+
+
+def test_trimmed_level_flight():
+    dyn = FighterDynamics(2)
+    pos = np.array([[0., 0., 10000. - 9000.], [0., 0., 10000. - 3000.]])
+    throttle = dyn.reset(pos, np.zeros((2, 3)), np.array([250., 200.]))
+    assert np.all((throttle > 0) & (throttle < 1))
+    control = np.zeros((2, 4))
+    control[:, 3] = throttle
+    for _ in range(200):
+        dyn.step(control)
+    np.testing.assert_allclose(dyn.height, [9000., 3000.], atol=5.)
+    np.testing.assert_allclose(dyn.tas, [250., 200.], atol=2.)
+    np.testing.assert_allclose(dyn.nz, 1., atol=0.02)
+
+
+def test_stick_commands():
+    dyn = FighterDynamics(2)
+    pos = np.zeros((2, 3))
+    pos[:, 2] = 10000. - 6000.
+    throttle = dyn.reset(pos, np.zeros((2, 3)), np.full(2, 250.))
+    control = np.zeros((2, 4))
+    control[:, 3] = throttle
+    control[0, 1] = -1.  # 满杆拉
+    control[1, 0] = 1.   # 满杆右滚
+    max_nz, max_alpha = 0., 0.
+    for _ in range(40):
+        dyn.step(control)
+        max_nz = max(max_nz, dyn.nz[0])
+        max_alpha = max(max_alpha, np.degrees(dyn.alpha[0]))
+    assert 7. < max_nz < 9.5
+    assert max_alpha < 30.
+    # XML 里满杆的滚转角速度指令是 308°/s
+    assert 250. < np.degrees(dyn.omega[1, 0]) < 330.
@@ -0,0 +1,55 @@
+import types
+
+import numpy as np
+
+from arena.gain_schedule import save_schedule
+from agents.houlang.funcs_pid import (ELEVATOR_LIMIT_MAX, SCHEDULE_COLUMNS, FlyPid, FlyPidBank, GainSchedule,
+                                      fly_with_alt_yaw_vel, fly_with_alt_yaw_vel_batch)
+
+ALTITUDE_BANDS = (0., 4000., 3)
+MACH_BANDS = (0.5, 0.2, 4)
+
+
+def make_schedule(path):
+    # 每一格的值编码成 机型 * 100 + 高度带 * 10 + 马赫数带，方便核对查到的是哪一格
+    table = np.zeros((2, 3, 4, len(SCHEDULE_COLUMNS)))
+    table[...] = (np.arange(2)[:, None, None] * 100 + np.arange(3)[:, None] * 10 + np.arange(4))[..., None]
+    table[..., 6] = 0.5
+    table[..., 7] = 0.6
+    # 存的时候机型顺序反过来，读的时候要按名字对上
+    save_schedule(path, {'uav': table[1], 'manned': table[0]}, ALTITUDE_BANDS, MACH_BANDS)
+    return GainSchedule(path)
+
+
+def test_lookup(tmp_path):
+    schedule = make_schedule(str(tmp_path / 'gain_schedule.npz'))
+    rows = schedule.lookup([False, True, True, False], [1000., 5000., 20000., -50.], [0.6, 0.95, 2.0, 0.1])
+    np.testing.assert_array_equal(rows[:, 0], [0, 112, 123, 0])
+
+
+def test_scheduled_commands(tmp_path):
+    schedule = make_schedule(str(tmp_path / 'gain_schedule.npz'))
+    planes = [types.SimpleNamespace(roll=0.1, pitch=-0.2, omega_p=0.05, omega_q=0.3, omega_r=0., yaw=0.,
+                                    height=h, mach=0.8, is_uav=u)
+              for h, u in ((3000., False), (9000., True))]
+    actions = np.array([[0, 6, 1], [2, 1, 1]])
+    gains = schedule.lookup([p.is_uav for p in planes], [p.height for p in planes], [p.mach for p in planes])
+    batch = fly_with_alt_yaw_vel_batch(planes, actions, FlyPidBank(), [1, 2], schedule)
+    for plane, action, row, cmd in zip(planes, actions, gains, batch):
+        expected = fly_with_alt_yaw_vel(plane, list(action), FlyPid(), row)
+        np.testing.assert_allclose(cmd, expected)
+    # 匀速油门和俯仰限幅来自表
+    assert np.all(batch[:, 3] == 0.5) and np.all(np.abs(batch[:, 1]) <= 0.6)
+
+
+def test_elevator_limit_capped(tmp_path):
+    # 表里比手调值更松的俯仰限幅查出来时截到 ELEVATOR_LIMIT_MAX
+    path = str(tmp_path / 'gain_schedule.npz')
+    table = np.zeros((3, 4, len(SCHEDULE_COLUMNS)))
+    table[..., 7] = np.linspace(0.3, 1., 12).reshape(3, 4)
+    save_schedule(path, {'manned': table, 'uav': table}, ALTITUDE_BANDS, MACH_BANDS)
+    schedule = GainSchedule(path)
+    for band, height in enumerate([1000., 5000., 9000.]):
+        rows = schedule.lookup([False] * 4, [height] * 4, [0.5, 0.8, 1.0, 1.5])
+        np.testing.assert_allclose(rows[:, 7], np.minimum(table[band, :, 7], ELEVATOR_LIMIT_MAX))
+    assert np.all(rows[:, 7] == ELEVATOR_LIMIT_MAX)
@@ -0,0 +1,115 @@
+import math
+import numpy as np
+
+from agents.houlang.funcs_geo import (assess_threats, closest_approach, expired_missiles, pairwise_geometry,
+                                     positions_of, rank_threats, velocities_of)
+from agents.houlang.funcs_track import MISSILE_VEL_VAR, KalmanTracker
+
+
+class Info:
+    def __init__(self, x, y, z, yaw=0., v_north=0., v_east=0., v_down=0.):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.yaw = yaw
+        self.v_north = v_north
+        self.v_east = v_east
+        self.v_down = v_down
+
+
+rng = np.random.default_rng(0)
+planes = [Info(*rng.uniform(-5e4, 5e4, 3), rng.uniform(-np.pi, np.pi), *rng.uniform(-300, 300, 3)) for _ in range(6)]
+targets = [Info(*rng.uniform(-5e4, 5e4, 3), 0., *rng.uniform(-300, 300, 3)) for _ in range(4)]
+
+
+def test_matches_scalar_geometry():
+    geo = pairwise_geometry(positions_of(planes), positions_of(targets),
+                            yaw_a=np.array([p.yaw for p in planes]))
+    for i, p in enumerate(planes):
+        for j, t in enumerate(targets):
+            azimuth = math.atan2(t.y - p.y, t.x - p.x)
+            azimuth_diff = (azimuth - p.yaw + math.pi) % (2 * math.pi) - math.pi
+            assert math.isclose(geo.azimuth[i, j], azimuth, abs_tol=1e-9)
+            assert math.isclose(geo.azimuth_diff[i, j], azimuth_diff, abs_tol=1e-9)
+            d2 = math.sqrt((t.x - p.x) ** 2 + (t.y - p.y) ** 2)
+            assert math.isclose(geo.dist_2d[i, j], d2, rel_tol=1e-12)
+            assert math.isclose(geo.dist_3d[i, j], math.sqrt(d2 ** 2 + (t.z - p.z) ** 2), rel_tol=1e-12)
+            assert math.isclose(geo.elevation[i, j], math.atan2(t.z - p.z, d2), abs_tol=1e-12)
+
+
+def test_closure_aspect_and_cos_theta():
+    # 迎头：双方相向飞行
+    a = Info(0, 0, 0, v_north=200)
+    b = Info(10e3, 0, 0, v_north=-300)
+    geo = pairwise_geometry(positions_of([a]), positions_of([b]), velocities_of([a]), velocities_of([b]))
+    assert math.isclose(geo.closure_rate[0, 0], 500)
+    assert math.isclose(geo.aspect[0, 0], 0, abs_tol=1e-9)
+    assert math.isclose(geo.cos_theta[0, 0], -1)
+
+    # 尾追：目标在前方同向飞行，速度更慢
+    b = Info(10e3, 0, 0, v_north=150)
+    geo = pairwise_geometry(positions_of([a]), positions_of([b]), velocities_of([a]), velocities_of([b]))
+    assert math.isclose(geo.closure_rate[0, 0], 50)
+    assert math.isclose(geo.aspect[0, 0], math.pi)
+    assert math.isclose(geo.cos_theta[0, 0], 1)
+
+
+def test_closest_approach_matches_sampling():
+    missiles = [Info(*rng.uniform(-3e4, 3e4, 3), 0., *rng.uniform(-900, 900, 3)) for _ in range(5)]
+    cpa = closest_approach(positions_of(planes), velocities_of(planes), positions_of(missiles), velocities_of(missiles))
+    t = np.linspace(0, 200, 200001)
+    for i, p in enumerate(planes):
+        for j, m in enumerate(missiles):
+            rel = (positions_of([m]) - positions_of([p])) + (velocities_of([m]) - velocities_of([p])) * t[:, None]
+            dist = np.linalg.norm(rel, axis=1)
+            k = dist.argmin()
+            assert math.isclose(cpa.t_cpa[i, j], t[k], abs_tol=2e-3)
+            assert math.isclose(cpa.miss_distance[i, j], dist[k], rel_tol=1e-6, abs_tol=1e-3)
+            assert math.isclose(cpa.closing_speed[i, j], -(dist[1] - dist[0]) / (t[1] - t[0]), rel_tol=1e-3, abs_tol=1e-2)
+
+
+def test_rank_and_expire_threats():
+    plane = Info(0, 0, 0, v_north=250)
+    missiles = [
+        Info(20e3, 500, 0, v_north=-800),   # 迎头，20 秒后擦身而过
+        Info(-8e3, 0, 0, v_north=900),      # 尾追，12 秒追上
+        Info(-20e3, 0, 0, v_north=100),     # 追不上了
+        Info(0, 30e3, 0, v_east=-600),      # 最近距离太远
+    ]
+    cpa = closest_approach(positions_of([plane]), velocities_of([plane]), positions_of(missiles), velocities_of(missiles))
+    order, is_threat = rank_threats(cpa)
+    assert is_threat[0].tolist() == [True, True, False, False]
+    assert order[0, :2].tolist() == [1, 0]
+    assert expired_missiles(cpa).tolist() == [False, False, True, False]
+    # 没告警这架飞机的导弹既不算威胁，也不判失效
+    alarm = np.array([[True, False, False, True]])
+    assert rank_threats(cpa, alarm)[1][0].tolist() == [True, False, False, False]
+    assert not expired_missiles(cpa, alarm).any()
+
+
+def test_missile_flies_past_and_expires():
+    # 和 my_agent_demo 每帧的流程一样：rws_infos 的带噪位置喂 ca 航迹，CPA 用航迹速度，危险过的导弹远离后判失效
+    tracker = KalmanTracker('ca', noise_std=100.)
+    noise = np.random.default_rng(1)
+    dangerous, expired_at, first_threat = set(), None, None
+    for tick in range(800):
+        t = tick / 20.
+        plane = Info(250 * t, 0, -5000, v_north=250)
+        missile = Info(30e3 - 900 * t, 1000, -5000)
+        tracker.update(['m'], np.array([[missile.x, missile.y, missile.z]]) + noise.normal(0, 150., (1, 3)),
+                       'rws_infos', t=t)
+        cpa = closest_approach(positions_of([plane]), velocities_of([plane]), tracker.positions(['m']),
+                               tracker.velocities(['m']))
+        vel_var = tracker.covariances(['m'])[:, 3:6, 3:6].trace(axis1=1, axis2=2)
+        # 原来的门限 3 * 50^2 在只有位置量测时永远到不了
+        assert vel_var[0] > 3 * 50 ** 2
+        order, is_threat, expired = assess_threats(cpa, np.ones((1, 1), dtype=bool), vel_var < MISSILE_VEL_VAR)
+        if is_threat[0, 0]:
+            dangerous.add('m')
+            first_threat = tick if first_threat is None else first_threat
+        if expired[0] and 'm' in dangerous:
+            expired_at = tick
+            break
+    # 航迹起始后约 1 秒速度才可用、开始算威胁；约 26 秒擦身而过，拉开 5 公里后判失效
+    assert 15 <= first_threat <= 40
+    assert expired_at is not None and 20 * 26 < expired_at < 20 * 32
@@ -0,0 +1,36 @@
+import threading
+
+import numpy as np
+
+from arena.inference_server import ACTION_ORDER, InferenceClient, InferenceServer
+
+
+class EchoModel:
+    """ 把观测的前 4 维当成动作返回，方便检查批处理后每个客户端拿回的是自己那几行 """
+    def __call__(self, obs):
+        return {k: obs[:, i].astype(np.int64) for i, k in enumerate(ACTION_ORDER)}
+
+
+def test_batched_requests(tmp_path):
+    address = str(tmp_path / 'fc.sock')
+    server = InferenceServer(EchoModel(), address, window=0.01)
+    server.start()
+    errors = []
+
+    def worker(i):
+        client = InferenceClient(address)
+        rng = np.random.default_rng(i)
+        for _ in range(50):
+            obs = rng.integers(0, 41, size=(rng.integers(1, 7), 16)).astype(np.float32)
+            if not np.array_equal(client.act(obs), obs[:, :4]):
+                errors.append(i)
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    server.stop()
+    assert not errors
+    assert server.num_batches < 200
@@ -0,0 +1,38 @@
+import numpy as np
+
+from arena.lar import build_table, save_tables
+from agents.houlang.funcs_lar import LaunchTable, in_launch_gates
+
+
+def test_table_and_lookup(tmp_path):
+    axes = {
+        'range': np.linspace(0, 24e3, 13),
+        'aspect': np.array([0., np.pi / 2, np.pi]),
+        'dh': np.array([-2000., 2000.]),
+        'closing': np.array([0., 600.]),
+    }
+    grid, axes = build_table('short_missile', axes)
+    assert grid.shape == (13, 3, 2, 2)
+    assert grid[0].min() == 1.
+    # 迎头的最大发射距离比尾追远
+    max_range = [axes['range'][np.flatnonzero(grid[:, a, 0, 0] >= .5).max()] for a in range(3)]
+    assert max_range[0] > max_range[2]
+
+    path = str(tmp_path / 'lar.npz')
+    save_tables(path, {'short_missile': (grid, axes)})
+    table = LaunchTable(path)
+    mesh = np.meshgrid(*axes.values(), indexing='ij')
+    assert np.allclose(table.lookup('short_missile', *mesh), grid)
+    # 格点中间是相邻格点的线性插值，超出最大距离为 0
+    mid = table.lookup('short_missile', (axes['range'][3] + axes['range'][4]) / 2, 0., -2000., 0.)
+    assert np.isclose(mid, (grid[3, 0, 0, 0] + grid[4, 0, 0, 0]) / 2)
+    assert table.lookup('short_missile', 30e3, 0., 0., 0.) == 0.
+
+
+def test_launch_gates():
+    dist = np.array([[10e3, 29e3, 31e3, 60e3]])
+    cos_theta = np.array([[.9, .5, .9, .9]])
+    assert in_launch_gates('mid_missile', dist, cos_theta).tolist() == [[True, True, False, False]]
+    assert in_launch_gates('mid_missile', dist, cos_theta - .5).tolist() == [[True, False, False, False]]
+    # 近距弹不限距离（表在最大距离外本来就给 0），只限角度
+    assert in_launch_gates('short_missile', dist, cos_theta - 1.).tolist() == [[True, False, True, True]]
@@ -0,0 +1,31 @@
+import types
+
+import numpy as np
+
+from agents.houlang.funcs_pid import FlyPid, FlyPidBank, fly_with_alt_yaw_vel, fly_with_alt_yaw_vel_batch
+
+
+def test_batch_matches_per_plane():
+    rng = np.random.default_rng(0)
+    bank = FlyPidBank(init_planes=2)
+    pids = {}
+    for tick in range(40):
+        # 中途加入新飞机（触发扩容），也有飞机某几帧不出指令
+        keys = [k for k in range(min(1 + tick // 5, 5)) if (tick + k) % 7]
+        # 滚转角覆盖倒飞（|roll| >= 90°）的分支，角速度给大一些让积分打到限幅
+        planes = [types.SimpleNamespace(roll=rng.uniform(-np.pi, np.pi), pitch=rng.uniform(-.5, .5),
+                                        omega_p=rng.normal(0, 1.), omega_q=rng.normal(0, .5), omega_r=0., yaw=0.,
+                                        height=5000., mach=.8, is_uav=False) for _ in keys]
+        actions = np.stack([rng.integers(0, 3, len(keys)), rng.integers(0, 7, len(keys)),
+                            rng.integers(0, 3, len(keys))], -1)
+        batch = fly_with_alt_yaw_vel_batch(planes, actions, bank, keys)
+        for key, plane, action, cmd in zip(keys, planes, actions, batch):
+            pid = pids.setdefault(key, FlyPid())
+            np.testing.assert_allclose(cmd, fly_with_alt_yaw_vel(plane, list(action), pid), atol=1e-12)
+            row = bank.slots[key]
+            np.testing.assert_allclose(bank.integral[row], [pid.pid_aileron.integral, pid.pid_elevator.integral])
+            np.testing.assert_allclose(bank.previous_error[row],
+                                       [pid.pid_aileron.previous_error, pid.pid_elevator.previous_error])
+    assert len(bank.slots) == 5
+    # 积分确实打到了限幅（倒飞的滚转角约占一半帧）
+    assert any(abs(p.pid_elevator.integral) == 10. for p in pids.values())
@@ -0,0 +1,48 @@
+import json
+import os
+
+from arena.pointmass import PointMassSim
+from arena.runner import run_match
+
+SCEN = os.path.join(os.path.dirname(__file__), '..', 'scen.json')
+
+
+class Shooter:
+    """ 改平机翼直飞，锁定就打 """
+    def __init__(self, side):
+        self.side = side
+
+    def step(self, obs):
+        cmd_dict = {}
+        for ind, plane in obs.my_planes.items():
+            cmd_dict[ind] = {'control': [-0.5 * plane.roll, 0, 0, 0.8]}
+            for weapon_type, lock_list in (('short_missile', plane.short_lock_list), ('mid_missile', plane.mid_lock_list)):
+                if lock_list and plane.loadout[weapon_type] > 0:
+                    cmd_dict[ind]['weapon'] = {'type': weapon_type, 'target': lock_list[0]}
+                    break
+        return cmd_dict
+
+
+def load_scen():
+    with open(SCEN, 'r') as fin:
+        return json.load(fin)
+
+
+def test_level_flight_holds_altitude():
+    sim = PointMassSim(load_scen(), seed=0)
+    # 智能体和真仿真都是 20Hz，步长不一致时按帧数写的逻辑（冷却、历史窗口）都会变
+    assert sim.dt == 1 / 20.
+    for _ in range(round(30. / sim.dt)):
+        sim.step()
+    obs = sim.get_obs(side='red')
+    assert len(obs.my_planes) == 6 and len(obs.awacs_infos) == 6
+    for plane in obs.my_planes.values():
+        assert abs(plane.pitch) < 0.01
+        assert abs(plane.z + plane.height - sim.conf['z_ref']) < 1e-6
+    assert abs(obs.sim_time - 30.) < 1e-9
+
+
+def test_head_on_engagement():
+    result = run_match(Shooter, Shooter, load_scen(), seed=1, sim='arena.pointmass:PointMassSim', max_steps=3000)
+    assert result['red_missiles_left'] < 24 and result['blue_missiles_left'] < 24
+    assert result['red_alive'] + result['blue_alive'] < 12
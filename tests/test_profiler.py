@@ -0,0 +1,42 @@
+import json
+import os
+import time
+
+from arena.profiler import StepProfiler
+from arena.runner import run_match
+
+SCEN = os.path.join(os.path.dirname(__file__), '..', 'scen.json')
+
+
+class Idle:
+    """ 改平直飞，step 里调用一次 think，方便给内部方法单独计时 """
+    def __init__(self, side):
+        self.side = side
+
+    def think(self):
+        time.sleep(1e-3)
+
+    def step(self, obs):
+        self.think()
+        return {ind: {'control': [-0.5 * plane.roll, 0, 0, 0.5]} for ind, plane in obs.my_planes.items()}
+
+
+def test_sections(tmp_path):
+    with open(SCEN, 'r') as fin:
+        scen = json.load(fin)
+    profiler = StepProfiler(keep_worst=3)
+    run_match(Idle, Idle, scen, seed=0, sim='arena.pointmass:PointMassSim', max_steps=20, profiler=profiler,
+              sections=['red:step', 'red:think', 'arena.pointmass:_normalize_angle'])
+    report = profiler.report()
+    assert report['ticks'] == 20 and len(report['worst_ticks']) == 3
+    sections = report['sections']
+    assert {'red.get_obs', 'red.step', 'blue.step', 'sim.step', 'red.agent.step', 'red.agent.think',
+            'pointmass._normalize_angle'} <= set(sections)
+    assert 'blue.agent.think' not in sections
+    # 包装出来的分段和 run_match 自己的 red.step 分开记，不会叠加到一起
+    red_step, agent_step, think = (profiler.times[k] for k in ('red.step', 'red.agent.step', 'red.agent.think'))
+    for outer, inner, leaf in zip(red_step, agent_step, think):
+        assert outer >= inner >= leaf >= 1e-3 and outer < 2 * inner
+    assert sections['red.agent.think']['count'] == 20
+    profiler.save(str(tmp_path / 'profile.json'))
+    assert 'red.agent.step' in profiler.summary()
@@ -0,0 +1,53 @@
+import json
+import os
+
+import numpy as np
+
+from arena.pointmass import PointMassSim
+from arena.recorder import EpisodeRecorder, EpisodeReader
+
+SCEN = os.path.join(os.path.dirname(__file__), '..', 'scen.json')
+
+
+def record(path, ticks, elevator, chunk_ticks=16):
+    with open(SCEN, 'r') as fin:
+        sim = PointMassSim(json.load(fin), seed=0)
+    recorder = EpisodeRecorder(path, chunk_ticks=chunk_ticks)
+    heights = []
+    for tick in range(ticks):
+        for side in ('red', 'blue'):
+            obs = sim.get_obs(side=side)
+            cmd_dict = {ind: {'control': [0., elevator, 0., 1.]} for ind in obs.my_planes}
+            recorder.record(tick, side, obs, cmd_dict)
+            sim.send_commands(cmd_dict, cmd_side=side)
+        heights.append(sim.get_obs(side='red').my_planes[1].height)
+        sim.step()
+    recorder.close()
+    return heights
+
+
+def test_roundtrip(tmp_path):
+    heights = record(str(tmp_path), 50, -0.1)
+    reader = EpisodeReader(str(tmp_path))
+    assert reader.meta['num_chunks'] == 4
+    planes = reader.table('planes')
+    assert isinstance(planes['x'], np.memmap) and len(planes['x']) == 50 * 12
+    track = reader.entity('planes', 1, side='red')
+    assert np.array_equal(track['tick'], np.arange(50))
+    assert np.allclose(track['height'], heights, atol=1e-2)
+    commands = reader.table('commands')
+    assert np.all(commands['weapon_type'] == -1) and np.all(commands['elevator'] == -0.1)
+
+
+def test_record_twice_same_dir(tmp_path):
+    # 第一局更长、分块更多，并且已经被读过（合并结果和 .done 都在）
+    record(str(tmp_path), 50, -0.1)
+    assert len(EpisodeReader(str(tmp_path)).table('commands')['tick']) == 50 * 12
+    record(str(tmp_path), 20, 0.3)
+
+    reader = EpisodeReader(str(tmp_path))
+    assert reader.meta['num_chunks'] == 2
+    commands = reader.table('commands')
+    assert len(commands['tick']) == 20 * 12 and np.all(commands['elevator'] == 0.3)
+    assert np.array_equal(reader.entity('planes', 1, side='red')['tick'], np.arange(20))
+    assert sorted(f for f in os.listdir(tmp_path) if f.startswith('planes_')) == ['planes_00000.npz', 'planes_00001.npz']
@@ -0,0 +1,50 @@
+import json
+import os
+
+import numpy as np
+
+from arena.flight_model import FighterSim
+from arena.telemetry import load_output_spec, read_telemetry
+
+SCEN = os.path.join(os.path.dirname(__file__), '..', 'scen.json')
+
+
+def test_fighter_sim_telemetry(tmp_path):
+    with open(SCEN, 'r') as fin:
+        sim = FighterSim(json.load(fin), seed=0, telemetry=str(tmp_path))
+    sim.telemetry.segment_records = 16
+    n = len(sim.alive)
+    heights = []
+    for _ in range(40):
+        sim.step()
+        heights.append(sim.conf['z_ref'] - sim.pos[:, 2].copy())
+
+    # 没 close 也能按 tick 读出写过的帧
+    data = read_telemetry(str(tmp_path))
+    assert len(data) == 40 and len(os.listdir(tmp_path)) == 3
+    assert np.array_equal(data['tick'], np.arange(1, 41))
+    spec = load_output_spec()
+    assert set(name for name, _, _ in spec) <= set(data.dtype.names)
+    assert data['position_h_sl_ft'].shape == (40, n) and data['position_h_sl_ft'].dtype == np.float32
+    np.testing.assert_allclose(data['position_h_sl_ft'] * 0.3048, heights, rtol=1e-5)
+    assert np.all(np.isfinite(data['velocities_mach']))
+    sim.telemetry.close()
+    assert len(read_telemetry(str(tmp_path))) == 40
+
+
+def test_reset_same_dir(tmp_path):
+    with open(SCEN, 'r') as fin:
+        sim = FighterSim(json.load(fin), seed=0, telemetry=str(tmp_path))
+    sim.telemetry.segment_records = 16
+    for _ in range(40):
+        sim.step()
+    sim.reset()
+    sim.telemetry.segment_records = 16
+    for _ in range(10):
+        sim.step()
+    # 第二局只写了一个分段，上一局的分段和 meta.json 不能混进来
+    assert sorted(os.listdir(tmp_path)) == ['segment_00000.npy']
+    data = read_telemetry(str(tmp_path))
+    assert np.array_equal(data['tick'], np.arange(1, 11))
+    sim.telemetry.close()
+    assert np.array_equal(read_telemetry(str(tmp_path))['tick'], np.arange(1, 11))
@@ -0,0 +1,100 @@
+import numpy as np
+
+from agents.houlang.funcs_track import KalmanTracker, TrackStore, _kinematic_matrices
+
+
+def test_track_store_matches_lists():
+    # 容量 8、初始 2 个槽位：写 30 帧会多次绕回，5 个实体会触发两次扩容
+    store = TrackStore(capacity=8, dim=3, init_slots=2)
+    ref = {}
+    rng = np.random.default_rng(0)
+    for k in range(30):
+        keys = [key for key in range(5) if (k + key) % 4]
+        values = rng.normal(size=(len(keys), 3))
+        if k % 2:
+            store.extend(keys, values, t=k)
+        else:
+            for key, value in zip(keys, values):
+                store.append(key, value, t=k)
+        for key, value in zip(keys, values):
+            ref.setdefault(key, []).append((k, value))
+        for key, samples in ref.items():
+            assert store.count(key) == len(samples)
+            np.testing.assert_array_equal(store.first(key), samples[0][1])
+            np.testing.assert_array_equal(store.latest(key), samples[-1][1])
+            np.testing.assert_array_equal(store.last(key, 3), [v for _, v in samples[-3:]])
+            np.testing.assert_array_equal(store.last(key), [v for _, v in samples[-8:]])
+            np.testing.assert_array_equal(store.last_times(key), [t for t, _ in samples[-8:]])
+    assert store.data.shape[0] == 8 and len(store) == 5
+    assert not store.last(0).flags.writeable
+
+
+def test_track_store_remove():
+    store = TrackStore(capacity=4, dim=None, init_slots=2)
+    for t in range(6):
+        store.extend(['a', 'b'], [t, 10 + t], t=t)
+    store.remove('a')
+    store.remove('missing')
+    assert 'a' not in store and store.count('a') == 0 and len(store) == 1
+    # 释放的槽位被复用，不扩容，也不会带着上一个实体的样本
+    store.append('c', 100.)
+    assert store.data.shape[0] == 2
+    assert store.count('c') == 1 and store.first('c') == 100.
+    np.testing.assert_array_equal(store.last('c'), [100.])
+    np.testing.assert_array_equal(store.last('b'), [12., 13., 14., 15.])
+
+
+def test_matches_dense_kalman_filter():
+    rng = np.random.default_rng(1)
+    tracker = KalmanTracker('ca', noise_std=5.)
+    x = P = None
+    for k in range(50):
+        t = k * 0.05
+        z = rng.normal(0, 100, 3) + [200 * t, 0, 0]
+        vz = rng.normal(0, 5, 3) + [200, 0, 0]
+        use_vel = k % 3 == 0
+        tracker.update([7], [z], 'enemy_planes', t=t, vel=[vz] if use_vel else None)
+
+        m = 6 if use_vel else 3
+        H = np.eye(9)[:m]
+        zz = np.r_[z, vz][:m]
+        R = np.diag(([15. ** 2] * 3 + [5. ** 2] * 3)[:m])
+        if x is None:
+            x = np.zeros(9)
+            x[:m] = zz
+            var = np.array([0, 300. ** 2, 30. ** 2]).repeat(3)
+            var[:m] = np.diag(R)
+            P = np.diag(var)
+            t_prev = t
+            continue
+        F, Q = _kinematic_matrices(t - t_prev, 3)
+        t_prev = t
+        x = F @ x
+        P = F @ P @ F.T + Q * 25.
+        K = P @ H.T @ np.linalg.inv(H @ P @ H.T + R)
+        x = x + K @ (zz - H @ x)
+        P = (np.eye(9) - K @ H) @ P
+    assert np.allclose(tracker.x[tracker.slots[7]], x)
+    assert np.allclose(tracker.P[tracker.slots[7]], P)
+
+
+def test_predicts_through_gaps():
+    rng = np.random.default_rng(0)
+    tracker = KalmanTracker('cv', noise_std=5.)
+    p0 = np.array([[0., 0., 5000.], [1e4, 2e4, 3000.]])
+    v = np.array([[250., 0., 0.], [-100., 200., 5.]])
+    for k in range(400):
+        t = k / 20
+        if 150 <= k < 250:
+            tracker.predict(t)
+            if k == 249:
+                gap_std = np.sqrt(tracker.covariances([1])[0, 0, 0])
+        else:
+            tracker.update([1, 2], p0 + v * t + rng.normal(0, 150, (2, 3)), 'rws_infos', t=t)
+        if k == 149:
+            std = np.sqrt(tracker.covariances([1])[0, 0, 0])
+    assert gap_std > std
+    assert np.abs(tracker.velocities([1, 2]) - v).max() < 20
+    assert np.abs(tracker.positions([1, 2]) - (p0 + v * t)).max() < 150
+    tracker.remove(1)
+    assert 1 not in tracker and 2 in tracker
@@ -0,0 +1,74 @@
+import functools
+import os
+import time
+
+import numpy as np
+import pytest
+
+from arena.vec_env import FlightControlEnv, VecEnv, make_flight_control_vec_env
+
+SCEN = os.path.join(os.path.dirname(__file__), '..', 'scen.json')
+SIM = 'arena.pointmass:PointMassSim'
+
+
+def test_matches_in_process_env():
+    venv = make_flight_control_vec_env(2, scen=SCEN, sim=SIM, seed=0, max_steps=30)
+    envs = [FlightControlEnv(SCEN, sim=SIM, seed=i, max_steps=30) for i in range(2)]
+    try:
+        obs, mask = venv.reset()
+        for i, env in enumerate(envs):
+            o, m = env.reset()
+            assert np.array_equal(obs[i], o) and np.array_equal(mask[i], m)
+
+        rng = np.random.default_rng(0)
+        for _ in range(40):
+            actions = rng.integers(0, FlightControlEnv.n_bins, size=(2, 12, 4))
+            obs, reward, done, mask = venv.step(actions)
+            for i, env in enumerate(envs):
+                o, r, d, m = env.step(actions[i])
+                assert d == done[i]
+                if d:
+                    assert np.array_equal(venv.final_obs[i], o)
+                    o, m = env.reset()
+                assert np.array_equal(obs[i], o) and np.allclose(reward[i], r)
+    finally:
+        venv.close()
+
+
+class CrashEnv:
+    """ 第 crash_step 步直接结束进程（模拟仿真 dll 崩溃），不会走到 except """
+    def __init__(self, crash_step=None):
+        self.crash_step = crash_step
+
+    def reset(self):
+        self.num_steps = 0
+        return np.zeros((1, 2), np.float32), np.ones(1, dtype=bool)
+
+    def step(self, action):
+        self.num_steps += 1
+        if self.num_steps == self.crash_step:
+            os._exit(3)
+        if self.crash_step == -1:
+            time.sleep(60)
+        return np.zeros((1, 2), np.float32), np.zeros(1), False, np.ones(1, dtype=bool)
+
+
+def test_dead_worker():
+    venv = VecEnv([functools.partial(CrashEnv), functools.partial(CrashEnv, 3)], 1, 2, 1, poll_interval=.05)
+    venv.reset()
+    venv.step(np.zeros((2, 1, 1)))
+    venv.step(np.zeros((2, 1, 1)))
+    start = time.time()
+    with pytest.raises(RuntimeError, match='exitcode'):
+        venv.step(np.zeros((2, 1, 1)))
+    assert time.time() - start < 5 and venv.closed
+    assert not any(proc.is_alive() for proc in venv._procs)
+    venv.close()
+
+
+def test_timeout():
+    venv = VecEnv([functools.partial(CrashEnv, -1)], 1, 2, 1, timeout=.5, poll_interval=.05)
+    venv.reset()
+    with pytest.raises(TimeoutError):
+        venv.step(np.zeros((1, 1, 1)))
+    assert venv.closed and not venv._procs[0].is_alive()